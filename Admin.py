@@ -3,36 +3,46 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
-
-from config import ADMIN_ID
+from telegram.helpers import escape_markdown
+
+import broadcast
+import catalog
+import delivery
+import fulfilment
+import metrics
+import voucher_import
+from codes import split_codes
+from config import ADMIN_ID, DENOMINATIONS, IMPORT_MAX_BYTES
 from data_store import (
-    stock_text,
-    add_vouchers,
+    add_vouchers_unique_async,
+    get_order_async,
     list_orders,
-    set_price,
-    get_price,
+    set_price_async,
     get_users,
+    sold_info_async,
 )
+from order_states import RECOVERABLE_STATUSES
 
 logger = logging.getLogger(__name__)
 
 
-def admin_kb():
-    return InlineKeyboardMarkup(
+_ADD_BUTTONS = [
+    InlineKeyboardButton(f"➕ Add ₹{d}", callback_data=f"admin_add_{d}") for d in DENOMINATIONS
+]
+_ADMIN_KB = InlineKeyboardMarkup(
+    # do "Add" buttons per row, phir stock / orders
+    [_ADD_BUTTONS[i:i + 2] for i in range(0, len(_ADD_BUTTONS), 2)]
+    + [
         [
-            [
-                InlineKeyboardButton("➕ Add ₹1000", callback_data="admin_add_1000"),
-                InlineKeyboardButton("➕ Add ₹2000", callback_data="admin_add_2000"),
-            ],
-            [
-                InlineKeyboardButton("➕ Add ₹4000", callback_data="admin_add_4000"),
-            ],
-            [
-                InlineKeyboardButton("📦 Stock", callback_data="admin_stock"),
-                InlineKeyboardButton("🧾 Orders", callback_data="admin_orders"),
-            ],
-        ]
-    )
+            InlineKeyboardButton("📦 Stock", callback_data="admin_stock"),
+            InlineKeyboardButton("🧾 Orders", callback_data="admin_orders"),
+        ],
+    ]
+)
+
+
+def admin_kb():
+    return _ADMIN_KB
 
 
 async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -50,6 +60,10 @@ async def admin_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Commands:\n"
         "`/setprice 2000 80`  → ₹2000 ka price 80 set\n"
         "`/broadcast msg`     → sab users ko alert\n"
+        "`/metrics`           → latency / Pay0 / store stats\n"
+        "`/lookup CODE`       → code kis order / user ko bika\n"
+        "`/resend ORDER_ID`   → completed order ke codes user ko dobara\n"
+        "`/deliver ORDER_ID`  → paid par bina codes wala order (restock ke baad) deliver\n"
     )
     await update.message.reply_text(msg, parse_mode="Markdown", reply_markup=admin_kb())
     context.user_data["state"] = None
@@ -67,7 +81,7 @@ async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     data = query.data
 
     if data == "admin_stock":
-        await query.edit_message_text(stock_text(), parse_mode="Markdown", reply_markup=admin_kb())
+        await query.edit_message_text(catalog.stock_text(), parse_mode="Markdown", reply_markup=admin_kb())
         return
 
     if data == "admin_orders":
@@ -87,11 +101,14 @@ async def admin_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if data.startswith("admin_add_"):
         denom = int(data.split("_")[-1])
+        if not catalog.is_denom(denom):
+            return
         context.user_data["state"] = f"admin_add_{denom}"
         await query.edit_message_text(
             f"Send voucher code(s) for ₹{denom}.\n"
             "• One code per line OR\n"
-            "• Comma separated codes\n\n"
+            "• Comma separated codes OR\n"
+            "• Upload a .txt / .csv file (badi supplier lists)\n\n"
             "Example:\n`CODE1`\n`CODE2`\n`CODE3`",
             parse_mode="Markdown",
         )
@@ -109,15 +126,21 @@ async def admin_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # add vouchers flow
     if state and state.startswith("admin_add_"):
         denom = int(state.split("_")[-1])
-        raw = text.replace("\n", ",")
-        codes = [c.strip() for c in raw.split(",") if c.strip()]
+        codes = split_codes(text)
         if not codes:
             await update.message.reply_text("No codes found. Please send again.")
             return
 
-        add_vouchers(denom, codes)
+        dupes = await add_vouchers_unique_async(denom, codes)
+        msg = f"✅ Added {len(codes) - len(dupes)} voucher(s) for ₹{denom}.\n"
+        if dupes:
+            shown = "\n".join(f"`{c}`" for c in dupes[:voucher_import.SHOW_DUPLICATES])
+            more = len(dupes) - voucher_import.SHOW_DUPLICATES
+            msg += f"⚠ {len(dupes)} duplicate(s) rejected (already in stock or sold):\n{shown}\n"
+            if more > 0:
+                msg += f"... aur {more}\n"
         await update.message.reply_text(
-            f"✅ Added {len(codes)} voucher(s) for ₹{denom}.\n\n" + stock_text(),
+            msg + "\n" + catalog.stock_text(),
             parse_mode="Markdown",
             reply_markup=admin_kb(),
         )
@@ -125,6 +148,35 @@ async def admin_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
 
+async def admin_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    if user.id != ADMIN_ID:
+        return
+
+    state = context.user_data.get("state")
+    if not (state and state.startswith("admin_add_")):
+        await update.message.reply_text(
+            "Pehle ➕ Add button se denomination chuno, phir file bhejo.", reply_markup=admin_kb()
+        )
+        return
+
+    denom = int(state.split("_")[-1])
+    doc = update.message.document
+    if doc.file_size and doc.file_size > IMPORT_MAX_BYTES:
+        await update.message.reply_text(
+            f"❌ File too large (max {IMPORT_MAX_BYTES // (1024 * 1024)} MB). Split it and send again."
+        )
+        return
+
+    if voucher_import.is_running(denom):
+        await update.message.reply_text(f"⏳ An import for ₹{denom} is already running. Please wait.")
+        return
+    context.user_data["state"] = None
+    await update.message.reply_text(f"📥 Import started for ₹{denom}. Live progress below.")
+    # download + parse + batches background me - handler turant free
+    voucher_import.start(context.application, doc, denom, update.effective_chat.id)
+
+
 async def setprice_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     if user.id != ADMIN_ID:
@@ -140,14 +192,17 @@ async def setprice_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except ValueError:
         await update.message.reply_text("Invalid format. Example: /setprice 2000 80")
         return
+    if not catalog.is_denom(denom):
+        await update.message.reply_text(
+            "Unknown denomination. Available: " + ", ".join(str(d) for d in DENOMINATIONS)
+        )
+        return
 
-    set_price(denom, price)
+    await set_price_async(denom, price)
     await update.message.reply_text(
         f"✅ Price for ₹{denom} set to ₹{price:.2f}\n"
         f"Current:\n"
-        f"• ₹1000 → ₹{get_price(1000):.2f}\n"
-        f"• ₹2000 → ₹{get_price(2000):.2f}\n"
-        f"• ₹4000 → ₹{get_price(4000):.2f}"
+        f"{catalog.price_lines()}"
     )
 
 
@@ -161,16 +216,95 @@ async def broadcast_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     msg = "💥 *Shopping Alert*\n\n" + " ".join(context.args)
-    users = get_users()
-    count = 0
-    for uid in users:
-        try:
-            await context.bot.send_message(chat_id=uid, text=msg, parse_mode="Markdown")
-            count += 1
-        except Exception as e:
-            logger.error(f"Broadcast error for {uid}: {e}")
+    # background job - ye handler turant free ho jata hai
+    if not broadcast.start(context.application, msg, update.effective_chat.id):
+        await update.message.reply_text("⏳ A broadcast is already running. Please wait for it to finish.")
+        return
+
+    await update.message.reply_text(
+        f"📣 Broadcast started for {len(get_users())} users. Live progress below."
+    )
+
+
+async def lookup_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    if user.id != ADMIN_ID:
+        return
+
+    if not context.args:
+        await update.message.reply_text("Usage: /lookup CODE [CODE2 ...]")
+        return
+
+    lines = []
+    for code in context.args[:10]:
+        code = code.replace("`", "")
+        info = await sold_info_async(code)
+        if info is None:
+            lines.append(f"❔ `{code}` - not sold (ledger me nahi)")
+            continue
+        order = await get_order_async(info["order_id"]) or {}
+        # naam / username user ke hain (`_` / `*` aam hain) - Markdown escape
+        lines.append(
+            f"✅ `{code}`\n"
+            f"Order: `{info['order_id']}` ({escape_markdown(str(order.get('status', '?')))})\n"
+            f"User: {escape_markdown(str(order.get('first_name')))} "
+            f"(@{escape_markdown(str(order.get('username')))}) id `{info['user_id']}`\n"
+            f"Voucher: ₹{info['denom']}\n"
+            f"Delivered: {info['delivered_at']}"
+        )
+    await update.message.reply_text("\n\n".join(lines), parse_mode="Markdown")
+
+
+async def resend_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    if user.id != ADMIN_ID:
+        return
+
+    if len(context.args) != 1:
+        await update.message.reply_text("Usage: /resend ORDER_ID")
+        return
+
+    order_id = context.args[0]
+    result = await delivery.resend_order(context.bot, order_id)
+    if result == "completed":
+        await update.message.reply_text(f"✅ Codes of {order_id} sent to the user again.")
+    elif result == "in_progress":
+        await update.message.reply_text(f"⏳ {order_id} is being delivered right now. Try again after it finishes.")
+    elif result == "delivery_failed":
+        await update.message.reply_text(f"❌ Sending {order_id} failed again (see logs).")
+    else:
+        await update.message.reply_text(f"Order {order_id} is not a completed order ({result}).")
+
+
+async def deliver_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Payment ho chuka tha par codes nahi mile - stock khatam (paid_no_stock,
+    restock ke baad) ya claim ke baad ruka hua "paid" order."""
+    user = update.effective_user
+    if user.id != ADMIN_ID:
+        return
+
+    if len(context.args) != 1:
+        await update.message.reply_text("Usage: /deliver ORDER_ID")
+        return
+
+    order_id = context.args[0]
+    result = await fulfilment.fulfil_order(context.bot, order_id, from_statuses=RECOVERABLE_STATUSES)
+    if result == "completed":
+        await update.message.reply_text(f"✅ {order_id} delivered to the user.")
+    elif result == "paid_no_stock":
+        await update.message.reply_text(f"❌ Still not enough stock for {order_id}. Add vouchers and retry.")
+    elif result == "delivery_failed":
+        await update.message.reply_text(f"❌ Codes assigned to {order_id} but sending failed. Retry with /resend {order_id}")
+    else:
+        await update.message.reply_text(f"Order {order_id} is not waiting for codes ({result}).")
+
+
+async def metrics_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    if user.id != ADMIN_ID:
+        return
 
-    await update.message.reply_text(f"Broadcast sent to {count} users.")
+    await update.message.reply_text(metrics.summary_text())
 
 
 def get_admin_handlers():
@@ -178,6 +312,11 @@ def get_admin_handlers():
         CommandHandler("admin", admin_command),
         CommandHandler("setprice", setprice_cmd),
         CommandHandler("broadcast", broadcast_cmd),
+        CommandHandler("metrics", metrics_cmd),
+        CommandHandler("lookup", lookup_cmd),
+        CommandHandler("resend", resend_cmd),
+        CommandHandler("deliver", deliver_cmd),
         CallbackQueryHandler(admin_callback, pattern="^admin_"),
         MessageHandler(filters.TEXT & ~filters.COMMAND, admin_text),
+        MessageHandler(filters.Document.ALL, admin_document),
     ]
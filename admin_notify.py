@@ -0,0 +1,130 @@
+# admin_notify.py
+#
+# ADMIN_ID ko jaane wale notifications. Sale ke time har order pe alag
+# message = minute me sainkdo pings; isliye routine events (completed
+# orders, Pay0 unknown status, tickets) buffer hote hain aur har
+# ADMIN_DIGEST_SECONDS me ek digest jata hai - denomination-wise count,
+# total revenue aur order IDs. Urgent events (payment ho gaya par stock /
+# delivery nahi) turant jaate hain.
+#
+# Digest bhi 4096 char limit ke andar kam se kam messages me pack hota hai
+# aur outbox ki NOTIFY priority se jata hai. pack() line nahi todta - ticket
+# ki limit se lambi line yahin pehle tukdon me.
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+import outbox
+from config import ADMIN_DIGEST_SECONDS, ADMIN_ID, DELIVERY_MESSAGE_LIMIT
+from delivery import pack
+
+logger = logging.getLogger(__name__)
+
+# order IDs ek line me itne (digest compact rahe)
+_IDS_PER_LINE = 8
+
+_completed: List[Dict[str, Any]] = []
+_unknown: List[str] = []
+_tickets: List[str] = []
+_bot = None
+_timer: Optional[asyncio.TimerHandle] = None
+
+
+def urgent(bot, text: str, **kwargs) -> None:
+    """Turant admin ko (digest ka wait nahi)."""
+    outbox.notify(bot, ADMIN_ID, text, **kwargs)
+
+
+def order_completed(bot, order: Dict[str, Any]) -> None:
+    _completed.append(
+        {
+            "order_id": order["order_id"],
+            "denom": order["denom"],
+            "qty": order["qty"],
+            "total": float(order.get("total") or 0),
+        }
+    )
+    _schedule(bot)
+
+
+def pay0_unknown(bot, order_id: str) -> None:
+    _unknown.append(order_id)
+    _schedule(bot)
+
+
+def ticket(bot, text: str) -> None:
+    _tickets.append(text)
+    _schedule(bot)
+
+
+def _schedule(bot) -> None:
+    global _bot, _timer
+    _bot = bot
+    if _timer is None:
+        # window ka pehla event timer shuru karta hai
+        _timer = asyncio.get_running_loop().call_later(ADMIN_DIGEST_SECONDS, flush)
+
+
+def _split_long(line: str, limit: int = DELIVERY_MESSAGE_LIMIT) -> List[str]:
+    """limit se lambi line ke tukde. Telegram UTF-16 units ginta hai -
+    emoji (BMP ke bahar) 2."""
+    chunks: List[str] = []
+    current: List[str] = []
+    width = 0
+    for ch in line:
+        w = 2 if ord(ch) > 0xFFFF else 1
+        if width + w > limit:
+            chunks.append("".join(current))
+            current, width = [], 0
+        current.append(ch)
+        width += w
+    chunks.append("".join(current))
+    return chunks
+
+
+def _id_lines(ids: List[str]) -> List[str]:
+    return [", ".join(ids[i:i + _IDS_PER_LINE]) for i in range(0, len(ids), _IDS_PER_LINE)]
+
+
+def _digest_lines() -> List[str]:
+    lines: List[str] = []
+    if _completed:
+        by_denom: Dict[int, List[int]] = {}
+        for o in _completed:
+            row = by_denom.setdefault(o["denom"], [0, 0])
+            row[0] += 1
+            row[1] += o["qty"]
+        revenue = sum(o["total"] for o in _completed)
+        lines.append(f"✅ Completed: {len(_completed)} order(s), revenue ₹{revenue:.2f}")
+        for denom in sorted(by_denom):
+            orders, codes = by_denom[denom]
+            lines.append(f"  ₹{denom}: {orders} order(s), {codes} code(s)")
+        lines.append("Order IDs:")
+        lines.extend(_id_lines([o["order_id"] for o in _completed]))
+    if _unknown:
+        lines.append("")
+        lines.append(f"⚠ Pay0 status unknown/error: {len(_unknown)}")
+        lines.extend(_id_lines(_unknown))
+    for i, text in enumerate(_tickets, 1):
+        lines.append("")
+        lines.append(f"🆕 Ticket {i}/{len(_tickets)}")
+        for line in text.splitlines():
+            lines.extend(_split_long(line))
+    return lines
+
+
+def flush() -> None:
+    """Buffer ka digest abhi bhej do (timer se, aur shutdown pe)."""
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+        _timer = None
+    if _bot is None or not (_completed or _unknown or _tickets):
+        return
+    lines = _digest_lines()
+    _completed.clear()
+    _unknown.clear()
+    _tickets.clear()
+    for text in pack(f"📋 Admin digest (last {ADMIN_DIGEST_SECONDS}s)\n", lines):
+        outbox.notify(_bot, ADMIN_ID, text)
@@ -0,0 +1,343 @@
+# bench.py
+#
+# Handler-level load benchmark. Asli handlers (user's.py, Admin.py) ko
+# synthetic Update / CallbackQuery objects se chalata hai - Telegram ki
+# jagah recording fake bot, Pay0 ki jagah local FakePay0 (latency ke saath).
+# Har handler ki p50/p95/p99 latency aur har scenario ka overall ops/s
+# bench_output.txt me.
+#
+#   python bench.py --buyers 200 --browse 5000 --import-codes 20000 --pay0-latency 0.05
+#
+# Webhook mode me chal rahe bot ke local endpoint pe seedha Update JSON POST
+# karke ingestion latency bhi naap sakte hain:
+#
+#   python bench.py --webhook-url http://127.0.0.1:8443/telegram --webhook-updates 5000
+#
+# Data files ek temp directory me bante hain, asli data.json ko haath nahi lagta.
+
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_msg_ids = itertools.count(1)
+
+
+# ---------- FAKE TELEGRAM ----------
+
+class FakeBot:
+    """Bot API ki jagah - har call record hoti hai, optional latency ke saath."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sent: List[Dict[str, Any]] = []
+
+    async def _call(self, method: str, **kwargs) -> "FakeMessage":
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.sent.append(dict(kwargs, method=method))
+        return FakeMessage(self, kwargs.get("chat_id"), kwargs.get("text", ""))
+
+    async def send_message(self, chat_id, text, **kwargs):
+        return await self._call("send_message", chat_id=chat_id, text=text, **kwargs)
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        return await self._call("edit_message_text", chat_id=chat_id, text=text, **kwargs)
+
+    async def send_document(self, chat_id, document, **kwargs):
+        return await self._call("send_document", chat_id=chat_id, **kwargs)
+
+
+class FakeUser:
+    def __init__(self, user_id: int, first_name: str = "Bench", username: Optional[str] = None):
+        self.id = user_id
+        self.first_name = first_name
+        self.username = username or f"bench{user_id}"
+
+
+class FakeChat:
+    def __init__(self, chat_id: int):
+        self.id = chat_id
+
+
+class FakeMessage:
+    def __init__(self, bot: FakeBot, chat_id: int, text: str = ""):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.text = text
+        self.message_id = next(_msg_ids)
+        self.document = None
+
+    async def reply_text(self, text, **kwargs):
+        return await self.bot.send_message(chat_id=self.chat_id, text=text, **kwargs)
+
+
+class FakeCallbackQuery:
+    def __init__(self, bot: FakeBot, user: FakeUser, data: str):
+        self.bot = bot
+        self.from_user = user
+        self.data = data
+        self.message = FakeMessage(bot, user.id)
+
+    async def answer(self, *args, **kwargs):
+        return True
+
+    async def edit_message_text(self, text, **kwargs):
+        return await self.bot.edit_message_text(text, chat_id=self.from_user.id, **kwargs)
+
+
+class FakeUpdate:
+    def __init__(self, user: FakeUser, message=None, callback_query=None):
+        self.effective_user = user
+        self.effective_chat = FakeChat(user.id)
+        self.message = message
+        self.callback_query = callback_query
+
+
+class FakeApp:
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+
+    def create_task(self, coro):
+        return asyncio.get_running_loop().create_task(coro)
+
+
+class FakeContext:
+    def __init__(self, app: FakeApp, user_data: Dict[str, Any], args: Optional[List[str]] = None):
+        self.application = app
+        self.bot = app.bot
+        self.user_data = user_data
+        self.args = args or []
+
+
+# ---------- HARNESS ----------
+
+def _load(name: str, filename: str):
+    # handler files ke naam (user's.py) import-friendly nahi - path se load
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class Bench:
+    def __init__(self, app: FakeApp):
+        self.app = app
+        self.user_data: Dict[int, Dict[str, Any]] = defaultdict(dict)
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.wall: Dict[str, float] = {}
+
+    async def _timed(self, key: str, handler, update: FakeUpdate, args=None) -> None:
+        ctx = FakeContext(self.app, self.user_data[update.effective_user.id], args)
+        t = time.perf_counter()
+        await handler(update, ctx)
+        self.samples[key].append(time.perf_counter() - t)
+
+    async def text(self, key: str, handler, user: FakeUser, text: str) -> None:
+        msg = FakeMessage(self.app.bot, user.id, text)
+        await self._timed(key, handler, FakeUpdate(user, message=msg))
+
+    async def command(self, key: str, handler, user: FakeUser, args: List[str]) -> None:
+        msg = FakeMessage(self.app.bot, user.id, "/" + " ".join(args))
+        await self._timed(key, handler, FakeUpdate(user, message=msg), args)
+
+    async def button(self, key: str, handler, user: FakeUser, data: str) -> None:
+        query = FakeCallbackQuery(self.app.bot, user, data)
+        await self._timed(key, handler, FakeUpdate(user, callback_query=query))
+
+    async def scenario(self, name: str, coros) -> None:
+        t = time.perf_counter()
+        await asyncio.gather(*coros)
+        self.wall[name] = time.perf_counter() - t
+
+
+def _pct(sorted_vals: List[float], p: float) -> float:
+    # nearest-rank percentile
+    idx = max(0, min(len(sorted_vals) - 1, int(round(p / 100.0 * len(sorted_vals))) - 1))
+    return sorted_vals[idx]
+
+
+def report(bench: Bench, args) -> str:
+    lines = [
+        "# Voucher bot handler benchmark",
+        f"# backend={args.backend} buyers={args.buyers} browse={args.browse} "
+        f"import_codes={args.import_codes} pay0_latency={args.pay0_latency}s "
+        f"tg_latency={args.tg_latency}s",
+        "",
+        f"{'handler':<44} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+    ]
+    for key in sorted(bench.samples):
+        vals = sorted(bench.samples[key])
+        # throughput sirf scenario level pe (neeche) - handlers concurrent
+        # chalte hain, ek handler ka apna ops/s wall time se nahi nikalta
+        lines.append(
+            f"{key:<44} {len(vals):>6} "
+            f"{_pct(vals, 50) * 1000:>9.2f} {_pct(vals, 95) * 1000:>9.2f} "
+            f"{_pct(vals, 99) * 1000:>9.2f} {vals[-1] * 1000:>9.2f}"
+        )
+    lines.append("")
+    for name, wall in bench.wall.items():
+        n = sum(len(v) for k, v in bench.samples.items() if k.split("/", 1)[0] == name)
+        lines.append(f"scenario {name}: {wall:.3f}s wall, {n} ops, {n / wall:.1f} ops/s overall")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- SCENARIOS ----------
+
+async def admin_import(bench: Bench, admin, admin_user: FakeUser, denoms: List[int], n: int, batch: int) -> None:
+    """Admin bade batches me codes add karta hai (admin_add_X button + text)."""
+    async def one(denom: int, start: int, count: int) -> None:
+        await bench.button("import/admin_callback:add", admin.admin_callback, admin_user, f"admin_add_{denom}")
+        codes = "\n".join(f"B{denom}-{i:08d}" for i in range(start, start + count))
+        await bench.text("import/admin_text:codes", admin.admin_text, admin_user, codes)
+
+    # ek hi admin hai (user_data shared) - batches line me
+    async def run() -> None:
+        for denom in denoms:
+            for start in range(0, n, batch):
+                await one(denom, start, min(batch, n - start))
+        await bench.button("import/admin_callback:stock", admin.admin_callback, admin_user, "admin_stock")
+
+    await bench.scenario("import", [run()])
+
+
+async def browse_storm(bench: Bench, user_panel, n: int, denoms: List[int]) -> None:
+    """Bahut saare users ek saath stock / menu / denom dekhte hain."""
+    async def one(i: int) -> None:
+        user = FakeUser(500000 + i)
+        await bench.text("browse/handle_text:stock", user_panel.handle_text, user, "📦 Available Stock")
+        await bench.text("browse/handle_text:buy", user_panel.handle_text, user, "🛒 Buy Vouchers")
+        denom = denoms[i % len(denoms)]
+        await bench.button("browse/callback_buttons:denom", user_panel.callback_buttons, user, f"denom_{denom}")
+        await bench.button("browse/callback_buttons:cancel", user_panel.callback_buttons, user, "cancel")
+
+    await bench.scenario("browse", [one(i) for i in range(n)])
+
+
+async def buyers(bench: Bench, user_panel, fake, n: int, denoms: List[int]) -> None:
+    """N buyers poora flow: /start -> denom -> qty -> agree -> pay -> I Have Paid."""
+    async def one(i: int) -> None:
+        user = FakeUser(100000 + i)
+        ud = bench.user_data[user.id]
+        await bench.command("buyers/start", user_panel.start, user, [])
+        await bench.text("buyers/handle_text:buy", user_panel.handle_text, user, "🛒 Buy Vouchers")
+        await bench.button("buyers/callback_buttons:denom", user_panel.callback_buttons, user, f"denom_{denoms[i % len(denoms)]}")
+        await bench.text("buyers/handle_text:qty", user_panel.handle_text, user, str(1 + i % 3))
+        await bench.button("buyers/callback_buttons:agree", user_panel.callback_buttons, user, "agree")
+        order_id = ud.get("order_id")
+        if not order_id:
+            return  # stock khatam / paylink error
+        await fake.pay(order_id)
+        await bench.button("buyers/callback_buttons:paid", user_panel.callback_buttons, user, "paid")
+
+    await bench.scenario("buyers", [one(i) for i in range(n)])
+
+
+def update_json(update_id: int, user_id: int, text: str) -> Dict[str, Any]:
+    """Telegram jaisa minimal message Update (webhook endpoint ke liye)."""
+    user = {"id": user_id, "is_bot": False, "first_name": "Bench", "username": f"bench{user_id}"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private", "first_name": "Bench"},
+            "from": user,
+            "text": text,
+        },
+    }
+
+
+async def webhook_flood(bench: Bench, url: str, secret: str, n: int, concurrency: int) -> None:
+    """Local webhook endpoint pe n updates POST - accept (HTTP 200) tak ka time."""
+    import httpx
+
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def one(i: int) -> None:
+            body = json.dumps(update_json(900000000 + i, 700000 + i % 1000, "📦 Available Stock"))
+            async with sem:
+                t = time.perf_counter()
+                resp = await client.post(url, content=body, headers=headers)
+                bench.samples[f"webhook/POST:{resp.status_code}"].append(time.perf_counter() - t)
+
+        await bench.scenario("webhook", [one(i) for i in range(n)])
+
+
+async def webhook_main(args) -> None:
+    bench = Bench(FakeApp(FakeBot()))
+    await webhook_flood(bench, args.webhook_url, args.webhook_secret, args.webhook_updates, args.webhook_concurrency)
+    text = report(bench, args)
+    with open(os.path.join(ROOT, args.output), "w", encoding="utf-8") as f:
+        f.write(text)
+    print(text)
+
+
+async def main(args) -> None:
+    # config imports se pehle - data files temp dir me, backend flag ke hisaab se
+    sys.path.insert(0, ROOT)
+    os.chdir(tempfile.mkdtemp(prefix="voucher-bench-"))
+    import config
+    config.STORAGE_BACKEND = args.backend
+
+    import data_store
+    import pay0_client
+    from fake_pay0 import FakePay0
+
+    user_panel = _load("user_panel", "user's.py")
+    admin = _load("admin_panel", "Admin.py")
+
+    fake = FakePay0(latency=args.pay0_latency)
+    await fake.start()
+    await pay0_client.set_base_url(fake.base_url)
+
+    bot = FakeBot(args.tg_latency)
+    bench = Bench(FakeApp(bot))
+    admin_user = FakeUser(config.ADMIN_ID, "Admin")
+    denoms = list(config.DENOMINATIONS)
+    try:
+        await admin_import(bench, admin, admin_user, denoms, args.import_codes, args.import_batch)
+        await browse_storm(bench, user_panel, args.browse, denoms)
+        await buyers(bench, user_panel, fake, args.buyers, denoms)
+        await data_store.flush()
+    finally:
+        await pay0_client.close()
+        await fake.stop()
+
+    text = report(bench, args)
+    text += f"bot calls recorded: {len(bot.sent)}\n"
+    with open(os.path.join(ROOT, args.output), "w", encoding="utf-8") as f:
+        f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Voucher bot handler load benchmark")
+    parser.add_argument("--backend", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--buyers", type=int, default=100, help="concurrent buyers (full purchase flow)")
+    parser.add_argument("--browse", type=int, default=2000, help="concurrent users browsing stock/menus")
+    parser.add_argument("--import-codes", type=int, default=5000, help="codes per denomination to import")
+    parser.add_argument("--import-batch", type=int, default=1000, help="codes per admin message")
+    parser.add_argument("--pay0-latency", type=float, default=0.05, help="fake Pay0 response delay (s)")
+    parser.add_argument("--tg-latency", type=float, default=0.0, help="fake Telegram API delay (s)")
+    parser.add_argument("--webhook-url", default="", help="running bot ka webhook endpoint - sirf ye flood chalega")
+    parser.add_argument("--webhook-secret", default=os.environ.get("WEBHOOK_SECRET", ""))
+    parser.add_argument("--webhook-updates", type=int, default=2000)
+    parser.add_argument("--webhook-concurrency", type=int, default=40)
+    parser.add_argument("--output", default="bench_output.txt")
+    args = parser.parse_args()
+    asyncio.run(webhook_main(args) if args.webhook_url else main(args))
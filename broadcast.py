@@ -0,0 +1,143 @@
+# broadcast.py
+#
+# Background broadcast engine. Admin ka /broadcast turant return karta hai,
+# messages outbox ki sabse neechi priority pe jaate hain (delivery pehle).
+# Progress store me save hoti hai (restart pe wahi se resume), admin ko live
+# progress dikhta hai, aur jinhone bot block kiya wo users list se hat jaate hain.
+
+import asyncio
+import logging
+import time
+import uuid
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from telegram.error import BadRequest, Forbidden, TelegramError
+
+import outbox
+from config import BROADCAST_CONCURRENCY, BROADCAST_PROGRESS_SECONDS
+from data_store import get_broadcast, get_users_async, remove_users_async, set_broadcast_async
+
+logger = logging.getLogger(__name__)
+
+_task: Optional[asyncio.Task] = None
+
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def start(app, text: str, admin_chat_id: int) -> bool:
+    """Naya broadcast background me shuru karo. Pehle se chal raha ho to False."""
+    global _task
+    if is_running():
+        return False
+    state = {
+        "id": uuid.uuid4().hex[:8],
+        "text": text,
+        "chat_id": admin_chat_id,
+        "message_id": None,
+        "cursor": None,       # sorted user_ids me aakhri poora hua user
+        "total": None,        # _begin me (store call loop ke bahar)
+        "sent": 0,
+        "failed": 0,
+        "pruned": 0,
+        "started_at": datetime.utcnow().isoformat(),
+    }
+    # task turant - is_running() isi pal se True, doosra /broadcast race nahi karta
+    _task = app.create_task(_begin(app.bot, state))
+    return True
+
+
+async def _begin(bot, state: Dict[str, Any]) -> None:
+    state["total"] = len(await get_users_async())
+    await set_broadcast_async(state)
+    await _run(bot, state)
+
+
+def resume(app) -> None:
+    """Startup pe adhoora broadcast wahi se chalu karo."""
+    global _task
+    state = get_broadcast()
+    if state and not is_running():
+        logger.info(f"Resuming broadcast {state['id']} after user {state['cursor']}")
+        _task = app.create_task(_run(app.bot, state))
+
+
+async def _send_one(bot, chat_id: int, text: str) -> str:
+    # sabse neechi priority - delivery / notifications beech me pehle jaate hain;
+    # rate limit aur RetryAfter retry outbox me
+    try:
+        await outbox.send(bot, "send_message", outbox.BROADCAST, chat_id=chat_id, text=text, parse_mode="Markdown")
+        return "sent"
+    except Forbidden:
+        return "blocked"
+    except BadRequest as e:
+        if "chat not found" in str(e).lower():
+            return "blocked"
+        logger.error(f"Broadcast error for {chat_id}: {e}")
+        return "failed"
+    except TelegramError as e:
+        logger.error(f"Broadcast error for {chat_id}: {e}")
+        return "failed"
+
+
+def _progress_text(state: Dict[str, Any], done: bool) -> str:
+    handled = state["sent"] + state["failed"] + state["pruned"]
+    head = "✅ *Broadcast finished*" if done else "📣 *Broadcast running*"
+    return (
+        f"{head}\n\n"
+        f"Progress: {handled}/{state['total']}\n"
+        f"Sent: {state['sent']}\n"
+        f"Failed: {state['failed']}\n"
+        f"Removed (blocked bot): {state['pruned']}"
+    )
+
+
+async def _report(bot, state: Dict[str, Any], done: bool = False) -> None:
+    text = _progress_text(state, done)
+    try:
+        if state["message_id"] is None:
+            msg = await bot.send_message(chat_id=state["chat_id"], text=text, parse_mode="Markdown")
+            state["message_id"] = msg.message_id
+        else:
+            await bot.edit_message_text(
+                chat_id=state["chat_id"],
+                message_id=state["message_id"],
+                text=text,
+                parse_mode="Markdown",
+            )
+    except TelegramError as e:
+        logger.warning(f"Broadcast progress update failed: {e}")
+
+
+async def _run(bot, state: Dict[str, Any]) -> None:
+    users = sorted(await get_users_async())
+    start_at = 0 if state["cursor"] is None else bisect_right(users, state["cursor"])
+    await _report(bot, state)
+    last_report = time.monotonic()
+
+    for i in range(start_at, len(users), BROADCAST_CONCURRENCY):
+        chunk = users[i:i + BROADCAST_CONCURRENCY]
+        results = await asyncio.gather(*(_send_one(bot, uid, state["text"]) for uid in chunk))
+
+        blocked = [uid for uid, r in zip(chunk, results) if r == "blocked"]
+        if blocked:
+            await remove_users_async(blocked)
+        state["sent"] += results.count("sent")
+        state["failed"] += results.count("failed")
+        state["pruned"] += len(blocked)
+        state["cursor"] = chunk[-1]
+        await set_broadcast_async(state)  # chunk khatam - restart pe yahin se
+
+        if time.monotonic() - last_report >= BROADCAST_PROGRESS_SECONDS:
+            await _report(bot, state)
+            last_report = time.monotonic()
+
+    await set_broadcast_async(None)
+    await _report(bot, state, done=True)
+    logger.info(
+        f"Broadcast {state['id']} done: sent={state['sent']} failed={state['failed']} "
+        f"pruned={state['pruned']}"
+    )
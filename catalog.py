@@ -0,0 +1,75 @@
+# catalog.py
+#
+# Denomination catalog (config.DENOMINATIONS) ke texts ka render cache.
+# Store ka catalog_version() sirf stock / hold / price badalne pe badalta
+# hai; tab tak "Available Stock", pricing aur denom selection ke texts
+# seedhe dict se milte hain - har click pe count / format dobara nahi.
+
+from typing import Dict, Optional
+
+import metrics
+from config import DENOMINATIONS
+from data_store import (
+    available_count,
+    catalog_version,
+    get_price,
+    held_count,
+    stock_text as render_stock,
+)
+
+DENOM_SET = frozenset(DENOMINATIONS)
+
+_version: Optional[int] = None
+_texts: Dict[str, str] = {}
+
+
+def _denom_text(denom: int) -> str:
+    return (
+        f"💸 *₹{denom} Voucher*\n"
+        f"You selected ₹{denom} vouchers.\n"
+        f"Available vouchers: {available_count(denom)}\n\n"
+        f"Pricing for ₹{denom} vouchers:\n"
+        f"• All quantities: ₹{get_price(denom):.1f} each\n\n"
+        "🔢 Enter quantity (min 1, max 20):"
+    )
+
+
+def _fresh() -> Dict[str, str]:
+    global _version, _texts
+    v = catalog_version()
+    if v != _version:
+        # version pehle padha - render ke beech badla to agli call phir banayegi
+        texts = {
+            "stock": render_stock(),
+            "prices": "\n".join(f"• ₹{d} → ₹{get_price(d):.2f}" for d in DENOMINATIONS),
+        }
+        for d in DENOMINATIONS:
+            texts[f"denom_{d}"] = _denom_text(d)
+        _texts, _version = texts, v
+    return _texts
+
+
+def is_denom(denom: int) -> bool:
+    return denom in DENOM_SET
+
+
+def stock_text() -> str:
+    return _fresh()["stock"]
+
+
+def price_lines() -> str:
+    """"• ₹1000 → ₹40.00" jaisi ek line har denomination ki."""
+    return _fresh()["prices"]
+
+
+def denom_text(denom: int) -> str:
+    return _fresh()[f"denom_{denom}"]
+
+
+# inventory gauges - scrape / /metrics ke time hi padhe jaate hain
+metrics.gauge_callback(
+    "vouchers_available", lambda: {(("denom", str(d)),): available_count(d) for d in DENOMINATIONS}
+)
+metrics.gauge_callback(
+    "vouchers_reserved", lambda: {(("denom", str(d)),): held_count(d) for d in DENOMINATIONS}
+)
@@ -0,0 +1,37 @@
+# codes.py
+#
+# Voucher code helpers jo dono stores aur importer share karte hain: admin
+# ke text / uploaded file se codes nikalna, aur dedup index ke liye code ka
+# 64-bit hash (index me poora code nahi, sirf 8 bytes).
+
+import hashlib
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+def code_hash(code: str) -> int:
+    """Signed 64-bit hash (SQLite INTEGER me seedha fit). 1M codes pe bhi
+    collision ka chance ~1e-8 - collision ho to naya code duplicate dikhega,
+    stock me galat code kabhi nahi jayega."""
+    digest = hashlib.blake2b(code.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def order_codes(order: Dict[str, Any]) -> List[str]:
+    """Order ke delivered codes. Purane (baseline) orders me ek hi
+    `voucher_code` field tha, naye me `voucher_codes` list - dono."""
+    codes = list(order.get("voucher_codes") or ())
+    legacy = order.get("voucher_code")
+    if legacy and legacy not in codes:
+        codes.append(legacy)
+    return codes
+
+
+def split_codes(text: str) -> List[str]:
+    """Comma / newline se alag codes (chat paste wala format)."""
+    return [c.strip().strip('"') for c in text.replace("\n", ",").split(",") if c.strip().strip('"')]
+
+
+def iter_codes(lines: Iterable[str]) -> Iterator[str]:
+    """File ko line-by-line padhte hue codes - poori file memory me nahi."""
+    for line in lines:
+        yield from split_codes(line)
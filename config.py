@@ -1,5 +1,7 @@
 # config.py
 
+import os
+
 # ==== BASIC BOT CONFIG ====
 
 # 1) Telegram Bot Token
@@ -14,5 +16,157 @@ PAY0_API_KEY = "e5850c2d9bdb7e68e5c8186ac5b6d98f"
 # 4) Payment ke baad user jahan redirect hoga
 PAY0_REDIRECT_URL = "https://t.me/coupanestore_bot"  # yahan apna bot username dal sakte ho
 
+# Pay0 payment callback (webhook) receiver - bot ke saath hi chalta hai.
+# Pay0 dashboard me callback URL = http(s)://<aapka-host>:<port><PATH> do.
+PAY0_WEBHOOK_ENABLED = False
+PAY0_WEBHOOK_HOST = "0.0.0.0"
+PAY0_WEBHOOK_PORT = 8080
+PAY0_WEBHOOK_PATH = "/pay0/callback"
+# zaroori - khali ho to receiver start hi nahi hota (bina signature ke koi bhi POST kar sakta)
+PAY0_WEBHOOK_SECRET = os.environ.get("PAY0_WEBHOOK_SECRET", "")
+
+# 5) Pay0 API base URL - tests me local fake server pe point karne ke liye
+#    env PAY0_BASE_URL=http://127.0.0.1:8099 set kar do
+PAY0_BASE_URL = os.environ.get("PAY0_BASE_URL", "https://pay0.shop")
+
+# Pay0 HTTP client: timeouts (seconds), connection pool, ek saath max calls
+PAY0_CONNECT_TIMEOUT = 5.0
+PAY0_READ_TIMEOUT = 15.0
+PAY0_MAX_CONNECTIONS = 20
+PAY0_MAX_CONCURRENCY = 10
+
+# Default prices (admin panel se change ho sakte)
+DEFAULT_PRICES = {
+    "1000": 40.0,
+    "2000": 70.0,
+    "4000": 140.0,
+}
+# Denomination catalog - menus, stock text aur keyboards isi se bante hain.
+# Naya denomination = DEFAULT_PRICES me ek line.
+DENOMINATIONS = [int(d) for d in DEFAULT_PRICES]
+
 # Data JSON file
 DATA_FILE = "data.json"
+
+# Append-only journal: har change yahan ek line, DATA_FILE sirf snapshot hai
+JOURNAL_FILE = DATA_FILE + ".journal"
+
+# Journal itna bada ho jaye to background me naya snapshot bana ke journal reset
+JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024
+# snapshot body gzip me (chhoti file, thoda zyada CPU)
+SNAPSHOT_COMPRESS = False
+
+# Final orders (completed / failed) compaction pe yahan archive segments me
+# jaate hain; memory me sirf open orders + aakhri RECENT_ORDERS rehte hain
+ARCHIVE_DIR = "archive"
+RECENT_ORDERS = 100
+# itne din purane archived orders mahine-wise gzip parts me rotate
+ARCHIVE_ROTATE_DAYS = 30
+
+# Group commit: journal me likhna har FLUSH_INTERVAL seconds me ek baar (ya
+# FLUSH_MAX_PENDING changes jama hone pe) - har change pe disk write nahi
+FLUSH_INTERVAL = 0.5
+FLUSH_MAX_PENDING = 256
+# writer thread itne records se peeche ho to naye mutations rukte hain (back-pressure)
+WRITER_QUEUE_MAX = 10000
+
+# Storage backend: "json" (data.json + journal) ya "sqlite" (indexed tables)
+STORAGE_BACKEND = "json"
+
+# SQLite database file (sirf STORAGE_BACKEND = "sqlite" me). Pehli baar start
+# hone pe purana DATA_FILE + journal isme ek baar migrate ho jata hai.
+SQLITE_FILE = "data.db"
+# doosra worker process write lock pakde ho to itni der tak wait (seconds)
+SQLITE_BUSY_TIMEOUT = 10.0
+
+# Sold-code ledger (code -> order / user / delivery time). SQLite backend me
+# main db ki table; JSON backend me ye alag file.
+SOLD_LEDGER_FILE = "sold_codes.db"
+# Bloom filter (bike codes ka fast "nahi bika" check): capacity tak ~SOLD_BLOOM_ERROR
+# false positives, ~1.2 MB per million codes
+SOLD_BLOOM_CAPACITY = 2_000_000
+SOLD_BLOOM_ERROR = 0.01
+
+# "I Agree" ke baad vouchers itni der (seconds) user ke liye hold rehte hain
+RESERVATION_SECONDS = 5 * 60
+
+# context.user_data (cart / payment state) store me itne seconds me ek baar,
+# sirf badle hue users ka, ek batch me - restart ke baad flow wahi se chalu
+USER_STATE_FLUSH_SECONDS = 5
+
+# ==== DELIVERY ====
+# Codes itne chars ke messages me pack (Telegram limit 4096)
+DELIVERY_MESSAGE_LIMIT = 4096
+# isse zyada codes ho to messages ki jagah ek .txt file
+DELIVERY_DOCUMENT_THRESHOLD = 50
+
+# ==== PAYMENT RECONCILER ====
+# Background job jo pending orders ka Pay0 status khud check karta hai
+RECONCILE_INTERVAL = 10        # job kitne seconds me chale
+RECONCILE_BATCH = 20           # ek run me max kitne orders check hon
+RECONCILE_MIN_DELAY = 15       # naye order ko kitni der baad dobara check karein
+RECONCILE_MAX_DELAY = 300      # purane order ke checks ke beech max gap
+PAY0_RECHECK_SECONDS = 10      # "I Have Paid" baar-baar dabane pe itni der tak cached status
+ORDER_TTL_SECONDS = 30 * 60    # itne time tak payment na aaye to order "expired"
+# multi-worker: har worker itne seconds me apne hisse ke pending orders store se
+# dobara uthata hai (jis worker ne order banaya wo crash / restart ho gaya ho)
+RECONCILE_RESCAN_SECONDS = 60
+
+# ==== OUTBOUND QUEUE ====
+# Bot ke saare outgoing messages (delivery > notifications > broadcast) isi se
+OUTBOX_RATE = 25                  # msgs/sec sab chats mila ke (Telegram limit ~30), workers me bant-ta hai
+OUTBOX_CHAT_RATE = 1.0            # ek chat me msgs/sec
+OUTBOX_CHAT_BURST = 3             # ek chat me itne messages turant (delivery ke parts)
+OUTBOX_WORKERS = 8                # parallel Bot API calls
+OUTBOX_MAX_RETRIES = 4            # RetryAfter / network error pe
+OUTBOX_RETRY_BASE = 1.0           # network error backoff: 1s, 2s, 4s...
+OUTBOX_DRAIN_SECONDS = 10         # shutdown pe queue khaali hone ka max wait
+
+# ==== ADMIN NOTIFICATIONS ====
+# completed orders / Pay0 unknown / tickets admin ko itne seconds me ek digest
+# me; out-of-stock-after-payment jaise urgent alerts turant
+ADMIN_DIGEST_SECONDS = 60
+
+# ==== BROADCAST ====
+BROADCAST_CONCURRENCY = 50        # ek chunk me kitne users queue me
+BROADCAST_PROGRESS_SECONDS = 5    # admin ka progress message kitni der me update ho
+
+# ==== METRICS ====
+# Admin /metrics hamesha chalta hai; Prometheus scrape endpoint optional (local only)
+METRICS_ENABLED = False
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+METRICS_PATH = "/metrics"
+
+# ==== UPDATES: POLLING / WEBHOOK ====
+# "polling" (default, getUpdates) ya "webhook" (Telegram hamare HTTP server pe POST karta hai)
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+WEBHOOK_HOST = "0.0.0.0"
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = "/telegram"
+# public HTTPS URL jo Telegram ko setWebhook me diya jata hai (load balancer ka)
+# - khali ho to setWebhook skip, bahar se set karo
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")
+# X-Telegram-Bot-Api-Secret-Token - zaroori, khali ho to webhook mode start nahi
+# hota (warna koi bhi ADMIN_ID ke naam se update POST kar de)
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+# Telegram kitne parallel connections khole (setWebhook, 1-100) - server ka cap bhi yahi
+WEBHOOK_MAX_CONNECTIONS = 40
+# shutdown pe in-flight requests ke liye max wait (seconds)
+WEBHOOK_DRAIN_SECONDS = 10
+# ek saath kitne updates handlers me chal sakte hain (dono modes me)
+UPDATE_CONCURRENCY = 256
+
+# ==== WORKERS ====
+# supervisor.py itne bot processes chalata hai (sirf STORAGE_BACKEND = "sqlite"
+# + BOT_MODE = "webhook"; sab ek hi port share karte hain). Worker ko apna
+# number WORKER_ID env se milta hai.
+WORKERS = int(os.environ.get("WORKERS", "1"))
+WORKER_ID = int(os.environ.get("WORKER_ID", "0"))
+# crash hua worker itni der baad dobara start (seconds, har crash pe double, max 60)
+WORKER_RESTART_DELAY = 1.0
+
+# ==== VOUCHER IMPORT (admin file upload) ====
+IMPORT_BATCH = 2000                   # itne codes ek commit me
+IMPORT_PROGRESS_SECONDS = 3           # admin ka progress message kitni der me update ho
+IMPORT_MAX_BYTES = 20 * 1024 * 1024   # Bot API getFile ki limit
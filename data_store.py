@@ -1,35 +1,290 @@
 # data_store.py
 
+import asyncio
+import atexit
+import heapq
 import json
+import logging
 import os
-from typing import List, Dict, Any
-from config import DATA_FILE
-
-# Default prices (admin panel se change ho sakte)
-DEFAULT_PRICES = {
-    "1000": 40.0,
-    "2000": 70.0,
-    "4000": 140.0,
-}
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows - file lock nahi, ek hi process chalao
+    fcntl = None
+
+from config import (
+    ARCHIVE_ROTATE_DAYS,
+    DATA_FILE,
+    DEFAULT_PRICES,
+    DENOMINATIONS,
+    FLUSH_INTERVAL,
+    FLUSH_MAX_PENDING,
+    JOURNAL_FILE,
+    JOURNAL_COMPACT_BYTES,
+    RECENT_ORDERS,
+    SNAPSHOT_COMPRESS,
+    SOLD_LEDGER_FILE,
+    STORAGE_BACKEND,
+    WORKERS,
+    WRITER_QUEUE_MAX,
+)
+from codes import code_hash, order_codes
+import metrics
+from order_states import can_transition, claim_sources, is_terminal
+import order_archive
+import snapshot
+import sold_ledger
+
+logger = logging.getLogger(__name__)
+
+# compaction ke dauran purana journal yahan rehta hai jab tak snapshot likha na jaye
+OLD_JOURNAL_FILE = JOURNAL_FILE + ".old"
+# pichla achha snapshot + uske baad ka journal - naya snapshot kharab mile to
+PREV_DATA_FILE = DATA_FILE + ".prev"
+PREV_JOURNAL_FILE = JOURNAL_FILE + ".prev"
+# DATA poora process ki memory me hai - doosra process same files khole to
+# stock oversell aur data.json clobber; ye lock use rokta hai
+LOCK_FILE = DATA_FILE + ".lock"
 
 
 def _default_data() -> Dict[str, Any]:
     return {
-        "vouchers": {"1000": [], "2000": [], "4000": []},
-        "orders": [],        # list of dict
+        "vouchers": {str(d): deque() for d in DENOMINATIONS},
+        "orders": [],        # list of dict - sirf hot (open) orders, baaki archive me
         "users": [],         # list of telegram user_ids
         "prices": DEFAULT_PRICES.copy(),
+        "holds": {},         # order_id -> [denom, qty, expires_at]
+        "broadcast": None,   # chalu broadcast ki progress (restart pe resume)
+        "user_state": {},    # str(user_id) -> context.user_data (adhoora cart / payment)
     }
 
 
+# ---------- JOURNAL OPS ----------
+# Har mutation ek record hai: [seq, op, args]. Same function startup pe
+# replay ke time bhi chalta hai, isliye ye sirf `data` (aur hold index) ko
+# touch karte hain. Hold expiry journal me nahi jaati - expires_at se hi
+# pata chal jata hai, load ke baad expired holds apne aap hat jaate hain.
+
+# reservation index: denom -> held qty, aur (expires_at, order_id) min-heap
+_held: Dict[str, int] = {}
+_hold_heap: List[Tuple[float, str]] = []
+# order_id -> order dict (wahi object jo data["orders"] me hai)
+_orders_by_id: Dict[str, Dict[str, Any]] = {}
+# dedup index: har code jo kabhi stock me aaya ya bika, uska code_hash.
+# Pehli unique import pe banta hai (None = abhi nahi bana)
+_code_hashes: Optional[set] = None
+# aakhri RECENT_ORDERS orders (archived bhi) - list_orders ke liye
+_recent: deque = deque(maxlen=RECENT_ORDERS)
+# O(1) "user hai ya nahi" check
+_user_set: set = set()
+
+
+def _apply_add_user(data: Dict[str, Any], user_id: int) -> None:
+    if user_id not in _user_set:
+        _user_set.add(user_id)
+        data["users"].append(user_id)
+
+
+def _apply_remove_users(data: Dict[str, Any], user_ids: List[int]) -> None:
+    gone = set(user_ids) & _user_set
+    if gone:
+        _user_set.difference_update(gone)
+        data["users"] = [u for u in data["users"] if u not in gone]
+
+
+def _apply_set_broadcast(data: Dict[str, Any], state: Optional[Dict[str, Any]]) -> None:
+    data["broadcast"] = state
+
+
+def _apply_set_price(data: Dict[str, Any], denom: str, price: float) -> None:
+    data["prices"][denom] = price
+
+
+def _apply_add_vouchers(data: Dict[str, Any], denom: str, codes: List[str]) -> None:
+    data["vouchers"].setdefault(denom, deque()).extend(codes)
+    if _code_hashes is not None:
+        _code_hashes.update(code_hash(c) for c in codes)
+
+
+def _apply_pop_voucher(data: Dict[str, Any], denom: str) -> Optional[str]:
+    # purane journals ke liye; naye records pop_vouchers likhte hain
+    pool = data["vouchers"].get(denom)
+    if not pool:
+        return None
+    return pool.popleft()
+
+
+def _apply_pop_vouchers(data: Dict[str, Any], denom: str, n: int) -> Optional[List[str]]:
+    # all-or-nothing: n codes nahi hain to kuch mat nikalo
+    pool = data["vouchers"].get(denom)
+    if pool is None or len(pool) < n:
+        return None
+    return [pool.popleft() for _ in range(n)]
+
+
+def _apply_reserve(data: Dict[str, Any], order_id: str, denom: str, qty: int, expires_at: float) -> None:
+    data["holds"][order_id] = [denom, qty, expires_at]
+    _held[denom] = _held.get(denom, 0) + qty
+    heapq.heappush(_hold_heap, (expires_at, order_id))
+
+
+def _apply_release(data: Dict[str, Any], order_id: str) -> None:
+    hold = data["holds"].pop(order_id, None)
+    if hold:
+        _held[hold[0]] -= hold[1]  # heap ki entry baad me skip ho jayegi
+
+
+def _apply_commit_reservation(data: Dict[str, Any], order_id: str) -> Optional[List[str]]:
+    hold = data["holds"].pop(order_id, None)
+    if hold is None:
+        return None
+    denom, qty, _ = hold
+    _held[denom] -= qty
+    return _apply_pop_vouchers(data, denom, qty)
+
+
+def _apply_complete_order(data: Dict[str, Any], order_id: str, use_hold: bool, fields: Dict[str, Any]) -> Optional[List[str]]:
+    # hold ya free pool - faisla record me hai, to replay bhi wahi codes nikaale
+    o = _orders_by_id.get(order_id)
+    if o is None:
+        return None
+    if use_hold:
+        codes = _apply_commit_reservation(data, order_id)
+    else:
+        _apply_release(data, order_id)  # expire ho chuka hold (agar bacha ho)
+        codes = _apply_pop_vouchers(data, str(o["denom"]), o["qty"])
+    if codes:
+        o.update(fields, status="completed", voucher_codes=codes)
+    return codes
+
+
+def _apply_add_order(data: Dict[str, Any], order: Dict[str, Any]) -> None:
+    order = dict(order)
+    data["orders"].append(order)
+    _orders_by_id[order.get("order_id")] = order
+    _recent.append(order)
+
+
+def _apply_update_order(data: Dict[str, Any], order_id: str, fields: Dict[str, Any]) -> None:
+    o = _orders_by_id.get(order_id)
+    if o is not None:
+        o.update(fields)
+
+
+def _apply_set_user_states(data: Dict[str, Any], states: Dict[str, Optional[Dict[str, Any]]]) -> None:
+    saved = data["user_state"]
+    for user_id, state in states.items():
+        if state:
+            saved[user_id] = state
+        else:
+            saved.pop(user_id, None)
+
+
+_APPLY = {
+    "add_user": _apply_add_user,
+    "remove_users": _apply_remove_users,
+    "set_broadcast": _apply_set_broadcast,
+    "set_price": _apply_set_price,
+    "add_vouchers": _apply_add_vouchers,
+    "pop_voucher": _apply_pop_voucher,
+    "pop_vouchers": _apply_pop_vouchers,
+    "reserve": _apply_reserve,
+    "release": _apply_release,
+    "commit_reservation": _apply_commit_reservation,
+    "complete_order": _apply_complete_order,
+    "add_order": _apply_add_order,
+    "update_order": _apply_update_order,
+    "set_user_states": _apply_set_user_states,
+}
+
+
+def _replay(data: Dict[str, Any], path: str, after_seq: int) -> int:
+    """Journal ke records `data` pe apply karo; last applied seq return."""
+    seq = after_seq
+    if not os.path.exists(path):
+        return seq
+    good = 0  # aakhri poore record ke baad ka byte offset
+    torn = False
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("no newline")
+                rec_seq, op, args = json.loads(line)
+            except ValueError:
+                # crash ke time aadhi likhi last line - yahin ruk jao
+                logger.warning("Journal %s: torn record after seq %s", path, seq)
+                torn = True
+                break
+            good += len(line)
+            if rec_seq <= seq:
+                continue  # snapshot me pehle se hai
+            if rec_seq != seq + 1:
+                logger.error("Journal %s: records %s..%s missing", path, seq + 1, rec_seq - 1)
+            _APPLY[op](data, *args)
+            seq = rec_seq
+    if torn:
+        # adhoora tail kaat do - warna agla append usi line se jud ke agle
+        # restart pe baaki saare records bhi padhne nahi deta
+        os.truncate(path, good)
+    return seq
+
+
+# ---------- LOAD / SAVE ----------
+
+_lock = threading.RLock()
+# check-then-act inventory ops (reserve / pop / commit) per denomination
+# serialize hote hain; lock order hamesha: denom lock -> _lock
+_denom_locks: Dict[str, threading.RLock] = {}
+_seq = 0
+_journal = None
+_journal_bytes = 0
+_compacting = False
+_lock_file = None
+_index_lock = threading.Lock()   # code index ek hi baar bane
+_ledger: Optional[sqlite3.Connection] = None
+_ledger_lock = threading.Lock()
+# completed orders jo ledger me abhi nahi likhe - writer thread likhta hai
+# (event loop pe SQLite commit nahi); tab tak sold_info yahan se dekhta hai
+_sold_pending: Dict[str, Dict[str, Any]] = {}
+
+
+def _claim_files() -> None:
+    global _lock_file
+    if WORKERS > 1:
+        raise RuntimeError("JSON store is single-process; use STORAGE_BACKEND = 'sqlite' for WORKERS > 1")
+    if fcntl is None:
+        return
+    _lock_file = open(LOCK_FILE, "a")
+    try:
+        fcntl.flock(_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        raise RuntimeError(f"{DATA_FILE} is already in use by another bot process")
+
+
 def load_data() -> Dict[str, Any]:
-    if os.path.exists(DATA_FILE):
+    global _seq
+    data = None
+    for path in (DATA_FILE, PREV_DATA_FILE):
+        if not os.path.exists(path):
+            continue
         try:
-            with open(DATA_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = _default_data()
-    else:
+            data = snapshot.read(path)
+            break
+        except snapshot.SnapshotError as e:
+            logger.error("Snapshot %s unusable (%s), trying previous one", path, e)
+    if data is None:
+        if os.path.exists(DATA_FILE) or os.path.exists(PREV_DATA_FILE):
+            # khaali inventory se chalu hone se accha hai ruk jana
+            raise RuntimeError(f"No readable snapshot in {DATA_FILE} / {PREV_DATA_FILE}")
         data = _default_data()
 
     # ensure all keys exist
@@ -40,32 +295,365 @@ def load_data() -> Dict[str, Any]:
     for d, price in DEFAULT_PRICES.items():
         data["vouchers"].setdefault(d, [])
         data["prices"].setdefault(d, price)
+    # har denomination ka pool FIFO deque hai (O(1) popleft)
+    for d, codes in data["vouchers"].items():
+        data["vouchers"][d] = deque(codes)
+
+    # replay se pehle index bana lo - journal ke ops inhi pe chalte hain
+    _index_orders(data)
+    _index_holds(data)
+    _user_set.clear()
+    _user_set.update(data["users"])
+    seq = data.pop("_seq", 0)
+    # is snapshot ke baad likhe segments ke orders abhi snapshot/journal me hain
+    order_archive.drop_orphans(seq)
+    # prev snapshot se load hua ho to uske baad ke records .prev journal me
+    seq = _replay(data, PREV_JOURNAL_FILE, seq)
+    seq = _replay(data, OLD_JOURNAL_FILE, seq)
+    _seq = _replay(data, JOURNAL_FILE, seq)
+    _recent.clear()
+    recent = order_archive.tail(RECENT_ORDERS) + data["orders"]
+    recent.sort(key=lambda o: o.get("created_at") or "")
+    _recent.extend(recent[-RECENT_ORDERS:])
     return data
 
 
-DATA = load_data()
+def _index_orders(data: Dict[str, Any]) -> None:
+    _orders_by_id.clear()
+    for o in data["orders"]:
+        _orders_by_id[o.get("order_id")] = o
+
+
+def _index_holds(data: Dict[str, Any]) -> None:
+    _held.clear()
+    _hold_heap.clear()
+    for order_id, (denom, qty, expires_at) in data["holds"].items():
+        _held[denom] = _held.get(denom, 0) + qty
+        _hold_heap.append((expires_at, order_id))
+    heapq.heapify(_hold_heap)
+
+
+def _open_journal() -> None:
+    global _journal, _journal_bytes
+    _journal = open(JOURNAL_FILE, "a", encoding="utf-8")
+    _journal_bytes = _journal.tell()
+
+
+# ---------- WRITER THREAD ----------
+# Event loop pe koi file I/O nahi hota: mutation sirf memory + _queue tak
+# jaata hai. Dedicated writer thread har FLUSH_INTERVAL seconds (ya
+# FLUSH_MAX_PENDING records jama hone pe) queue khaali karke ek hi write +
+# fsync karta hai, aur journal bada ho jaye to compaction alag thread me.
+# Writer peeche reh jaye (WRITER_QUEUE_MAX) to naye mutations rukte hain -
+# sync callers thread pe, handlers `await wait_writable()` / *_async pe.
+# Durability chahiye to `await flush()`.
+
+_queue: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+_unwritten = ""                 # pichli baar fail hua chunk, agli baar pehle
+_flush_lock = threading.Lock()  # journal file pe ek time pe ek hi likhe
+_flush_wakeup = threading.Event()
+_room = threading.Condition()   # writer ne queue khaali ki - rukne walo ko jagao
+
+
+# in ops se stock / hold / price badalta hai - catalog ka render cache stale
+_CATALOG_OPS = {
+    "set_price", "add_vouchers", "pop_voucher", "pop_vouchers",
+    "reserve", "release", "commit_reservation", "complete_order",
+}
+_catalog_version = 0
+
+
+def _commit(op: str, *args) -> Any:
+    """Mutation apply karo aur uska compact record writer ki queue me daalo."""
+    global _seq, _catalog_version
+    with _lock:
+        result = _APPLY[op](DATA, *args)
+        _seq += 1
+        if op in _CATALOG_OPS:
+            _catalog_version += 1
+        # seq order me hi queue me jaye, isliye _lock ke andar
+        _queue.put(json.dumps([_seq, op, args], separators=(",", ":")) + "\n")
+    if _queue.qsize() >= FLUSH_MAX_PENDING:
+        _flush_wakeup.set()
+    return result
+
+
+def _wait_room() -> None:
+    # back-pressure: koi lock pakde bina call karo, warna compaction atak jayega
+    if _queue.qsize() < WRITER_QUEUE_MAX:
+        return
+    _flush_wakeup.set()
+    with _room:
+        while _queue.qsize() >= WRITER_QUEUE_MAX:
+            _room.wait(0.1)
+
+
+async def wait_writable() -> None:
+    """Writer ki queue bhari ho to handler yahan rukta hai (event loop nahi)."""
+    while _queue.qsize() >= WRITER_QUEUE_MAX:
+        _flush_wakeup.set()
+        await asyncio.sleep(0.01)
+
+
+def _drain() -> str:
+    global _unwritten
+    parts = [_unwritten]
+    while True:
+        try:
+            parts.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    _unwritten = ""
+    return "".join(parts)
+
+
+def _write_chunk(chunk: str) -> bool:
+    # caller ke paas _flush_lock hona chahiye
+    global _journal_bytes, _unwritten
+    ok = True
+    if chunk:
+        try:
+            with metrics.timer("store_write_seconds", kind="journal"):
+                _journal.write(chunk)
+                _journal.flush()
+                os.fsync(_journal.fileno())
+            _journal_bytes += len(chunk)
+            metrics.inc("store_write_bytes_total", len(chunk), kind="journal")
+        except Exception as e:
+            logger.error("Error writing journal: %s", e)
+            _unwritten = chunk  # agli baar phir try
+            ok = False
+    with _room:
+        _room.notify_all()
+    return ok
+
+
+def flush_sync() -> None:
+    """Queue ke saare records abhi journal me likho (fsync ke saath)."""
+    with _flush_lock:
+        if _write_chunk(_drain()):
+            # sale journal me pakki - ab ledger (crash beech me ho to
+            # _open_ledger hot orders se phir bhar deta hai)
+            _write_sold()
+
+
+async def flush() -> None:
+    await asyncio.get_running_loop().run_in_executor(None, flush_sync)
+
+
+def _writer() -> None:
+    while True:
+        _flush_wakeup.wait(FLUSH_INTERVAL)
+        _flush_wakeup.clear()
+        try:
+            flush_sync()
+            if _journal_bytes >= JOURNAL_COMPACT_BYTES and not _compacting:
+                # snapshot likhne tak bhi journal writes chalte rahein
+                threading.Thread(target=save_data, name="data-compact", daemon=True).start()
+        except Exception as e:
+            logger.error("Writer error: %s", e)
+
+
+def _snapshot_copy() -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    # caller ke paas _lock - sirf structure copy, serialize lock ke bahar.
+    # Final orders (completed / failed / ...) memory se nikal ke alag
+    # return hote hain - ye archive segment me jayenge, snapshot me nahi.
+    hot, cold = [], []
+    cutoff = _rotate_cutoff()
+    for o in DATA["orders"]:
+        status = o.get("status")
+        # paid_no_stock admin ke liye hot rehta hai, bahut purana ho to archive
+        stale = status == "paid_no_stock" and (o.get("created_at") or "") < cutoff
+        # adhoori delivery wala completed order resend tak hot rahe (parts
+        # abhi nahi likhe = ek bhi nahi gaya)
+        undelivered = "delivery_sent" in o and o["delivery_sent"] < o.get("delivery_parts", 1)
+        (cold if (is_terminal(status) and not undelivered) or stale else hot).append(o)
+    if cold:
+        DATA["orders"] = hot
+        for o in cold:
+            _orders_by_id.pop(o.get("order_id"), None)
+    data = dict(DATA)
+    data["vouchers"] = {d: list(p) for d, p in DATA["vouchers"].items()}
+    data["orders"] = [dict(o) for o in hot]
+    data["users"] = list(DATA["users"])
+    data["prices"] = dict(DATA["prices"])
+    data["holds"] = {k: list(v) for k, v in DATA["holds"].items()}
+    if DATA.get("broadcast"):
+        data["broadcast"] = dict(DATA["broadcast"])
+    # states kabhi mutate nahi hote, har set pe naya dict - shallow copy kaafi
+    data["user_state"] = dict(DATA["user_state"])
+    data["_seq"] = _seq
+    return data, [dict(o) for o in cold]
+
+
+def _rotate_cutoff() -> str:
+    return (datetime.utcnow() - timedelta(days=ARCHIVE_ROTATE_DAYS)).isoformat()
+
+
+def _unarchive(cold: List[Dict[str, Any]]) -> None:
+    # segment / snapshot nahi likha gaya - orders wapas hot me
+    with _lock:
+        for o in cold:
+            if o.get("order_id") not in _orders_by_id:
+                DATA["orders"].append(o)
+                _orders_by_id[o.get("order_id")] = o
 
 
 def save_data() -> None:
+    """Poora snapshot likho aur journal fold kar do (compaction)."""
+    global _compacting
+    with _flush_lock:
+        if _compacting:
+            return
+        try:
+            with _lock:
+                chunk = _drain()  # _seq tak ke records, snapshot ke saath hi
+                state, cold = _snapshot_copy()
+            if not _write_chunk(chunk):
+                _unarchive(cold)
+                return  # journal pura nahi likha - rotate mat karo
+            # naye records naye journal me jayenge, purana snapshot likhne tak rakho
+            _journal.close()
+            if os.path.exists(OLD_JOURNAL_FILE):
+                # pichla snapshot fail hua tha - uske records bhi sambhal ke rakho
+                with open(JOURNAL_FILE, "r", encoding="utf-8") as cur, \
+                        open(OLD_JOURNAL_FILE, "a", encoding="utf-8") as old:
+                    shutil.copyfileobj(cur, old)
+                os.remove(JOURNAL_FILE)
+            else:
+                os.replace(JOURNAL_FILE, OLD_JOURNAL_FILE)
+            _open_journal()
+        except Exception as e:
+            logger.error("Error preparing snapshot: %s", e)
+            if _journal.closed:
+                _open_journal()
+            _unarchive(cold)
+            return
+        _compacting = True
+
+    replaced = False
+    started = time.perf_counter()
     try:
-        with open(DATA_FILE, "w") as f:
-            json.dump(DATA, f, indent=2)
+        if cold:
+            order_archive.write_segment(state["_seq"], cold)
+        blob = snapshot.encode(state, SNAPSHOT_COMPRESS)
+        tmp = snapshot.write_tmp(DATA_FILE, blob)
+        # har step ke baad bhi load ho sake: prev snapshot + prev/old journal
+        # se ya naye snapshot se, dono me koi record nahi chhoot-ta
+        if os.path.exists(DATA_FILE):
+            os.replace(DATA_FILE, PREV_DATA_FILE)
+        os.replace(OLD_JOURNAL_FILE, PREV_JOURNAL_FILE)
+        os.replace(tmp, DATA_FILE)
+        replaced = True
+        snapshot.fsync_dir(DATA_FILE)
+        metrics.observe("store_write_seconds", time.perf_counter() - started, kind="snapshot")
+        metrics.inc("store_write_bytes_total", len(blob), kind="snapshot")
     except Exception as e:
-        print("Error saving data:", e)
+        logger.error("Error saving snapshot: %s", e)
+        if not replaced:
+            _unarchive(cold)
+        _compacting = False
+        return
+
+    try:
+        n = order_archive.rotate(_rotate_cutoff())
+        if n:
+            logger.info("Rotated %s archive segment(s) into monthly parts", n)
+    except Exception as e:
+        logger.error("Archive rotation failed: %s", e)
+    finally:
+        _compacting = False
+
+
+def _open_ledger() -> None:
+    global _ledger
+    _ledger = sqlite3.connect(SOLD_LEDGER_FILE, check_same_thread=False)
+    _ledger.execute("PRAGMA journal_mode=WAL")
+    _ledger.executescript(sold_ledger.SCHEMA)
+    with _ledger:
+        cur = _ledger.cursor()
+        if not sold_ledger.backfilled(cur):
+            n = sold_ledger.backfill(cur, order_archive.iter_orders())
+            logger.info("Sold-code ledger backfilled from archive: %d codes", n)
+        # journal me completed hue par ledger tak na pahunche (crash) - hot orders se
+        sold_ledger.backfill(cur, DATA["orders"])
+    sold_ledger.start_bloom(SOLD_LEDGER_FILE)
+
+
+def _write_sold() -> None:
+    # writer thread (ya flush()) se - pending sales ek transaction me
+    with _ledger_lock:
+        if not _sold_pending or _ledger is None:
+            return
+        batch = list(_sold_pending.values())
+        try:
+            with _ledger:
+                cur = _ledger.cursor()
+                for order in batch:
+                    sold_ledger.put(cur, order)
+        except sqlite3.Error as e:
+            logger.error("Sold-code ledger write failed (will retry): %s", e)
+            return
+        for order in batch:
+            if _sold_pending.get(order["order_id"]) is order:
+                del _sold_pending[order["order_id"]]
+
+
+if STORAGE_BACKEND == "sqlite":
+    DATA = _default_data()  # sqlite mode me ye use nahi hota, neeche override
+else:
+    _claim_files()
+    DATA = load_data()
+    _open_ledger()
+    _open_journal()
+    threading.Thread(target=_writer, name="data-writer", daemon=True).start()
+    atexit.register(flush_sync)
 
 
 # ---------- USERS ----------
 
 def add_user(user_id: int) -> None:
-    if user_id not in DATA["users"]:
-        DATA["users"].append(user_id)
-        save_data()
+    _wait_room()
+    if user_id not in _user_set:
+        _commit("add_user", user_id)
 
 
 def get_users() -> List[int]:
     return DATA["users"]
 
 
+def remove_users(user_ids: List[int]) -> None:
+    """Jinhone bot block kar diya unhe hata do (broadcast pruning)."""
+    _wait_room()
+    if any(u in _user_set for u in user_ids):
+        _commit("remove_users", list(user_ids))
+
+
+# ---------- USER STATE (persistence.py) ----------
+
+def get_user_state(user_id: int) -> Optional[Dict[str, Any]]:
+    state = DATA["user_state"].get(str(user_id))
+    return dict(state) if state else None
+
+
+def set_user_states(states: Dict[int, Optional[Dict[str, Any]]]) -> None:
+    """Kai users ka conversation state ek record me; None / {} = hata do."""
+    _wait_room()
+    _commit("set_user_states", {str(u): (dict(s) if s else None) for u, s in states.items()})
+
+
+# ---------- BROADCAST STATE ----------
+
+def get_broadcast() -> Optional[Dict[str, Any]]:
+    state = DATA.get("broadcast")
+    return dict(state) if state else None
+
+
+def set_broadcast(state: Optional[Dict[str, Any]]) -> None:
+    _wait_room()
+    _commit("set_broadcast", state)
+
+
 # ---------- PRICES ----------
 
 def get_price(denom: int) -> float:
@@ -73,56 +661,414 @@ def get_price(denom: int) -> float:
 
 
 def set_price(denom: int, new_price: float) -> None:
-    DATA["prices"][str(denom)] = float(new_price)
-    save_data()
+    _wait_room()
+    _commit("set_price", str(denom), float(new_price))
 
 
 # ---------- VOUCHERS ----------
 
 def vouchers_for(denom: int) -> List[str]:
-    return DATA["vouchers"].get(str(denom), [])
+    # copy deta hai - pool ko sirf add/pop functions badalte hain
+    return list(DATA["vouchers"].get(str(denom), ()))
+
+
+def available_count(denom: int) -> int:
+    """Bechne layak codes - stock me se reserved (held) hata ke."""
+    _expire_holds()
+    d = str(denom)
+    return len(DATA["vouchers"].get(d, ())) - _held.get(d, 0)
+
+
+def held_count(denom: int) -> int:
+    _expire_holds()
+    return _held.get(str(denom), 0)
+
+
+def _denom_lock(denom: str) -> threading.RLock:
+    lock = _denom_locks.get(denom)
+    if lock is None:
+        with _lock:
+            lock = _denom_locks.setdefault(denom, threading.RLock())
+    return lock
+
+
+def add_vouchers(denom: int, codes: List[str]) -> List[str]:
+    """Codes stock me daalo; jo pehle bik chuke (sold ledger me) wo nahi - unki list return."""
+    _wait_room()
+    sold_map = _sold_many(codes)
+    sold = [c for c in codes if c in sold_map]
+    if sold:
+        taken = set(sold)
+        codes = [c for c in codes if c not in taken]
+    with _denom_lock(str(denom)):
+        _commit("add_vouchers", str(denom), list(codes))
+    return sold
+
 
+def _code_index() -> set:
+    global _code_hashes
+    with _index_lock:
+        if _code_hashes is not None:
+            return _code_hashes
+        with _lock:
+            # set pehle lagao - build ke dauran aaye add_vouchers bhi isi me jayenge
+            hashes = _code_hashes = set()
+            for pool in DATA["vouchers"].values():
+                hashes.update(code_hash(c) for c in pool)
+            for o in DATA["orders"]:
+                hashes.update(code_hash(c) for c in order_codes(o))
+        # archive lock ke bahar: hot orders upar pad liye, archive me sirf
+        # unse purane (ya compaction me abhi gaye) orders hain
+        for o in order_archive.iter_orders():
+            hashes.update(code_hash(c) for c in order_codes(o))
+        logger.info("Code index built: %d codes", len(hashes))
+        return hashes
 
-def add_vouchers(denom: int, codes: List[str]) -> None:
-    lst = vouchers_for(denom)
-    lst.extend(codes)
-    DATA["vouchers"][str(denom)] = lst
-    save_data()
+
+def add_vouchers_unique(denom: int, codes: List[str]) -> List[str]:
+    """Sirf naye codes add karo - jo pehle stock me aa chuke ya bik chuke
+    (ya isi batch me dobara hain) wo reject. Rejected codes return."""
+    _wait_room()
+    hashes = _code_index()
+    fresh: List[str] = []
+    dupes: List[str] = []
+    with _denom_lock(str(denom)), _lock:
+        for c in codes:
+            h = code_hash(c)
+            if h in hashes:
+                dupes.append(c)
+            else:
+                hashes.add(h)
+                fresh.append(c)
+        if fresh:
+            _commit("add_vouchers", str(denom), fresh)
+    return dupes
+
+
+def pop_vouchers(denom: int, n: int) -> Optional[List[str]]:
+    """n codes ek saath nikalo (FIFO). Stock kam ho to None, kuch nahi hilta."""
+    _wait_room()
+    with _denom_lock(str(denom)):
+        if n < 1 or available_count(denom) < n:
+            return None
+        return _commit("pop_vouchers", str(denom), n)
 
 
 def pop_voucher(denom: int):
-    lst = vouchers_for(denom)
-    if not lst:
-        return None
-    code = lst.pop(0)
-    DATA["vouchers"][str(denom)] = lst
-    save_data()
-    return code
+    codes = pop_vouchers(denom, 1)
+    return codes[0] if codes else None
 
 
 def stock_text() -> str:
-    return (
-        "📦 *Current Stock*\n"
-        f"• ₹1000: {len(vouchers_for(1000))} vouchers\n"
-        f"• ₹2000: {len(vouchers_for(2000))} vouchers\n"
-        f"• ₹4000: {len(vouchers_for(4000))} vouchers"
-    )
+    lines = [
+        f"• ₹{d}: {available_count(d)} available, {held_count(d)} reserved" for d in DENOMINATIONS
+    ]
+    return "📦 *Current Stock*\n" + "\n".join(lines)
+
+
+def catalog_version() -> int:
+    """Stock / hold / price badalne pe badalta hai (render cache ki key)."""
+    _expire_holds()
+    return _catalog_version
+
+
+# ---------- RESERVATIONS ----------
+
+def _expire_holds(now: Optional[float] = None) -> None:
+    # heap ke top se sirf expired holds hatao - har ek O(log n)
+    global _catalog_version
+    now = time.time() if now is None else now
+    if not _hold_heap or _hold_heap[0][0] > now:
+        return
+    with _lock:
+        while _hold_heap and _hold_heap[0][0] <= now:
+            expires_at, order_id = heapq.heappop(_hold_heap)
+            hold = DATA["holds"].get(order_id)
+            if hold and hold[2] == expires_at:
+                del DATA["holds"][order_id]
+                _held[hold[0]] -= hold[1]
+                _catalog_version += 1
+
+
+def reserve(order_id: str, denom: int, qty: int, seconds: float) -> bool:
+    """qty codes order ke liye `seconds` tak hold karo. Stock kam ho to False."""
+    _wait_room()
+    with _denom_lock(str(denom)):
+        if available_count(denom) < qty:
+            return False
+        _commit("reserve", order_id, str(denom), qty, time.time() + seconds)
+    return True
+
+
+def release(order_id: str) -> None:
+    _wait_room()
+    with _lock:
+        _expire_holds()
+        if order_id in DATA["holds"]:
+            _commit("release", order_id)
+
+
+def commit_reservation(order_id: str) -> Optional[List[str]]:
+    """Hold ko sale me badlo: held codes pool se nikal ke return. Hold na ho to None."""
+    _wait_room()
+    hold = DATA["holds"].get(order_id)
+    if hold is None:
+        return None
+    with _denom_lock(hold[0]):
+        _expire_holds()
+        if DATA["holds"].get(order_id) is not hold:
+            return None  # beech me expire / release ho gaya
+        return _commit("commit_reservation", order_id)
 
 
 # ---------- ORDERS ----------
 
 def add_order(order: Dict[str, Any]) -> None:
-    DATA["orders"].append(order)
-    save_data()
+    _wait_room()
+    _commit("add_order", order)
 
 
-def update_order(order_id: str, **fields) -> None:
-    for o in DATA["orders"]:
-        if o.get("order_id") == order_id:
-            o.update(fields)
-            save_data()
-            break
+def update_order(order_id: str, **fields) -> bool:
+    """Order update karo. Galat status transition (e.g. completed -> failed)
+    reject hota hai aur False milta hai - ye compare-and-swap ki tarah kaam
+    karta hai, do concurrent callers me se ek hi jeet-ta hai."""
+    _wait_room()
+    with _lock:
+        o = _orders_by_id.get(order_id)
+        if o is None:
+            return False
+        if "status" in fields and not can_transition(o.get("status"), fields["status"]):
+            logger.warning(
+                "Rejected order %s transition %s -> %s", order_id, o.get("status"), fields["status"]
+            )
+            return False
+        _commit("update_order", order_id, fields)
+        # delivery hui (codes ke saath completed) - ledger me bhi
+        sold = o.get("status") == "completed" and o.get("voucher_codes") and (
+            "status" in fields or "voucher_codes" in fields
+        )
+        if sold:
+            with _ledger_lock:
+                _sold_pending[order_id] = dict(o)
+    return True
+
+
+def claim_order(order_id: str, status: str, from_statuses) -> bool:
+    """Strict compare-and-set: order abhi from_statuses me ho tabhi `status`
+    set karo. update_order ke ulat same status (paid -> paid) pe False - do
+    concurrent claims me se sirf ek True paata hai."""
+    sources = claim_sources(status, from_statuses)
+    _wait_room()
+    with _lock:
+        o = _orders_by_id.get(order_id)
+        if o is None or o.get("status") not in sources:
+            return False
+        _commit("update_order", order_id, {"status": status})
+    return True
+
+
+def complete_order(order_id: str, **fields) -> Optional[List[str]]:
+    """"paid" claim wale order ko codes do aur completed karo - stock se
+    nikalna aur order pe likhna ek hi journal record hai, beech me crash ho
+    to codes gum nahi hote. Hold ho to wahi, warna free stock. Order "paid"
+    na ho ya stock kam ho to None, kuch nahi hilta."""
+    _wait_room()
+    o = _orders_by_id.get(order_id)
+    if o is None:
+        return None
+    denom = str(o["denom"])
+    with _denom_lock(denom), _lock:
+        if o.get("status") != "paid":
+            return None
+        _expire_holds()
+        use_hold = order_id in DATA["holds"]
+        if use_hold:
+            enough = len(DATA["vouchers"].get(denom, ())) >= o["qty"]
+        else:
+            enough = available_count(int(denom)) >= o["qty"]
+        if not enough:
+            return None
+        codes = _commit("complete_order", order_id, use_hold, fields)
+        if codes:
+            with _ledger_lock:
+                _sold_pending[order_id] = dict(o)
+        return codes
+
+
+def sold_info(code: str) -> Optional[Dict[str, Any]]:
+    """Bika hua code kis order / user ko gaya - ledger se. Nahi bika to None."""
+    with _ledger_lock:
+        for order in _sold_pending.values():
+            if code in order_codes(order):
+                return sold_ledger.entry(order, code)
+        return sold_ledger.get(_ledger.cursor(), code)
+
+
+def _sold_many(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    # sold_info ka batch version: pending sales ek hi pass me, ledger ek query per chunk
+    wanted = set(codes)
+    found: Dict[str, Dict[str, Any]] = {}
+    with _ledger_lock:
+        for order in _sold_pending.values():
+            for c in order_codes(order):
+                if c in wanted:
+                    found[c] = sold_ledger.entry(order, c)
+        rest = [c for c in codes if c not in found]
+        found.update(sold_ledger.get_many(_ledger.cursor(), rest))
+    return found
+
+
+def get_order(order_id: str, archived: bool = True) -> Optional[Dict[str, Any]]:
+    """archived=False: sirf hot orders (archive ka disk scan nahi)."""
+    o = _orders_by_id.get(order_id)
+    if o is None:
+        if not archived:
+            return None
+        # hot me nahi - final ho ke archive me gaya hoga (lazy, disk se)
+        return order_archive.find(order_id)
+    return dict(o)
+
+
+def iter_orders() -> Iterator[Dict[str, Any]]:
+    """Poori order history stream karo: archive (purane) phir hot orders."""
+    yield from order_archive.iter_orders()
+    with _lock:
+        hot = [dict(o) for o in DATA["orders"]]
+    yield from hot
+
+
+def query_orders(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    statuses: Optional[List[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """since <= created_at < until (ISO) wale orders stream karo - accounting
+    ke liye. Archive ki sirf overlapping monthly files khulti hain."""
+    yield from order_archive.query(since, until, statuses)
+    with _lock:
+        hot = [dict(o) for o in DATA["orders"]]
+    for o in hot:
+        created = o.get("created_at") or ""
+        if since is not None and created < since:
+            continue
+        if until is not None and created >= until:
+            continue
+        if statuses is None or o.get("status") in statuses:
+            yield o
+
+
+def orders_with_status(statuses: List[str]) -> List[Dict[str, Any]]:
+    if not any(is_terminal(s) for s in statuses):
+        # open statuses sirf hot orders me ho sakte hain
+        with _lock:
+            return [dict(o) for o in DATA["orders"] if o.get("status") in statuses]
+    return [o for o in iter_orders() if o.get("status") in statuses]
 
 
 def list_orders(limit: int = 10) -> List[Dict[str, Any]]:
-    return DATA["orders"][-limit:]
+    if limit <= RECENT_ORDERS:
+        with _lock:
+            return [dict(o) for o in list(_recent)[-limit:]]
+    return list(deque(iter_orders(), maxlen=limit))
+
+
+# ---------- ASYNC WRAPPERS ----------
+# Handlers ke liye: writer peeche ho to event loop block kiye bina wait,
+# phir wahi in-memory mutation (disk I/O writer thread karta hai).
+
+async def add_user_async(user_id: int) -> None:
+    await wait_writable()
+    add_user(user_id)
+
+
+async def get_users_async() -> List[int]:
+    return get_users()  # memory se - disk nahi
+
+
+async def sold_info_async(code: str) -> Optional[Dict[str, Any]]:
+    return await asyncio.to_thread(sold_info, code)
+
+
+async def get_order_async(order_id: str, archived: bool = True) -> Optional[Dict[str, Any]]:
+    # hot order memory me hai; archive wala disk scan - loop ke bahar
+    if order_id in _orders_by_id or not archived:
+        return get_order(order_id, archived)
+    return await asyncio.to_thread(get_order, order_id, archived)
+
+
+async def remove_users_async(user_ids: List[int]) -> None:
+    await wait_writable()
+    remove_users(user_ids)
+
+
+async def set_broadcast_async(state: Optional[Dict[str, Any]]) -> None:
+    await wait_writable()
+    set_broadcast(state)
+
+
+async def set_price_async(denom: int, new_price: float) -> None:
+    await wait_writable()
+    set_price(denom, new_price)
+
+
+async def add_vouchers_async(denom: int, codes: List[str]) -> List[str]:
+    await wait_writable()
+    # ledger query (SQLite) - loop ke bahar
+    return await asyncio.to_thread(add_vouchers, denom, codes)
+
+
+async def add_vouchers_unique_async(denom: int, codes: List[str]) -> List[str]:
+    await wait_writable()
+    # hash check + pehli call pe index build (archive scan) - loop ke bahar
+    return await asyncio.to_thread(add_vouchers_unique, denom, codes)
+
+
+async def set_user_states_async(states: Dict[int, Optional[Dict[str, Any]]]) -> None:
+    await wait_writable()
+    set_user_states(states)
+
+
+async def add_order_async(order: Dict[str, Any]) -> None:
+    await wait_writable()
+    add_order(order)
+
+
+async def update_order_async(order_id: str, **fields) -> bool:
+    await wait_writable()
+    return update_order(order_id, **fields)
+
+
+async def claim_order_async(order_id: str, status: str, from_statuses) -> bool:
+    await wait_writable()
+    return claim_order(order_id, status, from_statuses)
+
+
+async def pop_vouchers_async(denom: int, n: int) -> Optional[List[str]]:
+    await wait_writable()
+    return pop_vouchers(denom, n)
+
+
+async def reserve_async(order_id: str, denom: int, qty: int, seconds: float) -> bool:
+    await wait_writable()
+    return reserve(order_id, denom, qty, seconds)
+
+
+async def release_async(order_id: str) -> None:
+    await wait_writable()
+    release(order_id)
+
+
+async def commit_reservation_async(order_id: str) -> Optional[List[str]]:
+    await wait_writable()
+    return commit_reservation(order_id)
+
+
+async def complete_order_async(order_id: str, **fields) -> Optional[List[str]]:
+    await wait_writable()
+    return complete_order(order_id, **fields)
+
+
+# ---------- BACKEND ----------
+# config.STORAGE_BACKEND = "sqlite" ho to same functions SQLite se aayenge.
+if STORAGE_BACKEND == "sqlite":
+    from sqlite_store import *  # noqa: E402,F401,F403
@@ -0,0 +1,165 @@
+# delivery.py
+#
+# Paid order ke codes user tak. qty chahe 1 ho ya 500, codes kam se kam
+# messages me pack hote hain (har message Telegram ki 4096 char limit ke
+# andar); DELIVERY_DOCUMENT_THRESHOLD se zyada codes ho to ek .txt file
+# (memory me bani) jati hai - ek hi API call.
+#
+# Progress order me hi record hota hai: delivery_parts (kitne messages)
+# aur delivery_sent (kitne ja chuke). Beech me send fail / crash ho to
+# resend_order() wahi stored voucher_codes ke baaki parts bhejta hai -
+# stock se naye codes kabhi pop nahi hote.
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Tuple
+
+from telegram.error import TelegramError
+
+import outbox
+from config import DELIVERY_DOCUMENT_THRESHOLD, DELIVERY_MESSAGE_LIMIT
+from data_store import get_order, update_order_async
+
+logger = logging.getLogger(__name__)
+
+_FOOTER = "\n\nPlease keep these codes safe and do not share them with anyone."
+
+# order_id -> [lock, users] - ek order ki delivery ek time pe ek hi (button /
+# reconciler / webhook / resend ek saath aaye to bhi parts do baar nahi jaate)
+_inflight: Dict[str, list] = {}
+
+
+def _tg_len(text: str) -> int:
+    # Telegram ki 4096 limit UTF-16 units me hai - emoji 2 gine jaate hain
+    return len(text.encode("utf-16-le")) // 2
+
+
+def pack(header: str, lines: List[str], footer: str = "", limit: int = DELIVERY_MESSAGE_LIMIT) -> List[str]:
+    """Lines ko greedy tarike se kam se kam messages me; header pehle me,
+    footer aakhri me. Koi line kabhi do messages me nahi tootti - limit se
+    lambi line caller pehle hi tod de."""
+    messages: List[str] = []
+    current, size = header, _tg_len(header)
+    for line in lines:
+        width = _tg_len(line)
+        if not current:
+            current, size = line, width
+        elif size + 1 + width > limit:
+            messages.append(current)
+            current, size = line, width
+        else:
+            current += "\n" + line
+            size += 1 + width
+    if current and size + _tg_len(footer) > limit:
+        messages.append(current)
+        current = footer.lstrip("\n")
+    else:
+        current += footer
+    if current:
+        messages.append(current)
+    return messages
+
+
+def _parts(order: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Order ke delivery parts: ("text", message) ya ("document", caption).
+    Same order pe hamesha same parts - resend isi pe tika hai."""
+    codes: List[str] = order.get("voucher_codes") or []
+    order_id = order["order_id"]
+    header = (
+        "🎉 *Payment Verified!*\n\n"
+        f"Order ID: `{order_id}`\n"
+        f"Voucher(s) (₹{order['denom']} x{len(codes)}):"
+    )
+    if len(codes) > DELIVERY_DOCUMENT_THRESHOLD:
+        caption = f"{header}\n{len(codes)} codes attached as a file.{_FOOTER}"
+        return [("document", caption)]
+    return [("text", m) for m in pack(header, [f"`{c}`" for c in codes], _FOOTER)]
+
+
+def part_count(order: Dict[str, Any]) -> int:
+    return len(_parts(order))
+
+
+def pending(order: Dict[str, Any]) -> bool:
+    """Completed order jiske saare parts abhi user tak nahi gaye. Purane
+    orders (delivery progress se pehle ke) already delivered maane jaate hain;
+    delivery_parts abhi nahi likha (complete ke turant baad crash) = pending."""
+    if order.get("status") != "completed" or "delivery_sent" not in order:
+        return False
+    parts = order.get("delivery_parts")
+    return parts is None or order["delivery_sent"] < parts
+
+
+async def _send(bot, chat_id: int, order: Dict[str, Any], kind: str, body: str) -> None:
+    # outbox me sabse oonchi priority; RetryAfter / network retry wahi karta hai
+    if kind == "document":
+        await outbox.send(
+            bot,
+            "send_document",
+            outbox.DELIVERY,
+            chat_id=chat_id,
+            document="\n".join(order["voucher_codes"]).encode("utf-8") + b"\n",
+            filename=f"vouchers-{order['order_id']}.txt",
+            caption=body,
+            parse_mode="Markdown",
+        )
+    else:
+        await outbox.send(bot, "send_message", outbox.DELIVERY, chat_id=chat_id, text=body, parse_mode="Markdown")
+
+
+def in_progress(order_id: str) -> bool:
+    return order_id in _inflight
+
+
+async def deliver(bot, order: Dict[str, Any], restart: bool = False) -> bool:
+    """Jo parts abhi nahi gaye wo bhejo, har part ke baad progress order me.
+    Sab pahunch gaye to True; Telegram error pe False (baad me resend).
+    Usi order ki doosri delivery chal rahi ho to uske khatam hone tak rukta
+    hai, phir store se taaza progress leke sirf bache parts bhejta hai."""
+    order_id = order["order_id"]
+    entry = _inflight.setdefault(order_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            return await _deliver(bot, get_order(order_id) or order, restart)
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _inflight[order_id]
+
+
+async def _deliver(bot, order: Dict[str, Any], restart: bool) -> bool:
+    order_id = order["order_id"]
+    parts = _parts(order)
+    if restart and not pending(order):
+        # pehle poori ja chuki thi - user ne kho di, shuru se bhejo
+        order["delivery_sent"] = 0
+        await update_order_async(order_id, delivery_sent=0)
+    sent = order.get("delivery_sent", 0)
+    if order.get("delivery_parts") != len(parts):
+        await update_order_async(order_id, delivery_parts=len(parts))
+    # at-least-once: send ho gaya aur progress likhne se pehle crash ho to
+    # resend wo ek part dobara bhejega - code kabhi miss nahi hota
+    for i in range(sent, len(parts)):
+        kind, body = parts[i]
+        try:
+            await _send(bot, order["user_id"], order, kind, body)
+        except TelegramError as e:
+            logger.error(f"Delivery of {order_id} stopped at part {i + 1}/{len(parts)}: {e}")
+            return False
+        await update_order_async(order_id, delivery_sent=i + 1)
+    return True
+
+
+async def resend_order(bot, order_id: str) -> str:
+    """Completed order ki adhoori (ya admin ke kehne pe poori) delivery dobara.
+    Sirf stored codes - stock ko haath nahi lagata."""
+    order = get_order(order_id)
+    if order is None:
+        return "missing"
+    if order.get("status") != "completed" or not order.get("voucher_codes"):
+        return order.get("status") or "unknown"
+    if in_progress(order_id):
+        # abhi bhej hi rahe hain - dobara shuru karne se user ko do copies
+        return "in_progress"
+    return "completed" if await deliver(bot, order, restart=True) else "delivery_failed"
@@ -0,0 +1,115 @@
+# fake_pay0.py
+#
+# Local Pay0 stand-in - end-to-end testing ke liye, asli paise ke bina.
+#
+#   python fake_pay0.py --port 8099 --callback http://127.0.0.1:8080/pay0/callback
+#   PAY0_BASE_URL=http://127.0.0.1:8099 python msin.py
+#
+# create-order ka payment_url is server ka /pay?order_id=... hai. Use open
+# karte hi order SUCCESS ho jata hai aur bot ke callback URL pe POST jata hai.
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+from http_server import HttpServer, Request
+
+logger = logging.getLogger(__name__)
+
+
+class FakePay0:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        callback_url: Optional[str] = None,
+        secret: str = "",
+        latency: float = 0.0,
+    ):
+        self.server = HttpServer(host, port)
+        self.callback_url = callback_url
+        self.secret = secret
+        self.latency = latency  # har API response se pehle itni der (seconds)
+        self.orders: Dict[str, Dict[str, str]] = {}
+        self.server.route("POST", "/api/create-order", self._create)
+        self.server.route("POST", "/api/check-order-status", self._check)
+        self.server.route("GET", "/pay", self._pay_page)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server.host}:{self.server.port}"
+
+    async def start(self) -> None:
+        await self.server.start()
+
+    async def stop(self) -> None:
+        await self.server.stop()
+
+    async def _delay(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def _create(self, req: Request):
+        await self._delay()
+        form = dict(parse_qsl(req.body.decode("utf-8")))
+        order_id = form.get("order_id", "")
+        self.orders[order_id] = {"txnStatus": "PENDING", "amount": form.get("amount", "0")}
+        url = f"{self.base_url}/pay?" + urlencode({"order_id": order_id})
+        body = {"status": True, "message": "Order Created", "result": {"orderId": order_id, "payment_url": url}}
+        return 200, json.dumps(body), "application/json"
+
+    async def _check(self, req: Request):
+        await self._delay()
+        form = dict(parse_qsl(req.body.decode("utf-8")))
+        order = self.orders.get(form.get("order_id", ""))
+        if order is None:
+            return 200, json.dumps({"status": False, "message": "Order not found"}), "application/json"
+        body = {"status": True, "result": {"txnStatus": order["txnStatus"], "orderId": form["order_id"]}}
+        return 200, json.dumps(body), "application/json"
+
+    async def _pay_page(self, req: Request):
+        order_id = req.query.get("order_id", "")
+        if order_id not in self.orders:
+            return 404, "unknown order"
+        await self.pay(order_id)
+        return 200, "Payment successful (fake Pay0). You can go back to Telegram."
+
+    async def pay(self, order_id: str, status: str = "SUCCESS") -> None:
+        """Order ko paid/failed mark karo aur callback bhejo (agar URL set hai)."""
+        self.orders.setdefault(order_id, {"amount": "0"})["txnStatus"] = status
+        if not self.callback_url:
+            return
+        body = urlencode({"order_id": order_id, "status": status}).encode()
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        if self.secret:
+            headers["X-Pay0-Signature"] = hmac.new(self.secret.encode(), body, hashlib.sha256).hexdigest()
+        try:
+            async with httpx.AsyncClient(timeout=10) as client:
+                await client.post(self.callback_url, content=body, headers=headers)
+        except Exception as e:
+            logger.error(f"Fake Pay0 callback error for {order_id}: {e}")
+
+
+async def _main(args) -> None:
+    fake = FakePay0(args.host, args.port, args.callback, args.secret, args.latency)
+    await fake.start()
+    logger.info(f"Fake Pay0 running at {fake.base_url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Local fake Pay0 server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--callback", default=None, help="bot ka Pay0 callback URL")
+    parser.add_argument("--secret", default="", help="PAY0_WEBHOOK_SECRET jaisa hi")
+    parser.add_argument("--latency", type=float, default=0.0)
+    asyncio.run(_main(parser.parse_args()))
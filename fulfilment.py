@@ -0,0 +1,89 @@
+# fulfilment.py
+#
+# Payment SUCCESS ke baad voucher delivery. "I Have Paid" button aur
+# background reconciler dono yahi use karte hain, taaki ek order ek hi
+# baar deliver ho.
+
+import logging
+from datetime import datetime
+
+import admin_notify
+import delivery
+from data_store import (
+    available_count,
+    claim_order_async,
+    complete_order_async,
+    flush,
+    get_order,
+)
+from order_states import PAYABLE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+def _delivery_failed(bot, order_id: str) -> None:
+    admin_notify.urgent(
+        bot,
+        f"⚠ Order {order_id} paid & codes assigned, but sending them to the user failed. "
+        f"Retry with /resend {order_id}",
+    )
+
+
+async def _resume(bot, order: dict) -> str:
+    # pichli baar beech me ruki delivery - wahi codes, baaki parts
+    if await delivery.deliver(bot, order):
+        return "completed"
+    _delivery_failed(bot, order["order_id"])
+    return "delivery_failed"
+
+
+async def fulfil_order(bot, order_id: str, from_statuses=PAYABLE_STATUSES) -> str:
+    """Paid order ke codes nikaal ke user ko bhejo. Final status return karta hai.
+    Admin restock ke baad from_statuses=("paid_no_stock",) se bulata hai; "paid"
+    bhi diya ho to pichli claim (jiske baad codes nahi lage) aage badhti hai."""
+    order = get_order(order_id)
+    if order is None:
+        return "missing"
+
+    if delivery.pending(order):
+        return await _resume(bot, order)
+    # claim ho chuki thi par codes nahi lage (crash / restart) - complete_order
+    # khud "paid" pe compare-and-set hai, do recoveries me se ek hi jeetegi
+    resuming = order.get("status") == "paid" and "paid" in from_statuses
+    # "paid" pe strict claim (compare-and-set) - button / reconciler / webhook
+    # / doosre worker me se sirf ek jeet-ta hai, baaki ko current status milta hai
+    if not resuming and not await claim_order_async(order_id, "paid", from_statuses):
+        return get_order(order_id).get("status")
+
+    denom = order["denom"]
+    qty = order["qty"]
+
+    # hold (ya expire hua ho to bacha free stock) se codes + completed - ek hi
+    # store operation, beech me crash ho to codes order se alag nahi hote.
+    # completed + codes = sold-code ledger me bhi entry (store karta hai)
+    codes = await complete_order_async(
+        order_id, delivered_at=datetime.utcnow().isoformat(), delivery_sent=0
+    )
+    if not codes:
+        if not await claim_order_async(order_id, "paid_no_stock", ("paid",)):
+            # doosri recovery ne complete kar diya
+            return (get_order(order_id) or {}).get("status") or "missing"
+        admin_notify.urgent(
+            bot,
+            f"⚠ Payment success but only {available_count(denom)} voucher(s) "
+            f"left for ₹{denom} (needed {qty}). Order ID: {order_id}\n"
+            f"Add stock, then /deliver {order_id}",
+        )
+        return "paid_no_stock"
+
+    order.update(status="completed", voucher_codes=codes, delivery_sent=0)
+    # codes user ko dikhne se pehle sale disk pe pakki ho
+    await flush()
+
+    if not await delivery.deliver(bot, order):
+        _delivery_failed(bot, order_id)
+        return "delivery_failed"
+
+    # routine - agle admin digest me (codes /lookup se)
+    admin_notify.order_completed(bot, order)
+    return "completed"
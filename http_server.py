@@ -0,0 +1,194 @@
+# http_server.py
+#
+# Chhota asyncio HTTP/1.1 server, bot ke hi event loop me chalta hai.
+# Pay0 payment callbacks (aur aage aur local endpoints) isi pe mount hote
+# hain - alag framework / thread ki zarurat nahi.
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+_REASONS = {
+    200: "OK",
+    204: "No Content",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]  # keys lower-case
+    body: bytes = b""
+    peer: Optional[Tuple[str, int]] = None
+
+
+# handler (status, body) ya (status, body, content_type) return karta hai
+Response = Union[Tuple[int, Union[str, bytes]], Tuple[int, Union[str, bytes], str]]
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class HttpServer:
+    def __init__(
+        self, host: str, port: int, max_connections: Optional[int] = None, reuse_port: bool = False
+    ):
+        self.host = host
+        self.port = port
+        # SO_REUSEPORT - kai worker processes ek hi port pe, kernel balance karta hai
+        self.reuse_port = reuse_port
+        # itne se zyada open connections pe naya client 503 pa ke band
+        self.max_connections = max_connections
+        self.routes: Dict[Tuple[str, str], Handler] = {}
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._conns: Dict[asyncio.StreamWriter, bool] = {}  # writer -> request chal rahi hai?
+        self._tasks: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._closing = False
+
+    def route(self, method: str, path: str, handler: Handler) -> None:
+        self.routes[(method.upper(), path)] = handler
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle_conn, self.host, self.port, limit=MAX_HEADER_BYTES,
+            reuse_port=self.reuse_port or None,
+        )
+        if self.port == 0:
+            # tests me free port liya ho to asli port yaad rakho
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"HTTP server listening on {self.host}:{self.port}")
+
+    async def stop(self, drain: float = 0.0) -> None:
+        """Listener band karo; chal rahi requests ko `drain` seconds tak pura
+        hone do, phir idle keep-alive connections bhi band."""
+        if self._server is None:
+            return
+        self._closing = True
+        self._server.close()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + drain
+        while any(self._conns.values()) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        if any(self._conns.values()):
+            logger.warning(f"HTTP server {self.port}: {sum(self._conns.values())} requests cut off")
+        for writer in list(self._conns):
+            writer.close()
+        # idle keep-alive connections readuntil() pe atke hain - close se
+        # nahi jaagte, unke tasks cancel karke khatam hone tak ruko. Chal
+        # rahi request (fulfilment beech me) cancel nahi hoti.
+        tasks = [t for w, t in self._tasks.items() if not self._conns.get(w)]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        self._closing = False
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("body too large")
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            return None  # client body bhejte-bhejte chala gaya
+
+        url = urlsplit(target)
+        return Request(
+            method=method.upper(),
+            path=url.path,
+            query=dict(parse_qsl(url.query)),
+            headers=headers,
+            body=body,
+        )
+
+    async def _handle_conn(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        if self._closing or (self.max_connections and len(self._conns) >= self.max_connections):
+            try:
+                await self._write(writer, 503, _REASONS[503], "text/plain", close=True)
+            except ConnectionError:
+                pass
+            writer.close()
+            return
+        self._conns[writer] = False
+        self._tasks[writer] = asyncio.current_task()
+        try:
+            while True:
+                try:
+                    req = await self._read_request(reader)
+                except (ValueError, asyncio.LimitOverrunError):
+                    await self._write(writer, 400, b"bad request", "text/plain", close=True)
+                    return
+                if req is None:
+                    return
+                req.peer = peer
+                self._conns[writer] = True
+
+                handler = self.routes.get((req.method, req.path))
+                if handler is None:
+                    known = any(p == req.path for _, p in self.routes)
+                    status = 405 if known else 404
+                    resp: Response = (status, _REASONS[status])
+                else:
+                    try:
+                        resp = await handler(req)
+                    except Exception as e:
+                        logger.error(f"HTTP handler error on {req.path}: {e}")
+                        resp = (500, "error")
+
+                close = self._closing or req.headers.get("connection", "").lower() == "close"
+                content_type = resp[2] if len(resp) > 2 else "text/plain; charset=utf-8"
+                await self._write(writer, resp[0], resp[1], content_type, close=close)
+                self._conns[writer] = False
+                if close:
+                    return
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # stop() ne idle connection band ki - asyncio ka stream callback
+            # cancelled task pe traceback log karta, isliye normal return
+            if not self._closing:
+                raise
+        finally:
+            self._conns.pop(writer, None)
+            self._tasks.pop(writer, None)
+            writer.close()
+
+    async def _write(self, writer, status: int, body, content_type: str, close: bool) -> None:
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
@@ -0,0 +1,301 @@
+# metrics.py
+#
+# Chhota in-process metrics registry: counters, gauges aur fixed-bucket
+# latency histograms. Admin /metrics command summary_text() dikhata hai,
+# aur METRICS_ENABLED ho to local HTTP endpoint Prometheus text format me
+# wahi data deta hai. Koi external dependency nahi; writer thread se bhi
+# record karna safe hai.
+
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import METRICS_HOST, METRICS_PATH, METRICS_PORT, WORKER_ID
+from http_server import HttpServer
+
+# seconds - Telegram / Pay0 / disk sab is range me aate hain
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# ek metric ke itne label combinations se zyada hue to baaki "other" me
+MAX_SERIES = 200
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_help: Dict[str, Tuple[str, str]] = {}                  # name -> (type, help)
+_counters: Dict[str, Dict[Labels, float]] = {}
+_gauges: Dict[str, Dict[Labels, float]] = {}
+_hists: Dict[str, Dict[Labels, List[float]]] = {}      # [bucket counts..., sum, count]
+_gauge_fns: Dict[str, Callable[[], Dict[Labels, float]]] = {}
+
+
+def _key(series: Dict[Labels, Any], labels: Dict[str, Any]) -> Labels:
+    key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+    if key not in series and len(series) >= MAX_SERIES:
+        key = tuple((k, "other") for k, _ in key)
+    return key
+
+
+def describe(name: str, kind: str, text: str) -> None:
+    _help[name] = (kind, text)
+
+
+def inc(name: str, amount: float = 1.0, **labels) -> None:
+    with _lock:
+        series = _counters.setdefault(name, {})
+        key = _key(series, labels)
+        series[key] = series.get(key, 0.0) + amount
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    with _lock:
+        series = _gauges.setdefault(name, {})
+        series[_key(series, labels)] = value
+
+
+def gauge_callback(name: str, fn: Callable[[], Dict[Labels, float]]) -> None:
+    """Scrape ke time hi compute hone wala gauge (e.g. inventory per denom)."""
+    _gauge_fns[name] = fn
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    with _lock:
+        series = _hists.setdefault(name, {})
+        key = _key(series, labels)
+        h = series.get(key)
+        if h is None:
+            h = series[key] = [0.0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+                break
+        h[-2] += seconds
+        h[-1] += 1
+
+
+class timer:
+    """`with metrics.timer("x_seconds", call="y"):` - block ka time histogram me."""
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+# ---------- HANDLERS ----------
+
+def _handler_key(update: Any) -> str:
+    query = getattr(update, "callback_query", None)
+    if query is not None and query.data:
+        return query.data[:40]
+    msg = getattr(update, "message", None)
+    text = getattr(msg, "text", None) or ""
+    if text.startswith("/"):
+        return text.split()[0].split("@")[0][:40]
+    if getattr(msg, "document", None) is not None:
+        return "document"
+    return "text"
+
+
+def instrument(callback: Callable) -> Callable:
+    """Handler callback ko wrap karo: latency per callback_data / command."""
+    name = getattr(callback, "__name__", "handler")
+
+    @functools.wraps(callback)
+    async def wrapped(update, context):
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await callback(update, context)
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            key = _handler_key(update)
+            observe("handler_seconds", time.perf_counter() - start, handler=name, key=key)
+            if outcome == "error":
+                inc("handler_errors_total", handler=name, key=key)
+
+    return wrapped
+
+
+# ---------- EXPORT ----------
+
+def _quantile(h: List[float], q: float) -> float:
+    # bucket ke andar linear interpolation (Prometheus histogram_quantile jaisa)
+    total = h[-1]
+    if not total:
+        return 0.0
+    rank = q * total
+    seen, lower = 0.0, 0.0
+    for i, bound in enumerate(BUCKETS):
+        if seen + h[i] >= rank:
+            return lower + (bound - lower) * ((rank - seen) / h[i] if h[i] else 0.0)
+        seen += h[i]
+        lower = bound
+    return BUCKETS[-1]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _snapshot() -> Tuple[Dict, Dict, Dict]:
+    with _lock:
+        counters = {n: dict(s) for n, s in _counters.items()}
+        gauges = {n: dict(s) for n, s in _gauges.items()}
+        hists = {n: {k: list(h) for k, h in s.items()} for n, s in _hists.items()}
+    for name, fn in _gauge_fns.items():
+        try:
+            gauges[name] = fn()
+        except Exception:
+            pass  # scrape kabhi fail na ho
+    return counters, gauges, hists
+
+
+def render_prometheus() -> str:
+    counters, gauges, hists = _snapshot()
+    out: List[str] = []
+
+    def head(name: str, kind: str) -> None:
+        text = _help.get(name, (kind, name))[1]
+        out.append(f"# HELP {name} {text}")
+        out.append(f"# TYPE {name} {kind}")
+
+    for name in sorted(counters):
+        head(name, "counter")
+        for key, v in sorted(counters[name].items()):
+            out.append(f"{name}{_fmt_labels(key)} {v:g}")
+    for name in sorted(gauges):
+        head(name, "gauge")
+        for key, v in sorted(gauges[name].items()):
+            out.append(f"{name}{_fmt_labels(key)} {v:g}")
+    for name in sorted(hists):
+        head(name, "histogram")
+        for key, h in sorted(hists[name].items()):
+            cum = 0.0
+            for i, bound in enumerate(BUCKETS):
+                cum += h[i]
+                out.append(f"{name}_bucket{_fmt_labels(key, ('le', f'{bound:g}'))} {cum:g}")
+            out.append(f"{name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {h[-1]:g}")
+            out.append(f"{name}_sum{_fmt_labels(key)} {h[-2]:.6f}")
+            out.append(f"{name}_count{_fmt_labels(key)} {h[-1]:g}")
+    return "\n".join(out) + "\n"
+
+
+def summary_text(limit: int = 15) -> str:
+    """Admin ke liye chhota text summary (Telegram message me fit)."""
+    counters, gauges, hists = _snapshot()
+    lines = ["📊 Metrics", ""]
+
+    rows = sorted(hists.get("handler_seconds", {}).items(), key=lambda kv: -kv[1][-1])
+    if rows:
+        lines.append("Handlers (n / avg / p95 / p99 ms):")
+        for key, h in rows[:limit]:
+            label = dict(key)
+            lines.append(
+                f"  {label.get('handler')}:{label.get('key')} {h[-1]:g} / "
+                f"{h[-2] / h[-1] * 1000:.1f} / {_quantile(h, 0.95) * 1000:.1f} / "
+                f"{_quantile(h, 0.99) * 1000:.1f}"
+            )
+
+    for title, name in (
+        ("Pay0 calls", "pay0_request_seconds"),
+        ("Telegram API", "telegram_api_seconds"),
+        ("Store writes", "store_write_seconds"),
+        ("Outbox wait", "outbox_wait_seconds"),
+    ):
+        rows = sorted(hists.get(name, {}).items(), key=lambda kv: -kv[1][-1])
+        if rows:
+            lines.append("")
+            lines.append(f"{title} (n / avg / p95 ms):")
+            for key, h in rows[:limit]:
+                label = ",".join(v for _, v in key)
+                lines.append(
+                    f"  {label} {h[-1]:g} / {h[-2] / h[-1] * 1000:.1f} / {_quantile(h, 0.95) * 1000:.1f}"
+                )
+
+    for title, name in (
+        ("Pay0 outcomes", "pay0_calls_total"),
+        ("Telegram outcomes", "telegram_api_calls_total"),
+        ("Store bytes", "store_write_bytes_total"),
+        ("Handler errors", "handler_errors_total"),
+        ("Outbox", "outbox_messages_total"),
+        ("Outbox retries", "outbox_retries_total"),
+    ):
+        series = counters.get(name)
+        if series:
+            lines.append("")
+            lines.append(f"{title}:")
+            for key, v in sorted(series.items())[:limit]:
+                lines.append(f"  {','.join(v for _, v in key)}: {v:g}")
+
+    depth = gauges.get("outbox_queue_depth")
+    if depth:
+        lines.append("")
+        lines.append("Outbox queue: " + ", ".join(f"{dict(k).get('priority')} {v:g}" for k, v in sorted(depth.items())))
+
+    inventory = gauges.get("vouchers_available")
+    if inventory:
+        lines.append("")
+        lines.append("Inventory (available):")
+        for key, v in sorted(inventory.items()):
+            lines.append(f"  ₹{dict(key).get('denom')}: {v:g}")
+    return "\n".join(lines)[:4000]
+
+
+# ---------- HTTP ENDPOINT ----------
+
+_server = None
+
+
+async def _handle(req) -> Tuple[int, str, str]:
+    return 200, render_prometheus(), "text/plain; version=0.0.4"
+
+
+async def start_http():
+    """Prometheus scrape endpoint (METRICS_HOST:METRICS_PORT/METRICS_PATH).
+    Har worker process ka apna registry hai - port METRICS_PORT + WORKER_ID."""
+    global _server
+    _server = HttpServer(METRICS_HOST, METRICS_PORT + WORKER_ID)
+    _server.route("GET", METRICS_PATH, _handle)
+    await _server.start()
+    return _server
+
+
+async def stop_http() -> None:
+    global _server
+    if _server is not None:
+        await _server.stop()
+        _server = None
+
+
+describe("handler_seconds", "histogram", "Telegram update handler latency")
+describe("handler_errors_total", "counter", "Handler calls that raised")
+describe("pay0_request_seconds", "histogram", "Pay0 HTTP call latency")
+describe("pay0_wait_seconds", "histogram", "Time waiting for a Pay0 concurrency slot")
+describe("pay0_calls_total", "counter", "Pay0 calls by outcome")
+describe("telegram_api_seconds", "histogram", "Outbound Bot API call latency")
+describe("telegram_api_calls_total", "counter", "Outbound Bot API calls by method and outcome")
+describe("store_write_seconds", "histogram", "Journal flush / snapshot write duration")
+describe("store_write_bytes_total", "counter", "Bytes written by the store")
+describe("vouchers_available", "gauge", "Sellable vouchers per denomination")
+describe("vouchers_reserved", "gauge", "Vouchers held for unpaid orders per denomination")
+describe("outbox_queue_depth", "gauge", "Outgoing messages queued, retrying or in flight per priority")
+describe("outbox_messages_total", "counter", "Outgoing messages by priority and final outcome")
+describe("outbox_retries_total", "counter", "Outgoing message retries by priority and reason")
+describe("outbox_wait_seconds", "histogram", "Time a message waited in the outbox before its first send")
@@ -1,9 +1,32 @@
 # main.py
 
+import asyncio
 import logging
+import time
+
+from telegram.error import TelegramError
 from telegram.ext import ApplicationBuilder
+from telegram.request import HTTPXRequest
 
-from config import BOT_TOKEN
+import admin_notify
+import broadcast
+import data_store
+import metrics
+import outbox
+import pay0_client
+import pay0_webhook
+import reconciler
+import tg_webhook
+from config import (
+    BOT_MODE,
+    BOT_TOKEN,
+    METRICS_ENABLED,
+    OUTBOX_DRAIN_SECONDS,
+    PAY0_WEBHOOK_ENABLED,
+    UPDATE_CONCURRENCY,
+    WORKER_ID,
+)
+from persistence import StorePersistence
 from user_panel import get_user_handlers
 from admin_panel import get_admin_handlers
 
@@ -14,19 +37,70 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main():
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+class MetricsRequest(HTTPXRequest):
+    """Bot API calls (sendMessage, editMessageText, ...) ka time aur outcome."""
 
-    # register user handlers
-    for h in get_user_handlers():
-        app.add_handler(h)
+    async def post(self, url, *args, **kwargs):
+        method = url.rsplit("/", 1)[-1]
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await super().post(url, *args, **kwargs)
+        except TelegramError as e:
+            outcome = type(e).__name__  # Forbidden, BadRequest, RetryAfter, TimedOut...
+            raise
+        finally:
+            metrics.observe("telegram_api_seconds", time.perf_counter() - start, method=method)
+            metrics.inc("telegram_api_calls_total", method=method, outcome=outcome)
+
+
+async def on_startup(app):
+    reconciler.start(app)
+    # multi-worker mode me ye ek hi process me (fixed port / ek hi broadcast)
+    if WORKER_ID == 0:
+        broadcast.resume(app)
+        if PAY0_WEBHOOK_ENABLED:
+            await pay0_webhook.start(app)
+    if METRICS_ENABLED:
+        await metrics.start_http()
+
+
+async def on_stop(app):
+    # bot ka HTTP client abhi zinda hai - buffer ka digest aur queue me pade messages bhej do
+    admin_notify.flush()
+    await outbox.drain(OUTBOX_DRAIN_SECONDS)
+
+
+async def on_shutdown(app):
+    await pay0_webhook.stop()
+    await metrics.stop_http()
+    await pay0_client.close()
+    await data_store.flush()  # buffer me bacha sab disk pe
+
+
+def main():
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .request(MetricsRequest(connection_pool_size=256))
+        .concurrent_updates(UPDATE_CONCURRENCY)  # store ke ops atomic hain, buyers parallel chalein
+        .persistence(StorePersistence())  # cart / payment state restart ke baad bhi
+        .post_init(on_startup)
+        .post_stop(on_stop)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
 
-    # register admin handlers
-    for h in get_admin_handlers():
+    # register user + admin handlers (har callback ka latency histogram)
+    for h in get_user_handlers() + get_admin_handlers():
+        h.callback = metrics.instrument(h.callback)
         app.add_handler(h)
 
-    logger.info("Bot starting...")
-    app.run_polling()
+    logger.info(f"Bot starting ({BOT_MODE})...")
+    if BOT_MODE == "webhook":
+        asyncio.run(tg_webhook.run(app))
+    else:
+        app.run_polling()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,323 @@
+# order_archive.py
+#
+# Cold order history. Compaction ke time completed / failed jaise final
+# orders snapshot se nikal ke yahan append-only segment files me jaate hain
+# (ek order per line). Startup pe ye parse nahi hote - sirf zaroorat pe
+# stream karke padhe jaate hain, to RAM aur load time sales ke saath nahi
+# badhte.
+#
+# Segment ka naam us snapshot ke seq pe hai jiske saath wo likha gaya
+# (orders-<seq>.jsonl). Snapshot likhne se pehle crash hua to segment
+# "orphan" hai - uske orders abhi bhi purane snapshot/journal me hain - aur
+# load ke time delete ho jaata hai.
+#
+# Retention: jis segment ke saare orders ARCHIVE_ROTATE_DAYS se purane hain
+# wo mahine ki ek hi gzip file me merge hota hai (month-YYYY-MM.jsonl.gz).
+# File ke andar har rotate hua segment apna alag gzip member hai, to naya
+# segment jodne pe purane members bina decompress kiye copy ho jaate hain.
+# Pehli line plain JSON index header hai: count, min/max created_at, aur
+# har member ka seq, byte size aur sorted order_id list - query sirf
+# overlapping mahine kholti hai, find() sirf wo mahina jisme ID sach me hai.
+
+import bisect
+import gzip
+import io
+import json
+import logging
+import os
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import ARCHIVE_DIR
+import snapshot
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "orders-"
+_SUFFIX = ".jsonl"
+_PART_PREFIX = "month-"
+_PART_SUFFIX = ".jsonl.gz"
+
+# path -> ((mtime, size), header bina ids ke)
+_headers: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def _segments() -> List[Tuple[int, str]]:
+    """(seq, path) purane se naye ki taraf."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    out = []
+    for name in os.listdir(ARCHIVE_DIR):
+        if name.startswith(_PREFIX) and name.endswith(_SUFFIX):
+            try:
+                seq = int(name[len(_PREFIX):-len(_SUFFIX)])
+            except ValueError:
+                continue
+            out.append((seq, os.path.join(ARCHIVE_DIR, name)))
+    out.sort()
+    return out
+
+
+def _part_path(month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"{_PART_PREFIX}{month}{_PART_SUFFIX}")
+
+
+def _parts() -> List[Tuple[str, str]]:
+    """(month, path) purane mahine se naye ki taraf."""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    out = []
+    for name in os.listdir(ARCHIVE_DIR):
+        if name.startswith(_PART_PREFIX) and name.endswith(_PART_SUFFIX):
+            out.append((name[len(_PART_PREFIX):-len(_PART_SUFFIX)], os.path.join(ARCHIVE_DIR, name)))
+    out.sort()
+    return out
+
+
+def _sources() -> List[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Saari archive files purane se naye: (path, header) - plain segment ka header None."""
+    segments = _segments()
+    live = {seq for seq, _ in segments}
+    out: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+    for _, path in _parts():
+        header = _part_header(path)
+        # rotation beech me ruki thi - us seq ka segment hi sahi copy hai
+        members = [m for m in header["members"] if m["seq"] not in live]
+        if members:
+            out.append((path, dict(header, members=members)))
+    out.extend((path, None) for _, path in segments)
+    return out
+
+
+def _write_file(path: str, blob: bytes) -> None:
+    tmp = snapshot.write_tmp(path, blob)
+    os.replace(tmp, path)
+
+
+def _encode(orders: List[Dict[str, Any]]) -> bytes:
+    return "".join(
+        json.dumps(o, separators=(",", ":"), ensure_ascii=False) + "\n" for o in orders
+    ).encode("utf-8")
+
+
+def write_segment(seq: int, orders: List[Dict[str, Any]]) -> None:
+    """Orders ko naye segment me likho (tmp + fsync + rename)."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(ARCHIVE_DIR, f"{_PREFIX}{seq:012d}{_SUFFIX}")
+    _write_file(path, _encode(orders))
+    snapshot.fsync_dir(path)
+
+
+def drop_orphans(snapshot_seq: int) -> None:
+    """Load hue snapshot ke baad wale segments / part members (aur adhoori .tmp) hatao."""
+    for seq, path in _segments():
+        if seq > snapshot_seq:
+            logger.warning("Removing orphan archive segment %s", path)
+            os.remove(path)
+    if os.path.isdir(ARCHIVE_DIR):
+        for name in os.listdir(ARCHIVE_DIR):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(ARCHIVE_DIR, name))
+    for month, path in _parts():
+        members = _load_header(path)["members"]
+        keep = [m for m in members if m["seq"] <= snapshot_seq]
+        if len(keep) == len(members):
+            continue
+        logger.warning("Removing %d orphan member(s) from archive part %s", len(members) - len(keep), path)
+        if keep:
+            _write_part(path, month, _member_blobs(path, keep))
+        else:
+            os.remove(path)
+            _headers.pop(path, None)
+
+
+# ---------- ROTATION ----------
+
+def _load_header(path: str) -> Dict[str, Any]:
+    """Poora header (member ids samet), har member ka file offset jod ke."""
+    with open(path, "rb") as f:
+        header = json.loads(f.readline())
+        offset = f.tell()
+    for m in header["members"]:
+        m["offset"] = offset
+        offset += m["size"]
+    return header
+
+
+def _part_header(path: str) -> Dict[str, Any]:
+    # id lists ke bina cache - RAM archive ke size ke saath na badhe. Part
+    # rotation pe dobara likhi jaati hai, isliye mtime/size se check.
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _headers.get(path)
+    if cached is None or cached[0] != key:
+        header = _load_header(path)
+        for m in header["members"]:
+            del m["ids"]
+        cached = _headers[path] = (key, header)
+    return cached[1]
+
+
+def _member_blobs(path: str, members: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], bytes]]:
+    out = []
+    with open(path, "rb") as f:
+        for m in members:
+            f.seek(m["offset"])
+            out.append((m, f.read(m["size"])))
+    return out
+
+
+def _member(seq: int, orders: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], bytes]:
+    blob = gzip.compress(_encode(orders))
+    created = [o.get("created_at") or "" for o in orders]
+    meta = {
+        "seq": seq,
+        "size": len(blob),
+        "count": len(orders),
+        "min_created": min(created),
+        "max_created": max(created),
+        "ids": sorted(o.get("order_id") or "" for o in orders),
+    }
+    return meta, blob
+
+
+def _write_part(path: str, month: str, members: List[Tuple[Dict[str, Any], bytes]]) -> None:
+    metas = [{k: v for k, v in m.items() if k != "offset"} for m, _ in members]
+    header = {
+        "month": month,
+        "count": sum(m["count"] for m in metas),
+        "min_created": min(m["min_created"] for m in metas),
+        "max_created": max(m["max_created"] for m in metas),
+        "members": metas,
+    }
+    head = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8") + b"\n"
+    _write_file(path, head + b"".join(blob for _, blob in members))
+    _headers.pop(path, None)
+
+
+def _merge(month: str, chunks: List[Tuple[int, List[Dict[str, Any]]]]) -> None:
+    """Mahine ki part me naye segments ke orders jodo (purane members as-is)."""
+    path = _part_path(month)
+    members = _member_blobs(path, _load_header(path)["members"]) if os.path.exists(path) else []
+    have = {m["seq"] for m, _ in members}
+    for seq, orders in chunks:
+        if seq in have:
+            continue  # pichli rotation yahan tak pahunch chuki thi
+        members.append(_member(seq, orders))
+    _write_part(path, month, members)
+
+
+def rotate(cutoff: str) -> int:
+    """Jin segments ke saare orders `cutoff` (created_at ISO) se purane hain
+    unhe mahine ki parts me merge karo. Kitne segments rotate hue, return."""
+    ready: List[Tuple[int, str]] = []
+    by_month: Dict[str, List[Tuple[int, List[Dict[str, Any]]]]] = defaultdict(list)
+    for seq, path in _segments():
+        orders = list(_read(path, None))
+        if any((o.get("created_at") or "") >= cutoff for o in orders):
+            continue  # abhi naye orders hain - agli baar
+        chunks: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for o in orders:
+            chunks[(o.get("created_at") or "0000-00")[:7]].append(o)
+        for month, chunk in chunks.items():
+            by_month[month].append((seq, chunk))
+        ready.append((seq, path))
+    if not ready:
+        return 0
+    # har mahina ek hi baar dobara likha jata hai, chahe kitne segments aaye
+    for month in sorted(by_month):
+        _merge(month, by_month[month])
+    snapshot.fsync_dir(_part_path(max(by_month)))
+    # crash yahan hua to segment live rehta hai: reads uska member skip karte
+    # hain, aur agli rotation bas segment hata deti hai - duplicate nahi
+    for _, path in ready:
+        os.remove(path)
+    return len(ready)
+
+
+# ---------- READ / QUERY ----------
+
+def _read(path: str, header: Optional[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as f:
+        if header is None:
+            yield from _lines(f)
+            return
+        # har member alag gzip stream - sirf header me diye members padho
+        for m in header["members"]:
+            f.seek(m["offset"])
+            yield from _lines(gzip.GzipFile(fileobj=io.BytesIO(f.read(m["size"]))))
+
+
+def _lines(f) -> Iterator[Dict[str, Any]]:
+    for line in io.TextIOWrapper(f, encoding="utf-8"):
+        if line.strip():
+            yield json.loads(line)
+
+
+def _overlaps(header: Optional[Dict[str, Any]], since: Optional[str], until: Optional[str]) -> bool:
+    if header is None:
+        return True  # plain segment - index nahi, chhote hain, scan kar lo
+    if since is not None and header["max_created"] < since:
+        return False
+    if until is not None and header["min_created"] >= until:
+        return False
+    return True
+
+
+def query(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    statuses: Optional[List[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """since <= created_at < until (ISO strings) wale archived orders stream karo.
+    Sirf overlapping files khulti hain."""
+    for path, header in _sources():
+        if not _overlaps(header, since, until):
+            continue
+        for o in _read(path, header):
+            created = o.get("created_at") or ""
+            if since is not None and created < since:
+                continue
+            if until is not None and created >= until:
+                continue
+            if statuses is not None and o.get("status") not in statuses:
+                continue
+            yield o
+
+
+def iter_orders() -> Iterator[Dict[str, Any]]:
+    """Saare archived orders, purane se naye, stream karke."""
+    return query()
+
+
+def _has_id(path: str, header: Dict[str, Any], order_id: str) -> bool:
+    # ids cache me nahi rakhte - header line disk se, gzip body ko haath nahi
+    wanted = {m["seq"] for m in header["members"]}
+    for m in _load_header(path)["members"]:
+        if m["seq"] not in wanted:
+            continue
+        i = bisect.bisect_left(m["ids"], order_id)
+        if i < len(m["ids"]) and m["ids"][i] == order_id:
+            return True
+    return False
+
+
+def find(order_id: str) -> Optional[Dict[str, Any]]:
+    # naye files pehle - recent order ki lookup jaldi milti hai
+    for path, header in reversed(_sources()):
+        if header is not None and not _has_id(path, header, order_id):
+            continue
+        for o in _read(path, header):
+            if o.get("order_id") == order_id:
+                return o
+    return None
+
+
+def tail(n: int) -> List[Dict[str, Any]]:
+    """Aakhri n archived orders (sirf utni files padhta hai jitni chahiye)."""
+    out: deque = deque()
+    for path, header in reversed(_sources()):
+        if len(out) >= n:
+            break
+        out.extendleft(reversed(deque(_read(path, header), maxlen=n)))
+    return list(out)[-n:]
@@ -0,0 +1,40 @@
+# order_states.py
+#
+# Order status state machine - dono storage backends isi table se decide
+# karte hain ki status change allowed hai ya nahi (e.g. completed -> failed
+# kabhi nahi). Concurrent handlers me ek order do baar deliver nahi hota.
+
+# in statuses me order abhi payment ka wait kar raha hai
+PENDING_STATUSES = ("created", "await_payment", "unknown")
+# in statuses se Pay0 SUCCESS pe delivery claim hoti hai (der se aaya payment bhi)
+PAYABLE_STATUSES = PENDING_STATUSES + ("expired",)
+# payment ho chuka par codes nahi lage - stock khatam, ya claim ke baad crash
+RECOVERABLE_STATUSES = ("paid_no_stock", "paid")
+
+TRANSITIONS = {
+    "created": ("await_payment", "paylink_error", "paid", "failed", "expired", "unknown"),
+    "await_payment": ("paid", "failed", "expired", "unknown"),
+    "unknown": ("await_payment", "paid", "failed", "expired"),
+    "expired": ("paid",),                     # der se aaya payment bhi deliver ho
+    "paid": ("completed", "paid_no_stock"),   # "paid" = delivery claim ho chuki
+    "paid_no_stock": ("paid",),               # restock ke baad admin /deliver se dobara claim
+    "paylink_error": (),
+    "completed": (),
+    "failed": (),
+}
+
+
+def can_transition(old: str, new: str) -> bool:
+    # same status pe sirf baaki fields update ho rahe hain - allowed. Isliye
+    # "claim" ke liye ye kaafi nahi (paid -> paid bhi True) - claim_order use karo
+    return old == new or new in TRANSITIONS.get(old, ())
+
+
+def claim_sources(new: str, from_statuses) -> list:
+    """from_statuses me se wo jinse `new` pe sach me jaa sakte hain (same status nahi)."""
+    return [s for s in from_statuses if s != new and new in TRANSITIONS.get(s, ())]
+
+
+def is_terminal(status: str) -> bool:
+    # aage koi transition nahi - order history (archive) me ja sakta hai
+    return status in TRANSITIONS and not TRANSITIONS[status]
@@ -0,0 +1,198 @@
+# outbox.py
+#
+# Bot ki taraf se shuru hone wale saare outgoing messages (voucher delivery,
+# admin / user notifications, broadcast) ek hi priority queue se jaate hain.
+# Global token bucket (Telegram ~30 msg/sec) aur har chat ka apna bucket;
+# queue me hamesha sabse oonchi priority pehle - admin alerts ki baadh ya
+# bada broadcast customer ke voucher ko kabhi nahi rokta.
+#
+# Jis chat ka bucket khaali hai uska message dispatcher ko nahi rokta - wo
+# baad me queue me wapas aata hai, beech me doosre chats ke messages jaate
+# hain. RetryAfter / network error pe backoff ke saath retry, Forbidden /
+# BadRequest turant caller ko. User ke update ka seedha jawab (reply_text,
+# edit_message_text) isse nahi guzarta.
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+
+import metrics
+from config import (
+    OUTBOX_CHAT_BURST,
+    OUTBOX_CHAT_RATE,
+    OUTBOX_MAX_RETRIES,
+    OUTBOX_RATE,
+    OUTBOX_RETRY_BASE,
+    OUTBOX_WORKERS,
+    WORKERS,
+)
+from ratelimit import PerChatLimiter, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# priority - chhota number pehle
+DELIVERY = 0
+NOTIFY = 1
+BROADCAST = 2
+_NAMES = {DELIVERY: "delivery", NOTIFY: "notify", BROADCAST: "broadcast"}
+
+# Telegram limit poore bot pe hai - workers me baant do
+_global = TokenBucket(OUTBOX_RATE / WORKERS, OUTBOX_RATE / WORKERS)
+_per_chat = PerChatLimiter(OUTBOX_CHAT_RATE, OUTBOX_CHAT_BURST)
+_queue: Optional[asyncio.PriorityQueue] = None
+_seq = itertools.count()
+_workers: List[asyncio.Task] = []
+# priority -> queued + retry ke wait me + bhej rahe (metrics / drain ke liye)
+_depth: Dict[int, int] = {DELIVERY: 0, NOTIFY: 0, BROADCAST: 0}
+_idle: Optional[asyncio.Event] = None
+# global token ka wait ek time pe ek dispatcher - token milne ke baad hi job
+# uthata hai, to us waqt queue ka sabse oonchi priority wala job jata hai
+_gate: Optional[asyncio.Lock] = None
+
+
+def _ensure_started() -> None:
+    global _queue, _idle, _gate
+    if _workers:
+        return
+    _queue = asyncio.PriorityQueue()
+    _idle = asyncio.Event()
+    _gate = asyncio.Lock()
+    _idle.set()
+    loop = asyncio.get_running_loop()
+    for i in range(OUTBOX_WORKERS):
+        _workers.append(loop.create_task(_dispatch(), name=f"outbox-{i}"))
+
+
+def submit(bot, method: str, priority: int, **kwargs) -> asyncio.Future:
+    """bot.<method>(**kwargs) queue me. Future ka result Telegram ka jawab,
+    ya retries ke baad aakhri error."""
+    _ensure_started()
+    job = {
+        "bot": bot,
+        "method": method,
+        "kwargs": kwargs,
+        "priority": priority,
+        "future": asyncio.get_running_loop().create_future(),
+        "queued": time.monotonic(),
+        "attempt": 0,
+    }
+    _depth[priority] += 1
+    _idle.clear()
+    _put(job)
+    return job["future"]
+
+
+async def send(bot, method: str, priority: int, **kwargs) -> Any:
+    return await submit(bot, method, priority, **kwargs)
+
+
+def notify(bot, chat_id: int, text: str, **kwargs) -> None:
+    """Fire-and-forget notification (admin alerts, order updates). Caller
+    nahi rukta; aakhri failure sirf log hota hai."""
+    future = submit(bot, "send_message", NOTIFY, chat_id=chat_id, text=text, **kwargs)
+    future.add_done_callback(_log_failure)
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Notification failed: {future.exception()}")
+
+
+def _put(job: Dict[str, Any]) -> None:
+    # seq same priority me FIFO rakhta hai (retry apni purani jagah pe)
+    if "seq" not in job:
+        job["seq"] = next(_seq)
+    _queue.put_nowait((job["priority"], job["seq"], job))
+
+
+def _later(job: Dict[str, Any], delay: float) -> None:
+    asyncio.get_running_loop().call_later(delay, _put, job)
+
+
+def _finish(job: Dict[str, Any], outcome: str, result: Any = None, error: Optional[Exception] = None) -> None:
+    priority = job["priority"]
+    _depth[priority] -= 1
+    if not any(_depth.values()):
+        _idle.set()
+    metrics.inc("outbox_messages_total", priority=_NAMES[priority], outcome=outcome)
+    future = job["future"]
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+async def _dispatch() -> None:
+    while True:
+        # pehle job utha ke token ka wait karte to token ke intezar me baithe
+        # broadcast jobs naye aaye delivery se pehle chale jaate
+        async with _gate:
+            await _global.acquire()
+            _, _, job = await _queue.get()
+        chat_id = job["kwargs"].get("chat_id")
+        wait = _per_chat.bucket(chat_id).delay() if chat_id is not None else 0.0
+        if wait > 0:
+            _global.refund()
+            _later(job, wait)  # ye chat abhi limit pe - doosre chats chalne do
+            continue
+        await _attempt(job)
+
+
+async def _attempt(job: Dict[str, Any]) -> None:
+    name = _NAMES[job["priority"]]
+    if job["attempt"] == 0:
+        metrics.observe("outbox_wait_seconds", time.monotonic() - job["queued"], priority=name)
+    try:
+        result = await getattr(job["bot"], job["method"])(**job["kwargs"])
+    except RetryAfter as e:
+        # flood limit poore bot pe - sab dispatchers itni der ruko
+        _global.pause(float(e.retry_after))
+        _retry(job, float(e.retry_after), "retry_after", e)
+    except BadRequest as e:
+        # PTB me BadRequest bhi NetworkError hai - par retry se kuch nahi badlega
+        _finish(job, "failed", error=e)
+    except NetworkError as e:
+        _retry(job, OUTBOX_RETRY_BASE * 2 ** job["attempt"], "network", e)
+    except TelegramError as e:
+        # Forbidden etc.
+        _finish(job, "failed", error=e)
+    except Exception as e:
+        logger.error(f"Outbox {job['method']} crashed: {e}")
+        _finish(job, "failed", error=e)
+    else:
+        _finish(job, "sent", result)
+
+
+def _retry(job: Dict[str, Any], delay: float, reason: str, error: Exception) -> None:
+    if job["attempt"] >= OUTBOX_MAX_RETRIES:
+        _finish(job, "failed", error=error)
+        return
+    job["attempt"] += 1
+    metrics.inc("outbox_retries_total", priority=_NAMES[job["priority"]], reason=reason)
+    _later(job, delay)
+
+
+async def drain(timeout: float) -> None:
+    """Shutdown pe: queue khaali hone tak (max timeout) ruko, phir dispatchers band."""
+    if not _workers:
+        return
+    try:
+        await asyncio.wait_for(_idle.wait(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"Outbox drain timed out, {sum(_depth.values())} message(s) dropped")
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+# queue depth per priority - scrape / /metrics ke time
+metrics.gauge_callback(
+    "outbox_queue_depth", lambda: {(("priority", _NAMES[p]),): float(n) for p, n in _depth.items()}
+)
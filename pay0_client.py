@@ -0,0 +1,129 @@
+# pay0_client.py
+#
+# Async Pay0 API client. Ek hi pooled httpx session (keep-alive) poore bot
+# ke liye, taaki Pay0 ka slow response event loop ko block na kare.
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+import metrics
+from config import (
+    PAY0_API_KEY,
+    PAY0_BASE_URL,
+    PAY0_CONNECT_TIMEOUT,
+    PAY0_MAX_CONCURRENCY,
+    PAY0_MAX_CONNECTIONS,
+    PAY0_READ_TIMEOUT,
+    PAY0_REDIRECT_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+_base_url = PAY0_BASE_URL
+_client: Optional[httpx.AsyncClient] = None
+_sem = asyncio.Semaphore(PAY0_MAX_CONCURRENCY)
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=_base_url,
+            timeout=httpx.Timeout(
+                PAY0_READ_TIMEOUT,
+                connect=PAY0_CONNECT_TIMEOUT,
+                pool=PAY0_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=PAY0_MAX_CONNECTIONS,
+                max_keepalive_connections=PAY0_MAX_CONNECTIONS,
+                keepalive_expiry=60.0,
+            ),
+        )
+    return _client
+
+
+async def set_base_url(url: str) -> None:
+    """Client ko dusre server pe point karo (e.g. tests ke liye local fake Pay0)."""
+    global _base_url
+    _base_url = url
+    await close()
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _post(call: str, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    waited = time.perf_counter()
+    async with _sem:
+        start = time.perf_counter()
+        metrics.observe("pay0_wait_seconds", start - waited, call=call)
+        try:
+            resp = await _get_client().post(path, data=payload)
+        finally:
+            metrics.observe("pay0_request_seconds", time.perf_counter() - start, call=call)
+    return resp.json()
+
+
+async def create_pay0_order(amount: float, order_id: str, customer_mobile: str, customer_name: str) -> str:
+    try:
+        payload = {
+            "customer_mobile": customer_mobile,
+            "customer_name": customer_name or "Telegram User",
+            "user_token": PAY0_API_KEY,
+            "amount": str(amount),
+            "order_id": order_id,
+            "redirect_url": PAY0_REDIRECT_URL,
+            "remark1": "telegram_bot",
+            "remark2": "shein_voucher",
+        }
+
+        data = await _post("create_order", "/api/create-order", payload)
+        logger.info(f"Pay0 create-order response: {data}")
+
+        if data.get("status") is True and "result" in data:
+            metrics.inc("pay0_calls_total", call="create_order", outcome="ok")
+            return data["result"].get("payment_url", "")
+
+        metrics.inc("pay0_calls_total", call="create_order", outcome="rejected")
+        return ""
+    except Exception as e:
+        logger.error(f"Error in create_pay0_order: {e}")
+        metrics.inc("pay0_calls_total", call="create_order", outcome="error")
+        return ""
+
+
+async def check_payment_status(order_id: str) -> str:
+    try:
+        payload = {
+            "user_token": PAY0_API_KEY,
+            "order_id": order_id,
+        }
+
+        data = await _post("check_status", "/api/check-order-status", payload)
+        logger.info(f"Pay0 check-status response: {data}")
+
+        result = "unknown"
+        if data.get("status") is True and "result" in data:
+            txn_status = data["result"].get("txnStatus", "").upper()
+            if txn_status == "SUCCESS":
+                result = "success"
+            elif txn_status == "PENDING":
+                result = "pending"
+            elif txn_status == "FAILED":
+                result = "failed"
+        metrics.inc("pay0_calls_total", call="check_status", outcome=result)
+        return result
+
+    except Exception as e:
+        logger.error(f"Error in check_payment_status: {e}")
+        metrics.inc("pay0_calls_total", call="check_status", outcome="error")
+        return "error"
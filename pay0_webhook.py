@@ -0,0 +1,98 @@
+# pay0_webhook.py
+#
+# Pay0 payment callback receiver. Pay0 payment hone pe yahan POST karta hai,
+# hum status Pay0 API se confirm karke turant voucher deliver kar dete hain -
+# user ko "I Have Paid" dabane ya reconciler ke agle run ka wait nahi.
+
+import hashlib
+import hmac
+import json
+import logging
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl
+
+from config import (
+    PAY0_WEBHOOK_HOST,
+    PAY0_WEBHOOK_PATH,
+    PAY0_WEBHOOK_PORT,
+    PAY0_WEBHOOK_SECRET,
+)
+from data_store import get_order, release_async, update_order_async
+from fulfilment import fulfil_order
+from http_server import HttpServer, Request
+from order_states import PAYABLE_STATUSES
+from pay0_client import check_payment_status
+
+logger = logging.getLogger(__name__)
+
+_app = None
+_server: Optional[HttpServer] = None
+
+
+def _parse_body(req: Request) -> Dict[str, Any]:
+    ctype = req.headers.get("content-type", "")
+    if "json" in ctype:
+        return json.loads(req.body or b"{}")
+    return dict(parse_qsl(req.body.decode("utf-8")))
+
+
+def _signature_ok(req: Request) -> bool:
+    sent = req.headers.get("x-pay0-signature", "")
+    expected = hmac.new(PAY0_WEBHOOK_SECRET.encode(), req.body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(sent, expected)
+
+
+async def handle_callback(req: Request):
+    if not _signature_ok(req):
+        logger.warning(f"Pay0 callback with bad signature from {req.peer}")
+        return 403, "bad signature"
+
+    try:
+        payload = _parse_body(req)
+    except ValueError:
+        return 400, "bad body"
+
+    order_id = payload.get("order_id")
+    if not order_id:
+        return 400, "missing order_id"
+
+    # sirf hot orders - pending order kabhi archive me nahi hota, aur bahar
+    # se aayi request pe archive ka disk scan nahi chahiye
+    order = get_order(order_id, archived=False)
+    if order is None:
+        return 404, "unknown order"
+    if order.get("status") not in PAYABLE_STATUSES:
+        return 200, "ok"  # duplicate callback - pehle hi settle ho chuka
+
+    # callback ke content pe bharosa nahi, asli status Pay0 se pucho
+    status = await check_payment_status(order_id)
+    if status == "success":
+        result = await fulfil_order(_app.bot, order_id)
+        logger.info(f"Pay0 callback delivered {order_id}: {result}")
+    elif status == "failed":
+        await update_order_async(order_id, status="failed")
+        await release_async(order_id)
+    else:
+        logger.info(f"Pay0 callback for {order_id} but status is {status}")
+    return 200, "ok"
+
+
+async def start(app) -> Optional[HttpServer]:
+    """Callback endpoint bot ke event loop me start karo. Secret ke bina
+    start nahi hota - koi bhi POST karke Pay0 API aur store pe load daal sakta."""
+    global _app, _server
+    if not PAY0_WEBHOOK_SECRET:
+        logger.error("PAY0_WEBHOOK_ENABLED hai par PAY0_WEBHOOK_SECRET khali - callback receiver start nahi hua")
+        return None
+    _app = app
+    _server = HttpServer(PAY0_WEBHOOK_HOST, PAY0_WEBHOOK_PORT)
+    _server.route("POST", PAY0_WEBHOOK_PATH, handle_callback)
+    await _server.start()
+    return _server
+
+
+async def stop() -> None:
+    global _server
+    if _server is not None:
+        await _server.stop()
+        _server = None
@@ -0,0 +1,155 @@
+# persistence.py
+#
+# PTB BasePersistence hamare store ke upar - sirf context.user_data
+# (state / denom / qty / total / order_id). Deploy ya crash ke baad user ka
+# adhoora cart aur payment wahi se chalu rehta hai.
+#
+# Pickle jaisa poora dump nahi: PTB har USER_STATE_FLUSH_SECONDS me sirf
+# un users ka data deta hai jinke updates aaye, unme se bhi sirf jinka data
+# sach me badla wo ek batch (ek journal record / ek transaction) me likhe
+# jaate hain. Load lazy hai - startup pe kuch nahi padhta, user ka pehla
+# update aane pe refresh_user_data me uska state store se aata hai.
+#
+# Multi-worker me user ka agla update kisi doosre worker pe aa sakta hai,
+# aur wo store se hi cart padhta hai - isliye cart badalne wale handlers
+# save_now() se turant likhte hain, flush interval ka wait nahi.
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional, Set
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from config import USER_STATE_FLUSH_SECONDS, WORKERS
+from data_store import get_user_state, set_user_states_async
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(data: Dict[str, Any]) -> Optional[str]:
+    if not data:
+        return None
+    try:
+        return json.dumps(data, sort_keys=True, separators=(",", ":"))
+    except (TypeError, ValueError) as e:
+        logger.error(f"user_data not JSON-serializable, skipping: {e}")
+        return None
+
+
+class StorePersistence(BasePersistence):
+    def __init__(self, update_interval: float = USER_STATE_FLUSH_SECONDS):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        # user_id -> store me jo JSON pada hai (None = kuch nahi); bina badlav
+        # wale users dobara nahi likhe jaate
+        self._saved: Dict[int, Optional[str]] = {}
+        self._loaded: Set[int] = set()
+        self._pending: Dict[int, Optional[Dict[str, Any]]] = {}
+        self._flush_scheduled = False
+
+    # ---------- USER DATA ----------
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}  # lazy - refresh_user_data pe per user
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        if user_id in self._loaded and WORKERS == 1:
+            return
+        if user_id in self._pending:
+            return  # hamara naya data abhi likha nahi gaya - wahi sahi hai
+        state = get_user_state(user_id)
+        stored = _encode(state) if state else None
+        if user_id in self._loaded and stored == self._saved.get(user_id):
+            return  # doosre worker ne nahi badla - local copy (unsaved changes samet) rakho
+        user_data.clear()
+        if state:
+            user_data.update(state)
+        self._saved[user_id] = stored
+        self._loaded.add(user_id)
+
+    async def write_through(self, user_id: int, data: Dict[Any, Any]) -> None:
+        await self.update_user_data(user_id, data)
+        if user_id in self._pending:
+            await self.flush()
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        encoded = _encode(data)
+        if encoded == self._saved.get(user_id):
+            return
+        self._saved[user_id] = encoded
+        self._pending[user_id] = json.loads(encoded) if encoded else None
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        if self._saved.get(user_id) is not None:
+            self._saved[user_id] = None
+            self._pending[user_id] = None
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        # PTB ek run me sab users ke update_user_data ek saath (gather) chalata
+        # hai - flush unke baad ek hi baar, poore batch ke saath
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> None:
+        self._flush_scheduled = False
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await set_user_states_async(batch)
+        except Exception as e:
+            logger.error(f"User state flush failed ({len(batch)} users): {e}")
+            # agli baar phir try
+            for user_id, state in batch.items():
+                self._pending.setdefault(user_id, state)
+
+    # ---------- NOT USED (sirf user_data persist hota hai) ----------
+
+    async def get_chat_data(self) -> Dict[int, Any]:
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data: Any) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def get_bot_data(self) -> Any:
+        return {}
+
+    async def update_bot_data(self, data: Any) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Any) -> None:
+        pass
+
+    async def get_callback_data(self) -> Optional[Any]:
+        return None
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def get_conversations(self, name: str) -> Dict:
+        return {}
+
+    async def update_conversation(self, name: str, key, new_state: Optional[object]) -> None:
+        pass
+
+
+async def save_now(context, user_id: int) -> None:
+    """Handler ka badla user_data abhi store me (sirf WORKERS > 1 - ek worker
+    me local copy hi sahi hai, PTB ka batch flush kaafi hai)."""
+    if WORKERS == 1:
+        return
+    persistence = context.application.persistence
+    if isinstance(persistence, StorePersistence):
+        await persistence.write_through(user_id, context.user_data)
@@ -0,0 +1,79 @@
+# ratelimit.py
+#
+# Telegram rate limits ke liye token buckets (asyncio). Global limit ~30
+# msg/sec aur ek chat me ~1 msg/sec - dono ke liye yahi helpers.
+
+import asyncio
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """`rate` tokens/sec, max `capacity` burst. acquire() token milne tak wait karta hai."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float) -> None:
+        # Telegram RetryAfter: itni der tak koi token nahi
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+    def refund(self) -> None:
+        # token liya par message gaya nahi (e.g. chat abhi limit pe)
+        self.tokens = min(self.capacity, self.tokens + 1.0)
+
+    def delay(self) -> float:
+        """Abhi token le sakte hain to 0 (aur token le liya), warna kitna rukna hai."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while True:
+            wait = self.delay()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class PerChatLimiter:
+    """Har chat ka apna chhota bucket; purani idle entries apne aap saaf."""
+
+    def __init__(self, rate: float, capacity: float = 1.0, max_chats: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_chats = max_chats
+        self.buckets: Dict[int, TokenBucket] = {}
+
+    def bucket(self, chat_id: int) -> TokenBucket:
+        b = self.buckets.get(chat_id)
+        if b is None:
+            if len(self.buckets) >= self.max_chats:
+                self._cleanup()
+            b = self.buckets[chat_id] = TokenBucket(self.rate, self.capacity)
+        return b
+
+    def _cleanup(self) -> None:
+        # jo bucket poora bhar chuka hai wo idle hai - hata do
+        now = time.monotonic()
+        for chat_id, b in list(self.buckets.items()):
+            b._refill(now)
+            if b.tokens >= b.capacity and now >= b.blocked_until:
+                del self.buckets[chat_id]
+
+    async def acquire(self, chat_id: int) -> None:
+        await self.bucket(chat_id).acquire()
@@ -0,0 +1,196 @@
+# reconciler.py
+#
+# Background payment reconciler (JobQueue). Pending orders ka Pay0 status
+# khud check karta hai, SUCCESS pe voucher deliver, TTL ke baad expire.
+# User ko "I Have Paid" dabane ki zarurat nahi, aur button spam se Pay0
+# pe extra calls nahi jaate (check_now cached status deta hai).
+
+import asyncio
+import heapq
+import logging
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import outbox
+from config import (
+    ORDER_TTL_SECONDS,
+    PAY0_RECHECK_SECONDS,
+    PAY0_WEBHOOK_ENABLED,
+    RECONCILE_BATCH,
+    RECONCILE_INTERVAL,
+    RECONCILE_MAX_DELAY,
+    RECONCILE_MIN_DELAY,
+    RECONCILE_RESCAN_SECONDS,
+    WORKER_ID,
+    WORKERS,
+)
+from data_store import get_order, orders_with_status, release_async, update_order_async
+from fulfilment import fulfil_order
+from order_states import PENDING_STATUSES, RECOVERABLE_STATUSES
+from pay0_client import check_payment_status
+
+logger = logging.getLogger(__name__)
+
+# (next_check_ts, order_id) - time-ordered index of pending orders
+_heap: List[Tuple[float, str]] = []
+_due: Dict[str, float] = {}
+# order_id -> (checked_at, status) - button spam ke liye cache
+_last_check: Dict[str, Tuple[float, str]] = {}
+# webhook on ho to reconciler sirf safety net hai, dheere check karo
+_min_delay = RECONCILE_MIN_DELAY
+# multi-worker: aakhri baar store se owned pending orders kab uthaye
+_last_scan = 0.0
+
+
+def _age_seconds(order: dict) -> float:
+    try:
+        created = datetime.fromisoformat(order["created_at"])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+    return (datetime.utcnow() - created).total_seconds()
+
+
+def _next_delay(age: float) -> float:
+    # naya order jaldi-jaldi, purana dheere (age ke saath backoff)
+    return min(RECONCILE_MAX_DELAY, max(_min_delay, age / 4))
+
+
+def track(order_id: str, delay: Optional[float] = None) -> None:
+    due = time.time() + (_min_delay if delay is None else delay)
+    _due[order_id] = due
+    heapq.heappush(_heap, (due, order_id))
+
+
+def _untrack(order_id: str) -> None:
+    _due.pop(order_id, None)
+    _last_check.pop(order_id, None)
+
+
+async def check_now(order_id: str) -> str:
+    """Button ke liye status check; thodi der pehle check hua tha to wahi result."""
+    cached = _last_check.get(order_id)
+    if cached and time.time() - cached[0] < PAY0_RECHECK_SECONDS:
+        return cached[1]
+    status = await check_payment_status(order_id)
+    _last_check[order_id] = (time.time(), status)
+    return status
+
+
+async def _expire(bot, order: dict) -> None:
+    order_id = order["order_id"]
+    await update_order_async(order_id, status="expired")
+    await release_async(order_id)
+    _untrack(order_id)
+    outbox.notify(
+        bot,
+        order["user_id"],
+        f"⌛ Order `{order_id}` expired - payment was not received in time.",
+        parse_mode="Markdown",
+    )
+
+
+async def _settle(bot, order: dict, status: str) -> None:
+    order_id = order["order_id"]
+    if status == "success":
+        _untrack(order_id)
+        result = await fulfil_order(bot, order_id)
+        logger.info(f"Reconciler delivered {order_id}: {result}")
+        return
+
+    if status == "failed":
+        await update_order_async(order_id, status="failed")
+        await release_async(order_id)
+        _untrack(order_id)
+        outbox.notify(
+            bot,
+            order["user_id"],
+            f"❌ Payment failed for Order `{order_id}`.\n"
+            "If money is deducted, please contact support with your Order ID.",
+            parse_mode="Markdown",
+        )
+        return
+
+    # pending / unknown / error - baad me phir dekho; TTL pe ek check zaroor
+    age = _age_seconds(order)
+    track(order_id, min(_next_delay(age), max(0.0, ORDER_TTL_SECONDS - age)))
+
+
+async def _rescan(now: float) -> None:
+    # naya order usi worker ki memory me track hota hai jisne banaya; wo
+    # restart ho jaye to uske orders sirf is scan se kisi ke paas aate hain
+    global _last_scan
+    if WORKERS == 1 or now - _last_scan < RECONCILE_RESCAN_SECONDS:
+        return
+    _last_scan = now
+    pending = await asyncio.to_thread(orders_with_status, list(PENDING_STATUSES))
+    for order in pending:
+        if _owned(order["order_id"]) and order["order_id"] not in _due:
+            track(order["order_id"], 0)
+
+
+async def reconcile_job(context) -> None:
+    now = time.time()
+    await _rescan(now)
+    batch = []
+    while _heap and _heap[0][0] <= now and len(batch) < RECONCILE_BATCH:
+        due, order_id = heapq.heappop(_heap)
+        if _due.get(order_id) != due:
+            continue  # purani entry, naya schedule heap me hai
+        del _due[order_id]
+
+        order = get_order(order_id)
+        if order is None or order.get("status") not in PENDING_STATUSES:
+            _untrack(order_id)
+            continue
+        # TTL nikal gaya ho to bhi expire se pehle ek aakhri Pay0 check -
+        # aakhri minute me pay kiya ho to codes milen, "expired" nahi
+        batch.append(order)
+
+    if not batch:
+        return
+
+    statuses = await asyncio.gather(*(check_now(o["order_id"]) for o in batch))
+    for order, status in zip(batch, statuses):
+        try:
+            if status not in ("success", "failed") and _age_seconds(order) > ORDER_TTL_SECONDS:
+                await _expire(context.bot, order)
+                continue
+            await _settle(context.bot, order, status)
+        except Exception as e:
+            logger.error(f"Reconcile error for {order['order_id']}: {e}")
+            track(order["order_id"], RECONCILE_MAX_DELAY)
+
+
+def _owned(order_id: str) -> bool:
+    # multi-worker: pending orders workers me baant do (har order ek ke paas) -
+    # startup aur periodic rescan dono isi se
+    return zlib.crc32(order_id.encode()) % WORKERS == WORKER_ID
+
+
+async def _recover_paid(context) -> None:
+    # claim ke baad, codes lagne se pehle process ruka tha - wahi order aage badhao
+    for order_id in context.job.data:
+        try:
+            result = await fulfil_order(context.bot, order_id, from_statuses=RECOVERABLE_STATUSES)
+            logger.info(f"Recovered paid order {order_id}: {result}")
+        except Exception as e:
+            logger.error(f"Recovery of paid order {order_id} failed: {e}")
+
+
+def start(app) -> None:
+    """Startup pe store se pending orders uthao aur repeating job lagao."""
+    global _min_delay, _last_scan
+    if PAY0_WEBHOOK_ENABLED:
+        _min_delay = RECONCILE_MAX_DELAY
+    _last_scan = time.time()
+    for order in orders_with_status(list(PENDING_STATUSES)):
+        if _owned(order["order_id"]):
+            track(order["order_id"], 0)
+    stuck = [o["order_id"] for o in orders_with_status(["paid"]) if _owned(o["order_id"])]
+    if stuck:
+        app.job_queue.run_once(_recover_paid, 0, data=stuck, name="recover-paid")
+    app.job_queue.run_repeating(
+        reconcile_job, interval=RECONCILE_INTERVAL, first=RECONCILE_INTERVAL, name="reconcile"
+    )
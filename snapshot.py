@@ -0,0 +1,141 @@
+# snapshot.py
+#
+# data.json snapshot ka on-disk format. Pehli line ek chhota JSON header
+# (magic, version, codec, size, crc32), uske baad compact JSON body - plain
+# ya gzip. Header se load ke time corruption pakda jaata hai, taaki aadhi
+# likhi / kharab file se inventory reset na ho. Purani indent=2 wali
+# data.json (bina header) bhi padhi jaati hai.
+
+import gzip
+import io
+import json
+import os
+import zlib
+from contextlib import contextmanager
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+MAGIC = "voucher-bot-snapshot"
+VERSION = 1
+
+
+class SnapshotError(Exception):
+    """Snapshot file kharab / adhuri hai ya format samajh nahi aaya."""
+
+
+def encode(data: Dict[str, Any], compress: bool = False) -> bytes:
+    body = json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=list).encode("utf-8")
+    codec = "json"
+    if compress:
+        body = gzip.compress(body, compresslevel=1)  # speed > size
+        codec = "gzip"
+    header = {
+        "magic": MAGIC,
+        "version": VERSION,
+        "codec": codec,
+        "size": len(body),
+        "crc32": zlib.crc32(body),
+    }
+    return json.dumps(header, separators=(",", ":")).encode("ascii") + b"\n" + body
+
+
+def write_tmp(path: str, blob: bytes) -> str:
+    """blob ko `path`.tmp me likh ke fsync karo; rename caller karega."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp
+
+
+def fsync_dir(path: str) -> None:
+    # rename bhi crash ke baad tike - directory entry disk pe
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _header(f: IO[bytes]) -> Optional[Dict[str, Any]]:
+    line = f.readline(4096)
+    try:
+        header = json.loads(line)
+    except ValueError:
+        return None  # purani indent=2 file - pehli line sirf "{"
+    if not isinstance(header, dict) or header.get("magic") != MAGIC:
+        return None
+    if header.get("version", 0) > VERSION:
+        raise SnapshotError(f"snapshot version {header.get('version')} is newer than {VERSION}")
+    if header.get("codec") not in ("json", "gzip"):
+        raise SnapshotError(f"unknown codec {header.get('codec')!r}")
+    return header
+
+
+def _check(header: Dict[str, Any], size: int, crc: int) -> None:
+    if size != header["size"]:
+        raise SnapshotError(f"truncated body: {size} of {header['size']} bytes")
+    if crc != header["crc32"]:
+        raise SnapshotError("checksum mismatch")
+
+
+def read(path: str) -> Dict[str, Any]:
+    """Snapshot verify karke load karo. Kharab ho to SnapshotError."""
+    try:
+        with open(path, "rb") as f:
+            header = _header(f)
+            if header is None:
+                f.seek(0)
+                return json.loads(f.read().decode("utf-8"))
+            body = f.read()
+    except SnapshotError:
+        raise
+    except (OSError, ValueError) as e:
+        raise SnapshotError(str(e)) from e
+
+    _check(header, len(body), zlib.crc32(body))
+    try:
+        if header["codec"] == "gzip":
+            body = gzip.decompress(body)
+        return json.loads(body.decode("utf-8"))
+    except (OSError, ValueError) as e:
+        raise SnapshotError(str(e)) from e
+
+
+@contextmanager
+def open_body(path: str) -> Iterator[IO[str]]:
+    """Body ka text stream (verify karke) - badi file stream karne ke liye."""
+    with open(path, "rb") as f:
+        header = _header(f)
+        if header is None:
+            f.seek(0)
+            yield io.TextIOWrapper(f, encoding="utf-8")
+            return
+        start = f.tell()
+        size, crc = 0, 0
+        for block in iter(lambda: f.read(1 << 20), b""):
+            size += len(block)
+            crc = zlib.crc32(block, crc)
+        _check(header, size, crc)
+        f.seek(start)
+        if header["codec"] == "gzip":
+            with gzip.GzipFile(fileobj=f) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8")
+        else:
+            yield io.TextIOWrapper(f, encoding="utf-8")
+
+
+def first_valid(paths: List[str]) -> Tuple[Optional[str], List[str]]:
+    """Pehli snapshot jo verify ho jaye, aur jo files kharab mili unki list."""
+    bad = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            with open_body(path):
+                return path, bad
+        except (OSError, SnapshotError):
+            bad.append(path)
+    return None, bad
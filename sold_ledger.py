@@ -0,0 +1,178 @@
+# sold_ledger.py
+#
+# Sold-code ledger: har deliver hua code -> (order_id, user_id, denom,
+# delivered_at). Support ticket pe admin /lookup CODE se turant dekh sakta
+# hai code kisko gaya, aur bika hua code dobara stock me import nahi hota.
+#
+# Table SQLite me hai (code primary key - millions codes pe bhi ek index
+# lookup). SQLite backend me ye main db me order update ke saath usi
+# transaction me likha jata hai; JSON backend me alag SOLD_LEDGER_FILE.
+# Aage ek in-memory Bloom filter hai: "ye code kabhi nahi bika" (import ke
+# lakhon naye codes ka common case) bina disk ke pata chal jata hai.
+
+import hashlib
+import json
+import logging
+import math
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from codes import order_codes
+from config import SOLD_BLOOM_CAPACITY, SOLD_BLOOM_ERROR
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sold_codes (
+    code         TEXT PRIMARY KEY,
+    order_id     TEXT NOT NULL,
+    user_id      INTEGER,
+    denom        INTEGER,
+    delivered_at TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sold_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter. False positive ho sakta hai (tab table se
+    confirm), false negative kabhi nahi."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.k = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, code: str):
+        digest = hashlib.blake2b(code.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        # double hashing: k positions do hashes se
+        return ((h1 + i * h2) % self.size for i in range(self.k))
+
+    def add(self, code: str) -> None:
+        for pos in self._positions(code):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, code: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(code))
+
+
+# None = filter abhi bana nahi (ya band hai) - tab har lookup table pe
+_bloom: Optional[BloomFilter] = None
+# build ke dauran naye sales isme bhi jaate hain
+_building: Optional[BloomFilter] = None
+
+
+def entry(order: Dict[str, Any], code: str) -> Dict[str, Any]:
+    """Ek code ki ledger entry (get() jaisa hi dict)."""
+    return {
+        "code": code,
+        "order_id": order.get("order_id"),
+        "user_id": order.get("user_id"),
+        "denom": order.get("denom"),
+        "delivered_at": order.get("delivered_at") or order.get("created_at"),
+    }
+
+
+def put(cur: sqlite3.Cursor, order: Dict[str, Any]) -> None:
+    """Completed order ke codes ledger me (caller ka transaction)."""
+    codes: List[str] = order_codes(order)
+    rows = [entry(order, c) for c in codes]
+    cur.executemany(
+        "INSERT OR REPLACE INTO sold_codes (code, order_id, user_id, denom, delivered_at) "
+        "VALUES (:code, :order_id, :user_id, :denom, :delivered_at)",
+        rows,
+    )
+    for bloom in (_bloom, _building):
+        if bloom is not None:
+            for c in codes:
+                bloom.add(c)
+
+
+def get(cur: sqlite3.Cursor, code: str) -> Optional[Dict[str, Any]]:
+    if _bloom is not None and code not in _bloom:
+        return None
+    row = cur.execute(
+        "SELECT order_id, user_id, denom, delivered_at FROM sold_codes WHERE code = ?", (code,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"code": code, "order_id": row[0], "user_id": row[1], "denom": row[2], "delivered_at": row[3]}
+
+
+# ek IN (...) query me itne codes (SQLite ki variable limit se neeche)
+_BATCH = 500
+
+
+def get_many(cur: sqlite3.Cursor, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """get() ka batch version: bike hue codes -> entry. Import ke hazaron
+    codes pe har code ki alag query nahi - bloom ke baad chunk me IN (...)."""
+    if _bloom is not None:
+        codes = [c for c in codes if c in _bloom]
+    found: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(codes), _BATCH):
+        chunk = codes[i:i + _BATCH]
+        marks = ",".join("?" * len(chunk))
+        rows = cur.execute(
+            f"SELECT code, order_id, user_id, denom, delivered_at FROM sold_codes WHERE code IN ({marks})",
+            chunk,
+        ).fetchall()
+        for row in rows:
+            found[row[0]] = {"code": row[0], "order_id": row[1], "user_id": row[2], "denom": row[3], "delivered_at": row[4]}
+    return found
+
+
+# backfill logic badle to ye badhao - purani db ek baar phir backfill hogi
+# (2: baseline orders ka singular voucher_code bhi)
+BACKFILL_VERSION = "2"
+
+
+def backfilled(cur: sqlite3.Cursor) -> bool:
+    row = cur.execute("SELECT value FROM sold_meta WHERE key = 'backfilled'").fetchone()
+    return row is not None and row[0] == BACKFILL_VERSION
+
+
+def backfill(cur: sqlite3.Cursor, orders) -> int:
+    """Ledger se pehle ke completed orders ek baar ledger me daalo."""
+    n = 0
+    for o in orders:
+        if isinstance(o, str):
+            o = json.loads(o)
+        codes = order_codes(o)
+        if o.get("status") == "completed" and codes:
+            put(cur, o)
+            n += len(codes)
+    cur.execute("INSERT OR REPLACE INTO sold_meta (key, value) VALUES ('backfilled', ?)", (BACKFILL_VERSION,))
+    return n
+
+
+def _build_bloom(path: str) -> None:
+    global _bloom, _building
+    bloom = _building = BloomFilter(SOLD_BLOOM_CAPACITY, SOLD_BLOOM_ERROR)
+    count = 0
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            for (code,) in conn.execute("SELECT code FROM sold_codes"):
+                bloom.add(code)
+                count += 1
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.error("Sold-code bloom build failed, using table only: %s", e)
+        _building = None
+        return
+    _bloom, _building = bloom, None
+    if count > SOLD_BLOOM_CAPACITY:
+        logger.warning("Sold codes (%d) > SOLD_BLOOM_CAPACITY - bloom false positives badhenge", count)
+    logger.info("Sold-code bloom filter ready: %d codes", count)
+
+
+def start_bloom(path: str) -> None:
+    """Background thread me ledger se Bloom filter banao (startup nahi rukta)."""
+    threading.Thread(target=_build_bloom, args=(path,), name="sold-bloom", daemon=True).start()
@@ -0,0 +1,978 @@
+# sqlite_store.py
+#
+# data_store ka SQLite backend (config: STORAGE_BACKEND = "sqlite").
+# Functions ka naam aur signature data_store jaisa hi hai, handlers ko kuch
+# badalna nahi padta. Orders/users/vouchers indexed tables me rehte hain,
+# poori history RAM me load nahi hoti.
+#
+# Kai worker processes (supervisor.py) ek hi db share kar sakte hain: har
+# write `BEGIN IMMEDIATE` me hota hai, to stock check + pop / reserve /
+# order status CAS processes ke beech bhi atomic hai. Doosre process ka
+# stock change `PRAGMA data_version` se pata chalta hai (catalog_version).
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from config import (
+    DATA_FILE,
+    DEFAULT_PRICES,
+    DENOMINATIONS,
+    JOURNAL_FILE,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_FILE,
+    WORKERS,
+)
+from codes import code_hash, order_codes
+from order_states import can_transition, claim_sources
+import metrics
+import order_archive
+import snapshot
+import sold_ledger
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "add_user",
+    "get_users",
+    "remove_users",
+    "get_user_state",
+    "set_user_states",
+    "get_broadcast",
+    "set_broadcast",
+    "get_price",
+    "set_price",
+    "vouchers_for",
+    "available_count",
+    "held_count",
+    "add_vouchers",
+    "add_vouchers_unique",
+    "sold_info",
+    "sold_info_async",
+    "claim_order",
+    "pop_vouchers",
+    "pop_voucher",
+    "stock_text",
+    "catalog_version",
+    "reserve",
+    "release",
+    "commit_reservation",
+    "complete_order",
+    "add_order",
+    "update_order",
+    "get_order",
+    "get_order_async",
+    "orders_with_status",
+    "list_orders",
+    "iter_orders",
+    "query_orders",
+    "save_data",
+    "flush_sync",
+    "flush",
+    "migrate_from_json",
+    "add_user_async",
+    "get_users_async",
+    "remove_users_async",
+    "set_broadcast_async",
+    "set_price_async",
+    "add_vouchers_async",
+    "add_vouchers_unique_async",
+    "set_user_states_async",
+    "add_order_async",
+    "update_order_async",
+    "claim_order_async",
+    "pop_vouchers_async",
+    "reserve_async",
+    "release_async",
+    "commit_reservation_async",
+    "complete_order_async",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS user_state (
+    user_id INTEGER PRIMARY KEY,
+    body    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prices (
+    denom TEXT PRIMARY KEY,
+    price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vouchers (
+    id    INTEGER PRIMARY KEY AUTOINCREMENT,
+    denom TEXT NOT NULL,
+    code  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_vouchers_denom ON vouchers (denom, id);
+CREATE TABLE IF NOT EXISTS code_index (
+    h INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS stock (
+    denom     TEXT PRIMARY KEY,
+    available INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS holds (
+    order_id   TEXT PRIMARY KEY,
+    denom      TEXT NOT NULL,
+    qty        INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_holds_expiry ON holds (expires_at);
+CREATE INDEX IF NOT EXISTS idx_holds_denom ON holds (denom, expires_at);
+CREATE TABLE IF NOT EXISTS orders (
+    order_id   TEXT PRIMARY KEY,
+    user_id    INTEGER,
+    status     TEXT,
+    created_at TEXT,
+    body       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user ON orders (user_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at);
+"""
+
+_lock = threading.RLock()
+# isolation_level=None: transactions hum khud kholte hain (_write), sqlite3
+# module ka implicit deferred BEGIN nahi
+_conn = sqlite3.connect(
+    SQLITE_FILE, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False, isolation_level=None
+)
+_conn.execute("PRAGMA journal_mode=WAL")
+_conn.execute("PRAGMA synchronous=NORMAL")
+_conn.executescript(_SCHEMA)
+_conn.executescript(sold_ledger.SCHEMA)
+
+
+@contextmanager
+def _write() -> Iterator[sqlite3.Cursor]:
+    """Write transaction. IMMEDIATE = write lock shuru me hi, to andar ka
+    read (stock / status check) doosre process ke commit se purana nahi ho sakta."""
+    with _lock:
+        _conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield _conn.cursor()
+        except BaseException:
+            _conn.execute("ROLLBACK")
+            raise
+        _conn.execute("COMMIT")
+
+
+# ---------- LOW LEVEL (cursor pe, transaction caller ka) ----------
+
+def _insert_order(cur: sqlite3.Cursor, order: Dict[str, Any]) -> None:
+    cur.execute(
+        "INSERT OR REPLACE INTO orders (order_id, user_id, status, created_at, body) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            order.get("order_id"),
+            order.get("user_id"),
+            order.get("status"),
+            order.get("created_at"),
+            json.dumps(order, separators=(",", ":")),
+        ),
+    )
+
+
+def _update_order(cur: sqlite3.Cursor, order_id: str, fields: Dict[str, Any], check: bool = True) -> bool:
+    row = cur.execute("SELECT body FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+    if row is None:
+        return False
+    order = json.loads(row[0])
+    if check and "status" in fields and not can_transition(order.get("status"), fields["status"]):
+        logger.warning(
+            "Rejected order %s transition %s -> %s", order_id, order.get("status"), fields["status"]
+        )
+        return False
+    order.update(fields)
+    cur.execute(
+        "UPDATE orders SET status = ?, body = ? WHERE order_id = ?",
+        (order.get("status"), json.dumps(order, separators=(",", ":")), order_id),
+    )
+    # delivery - ledger bhi isi transaction me
+    if order.get("status") == "completed" and order.get("voucher_codes") and (
+        "status" in fields or "voucher_codes" in fields
+    ):
+        sold_ledger.put(cur, order)
+    return True
+
+
+def _bump_stock(cur: sqlite3.Cursor, denom: str, delta: int) -> None:
+    cur.execute(
+        "INSERT INTO stock (denom, available) VALUES (?, ?) "
+        "ON CONFLICT(denom) DO UPDATE SET available = available + excluded.available",
+        (denom, delta),
+    )
+
+
+def _add_vouchers(cur: sqlite3.Cursor, denom: str, codes: List[str], index: bool = True) -> None:
+    cur.executemany(
+        "INSERT INTO vouchers (denom, code) VALUES (?, ?)", [(denom, c) for c in codes]
+    )
+    if index:
+        cur.executemany(
+            "INSERT OR IGNORE INTO code_index (h) VALUES (?)", [(code_hash(c),) for c in codes]
+        )
+    _bump_stock(cur, denom, len(codes))
+
+
+# build logic badle to badhao - purani db ek baar phir index hogi
+# (2: baseline orders ka singular voucher_code bhi)
+_CODE_INDEX_VERSION = "2"
+
+
+def _build_code_index(cur: sqlite3.Cursor) -> None:
+    # ek baar: stock + bike hue codes (purani db jisme index nahi tha)
+    for (code,) in cur.execute("SELECT code FROM vouchers").fetchall():
+        cur.execute("INSERT OR IGNORE INTO code_index (h) VALUES (?)", (code_hash(code),))
+    # "voucher_code" prefix: naya voucher_codes aur baseline ka voucher_code dono
+    rows = cur.execute(
+        "SELECT body FROM orders WHERE body LIKE '%\"voucher_code%'"
+    ).fetchall()
+    for (body,) in rows:
+        for code in order_codes(json.loads(body)):
+            cur.execute("INSERT OR IGNORE INTO code_index (h) VALUES (?)", (code_hash(code),))
+    cur.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('code_index', ?)", (_CODE_INDEX_VERSION,)
+    )
+
+
+def _pop_vouchers(cur: sqlite3.Cursor, denom: str, n: int):
+    rows = cur.execute(
+        "SELECT id, code FROM vouchers WHERE denom = ? ORDER BY id LIMIT ?", (denom, n)
+    ).fetchall()
+    if n < 1 or len(rows) < n:
+        return None
+    cur.execute("DELETE FROM vouchers WHERE denom = ? AND id <= ?", (denom, rows[-1][0]))
+    _bump_stock(cur, denom, -n)
+    return [r[1] for r in rows]
+
+
+def _held(cur: sqlite3.Cursor, denom: str, now: float) -> int:
+    # (denom, expires_at) index pe sirf active holds ka range scan
+    row = cur.execute(
+        "SELECT COALESCE(SUM(qty), 0) FROM holds WHERE denom = ? AND expires_at > ?",
+        (denom, now),
+    ).fetchone()
+    return row[0]
+
+
+def _available(cur: sqlite3.Cursor, denom: str, now: float) -> int:
+    row = cur.execute("SELECT available FROM stock WHERE denom = ?", (denom,)).fetchone()
+    return (row[0] if row else 0) - _held(cur, denom, now)
+
+
+def _sweep_holds(cur: sqlite3.Cursor, now: float) -> None:
+    cur.execute("DELETE FROM holds WHERE expires_at <= ?", (now,))
+
+
+def _reserve(cur: sqlite3.Cursor, order_id: str, denom: str, qty: int, expires_at: float) -> None:
+    cur.execute(
+        "INSERT OR REPLACE INTO holds (order_id, denom, qty, expires_at) VALUES (?, ?, ?, ?)",
+        (order_id, denom, qty, expires_at),
+    )
+
+
+def _commit_reservation(cur: sqlite3.Cursor, order_id: str, now: float):
+    row = cur.execute(
+        "SELECT denom, qty FROM holds WHERE order_id = ? AND expires_at > ?", (order_id, now)
+    ).fetchone()
+    if row is None:
+        return None
+    cur.execute("DELETE FROM holds WHERE order_id = ?", (order_id,))
+    return _pop_vouchers(cur, row[0], row[1])
+
+
+def _set_user_states(cur: sqlite3.Cursor, states: Dict[Any, Optional[Dict[str, Any]]]) -> None:
+    cur.executemany(
+        "DELETE FROM user_state WHERE user_id = ?", [(int(u),) for u, s in states.items() if not s]
+    )
+    cur.executemany(
+        "INSERT OR REPLACE INTO user_state (user_id, body) VALUES (?, ?)",
+        [(int(u), json.dumps(s, separators=(",", ":"))) for u, s in states.items() if s],
+    )
+
+
+def _recount_stock(cur: sqlite3.Cursor) -> None:
+    cur.execute("DELETE FROM stock")
+    cur.execute(
+        "INSERT INTO stock (denom, available) "
+        "SELECT denom, COUNT(*) FROM vouchers GROUP BY denom"
+    )
+
+
+# ---------- USERS ----------
+
+def add_user(user_id: int) -> None:
+    with _write() as cur:
+        cur.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+
+
+def get_users() -> List[int]:
+    with _lock:
+        return [r[0] for r in _conn.execute("SELECT user_id FROM users ORDER BY rowid")]
+
+
+def remove_users(user_ids: List[int]) -> None:
+    with _write() as cur:
+        cur.executemany("DELETE FROM users WHERE user_id = ?", [(u,) for u in user_ids])
+
+
+# ---------- USER STATE (persistence.py) ----------
+
+def get_user_state(user_id: int) -> Optional[Dict[str, Any]]:
+    with _lock:
+        row = _conn.execute("SELECT body FROM user_state WHERE user_id = ?", (user_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def set_user_states(states: Dict[int, Optional[Dict[str, Any]]]) -> None:
+    """Kai users ka conversation state ek transaction me; None / {} = hata do."""
+    with _write() as cur:
+        _set_user_states(cur, states)
+
+
+# ---------- BROADCAST STATE ----------
+
+def get_broadcast() -> Optional[Dict[str, Any]]:
+    with _lock:
+        row = _conn.execute("SELECT value FROM meta WHERE key = 'broadcast'").fetchone()
+    return json.loads(row[0]) if row and row[0] else None
+
+
+def set_broadcast(state: Optional[Dict[str, Any]]) -> None:
+    with _write() as cur:
+        cur.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('broadcast', ?)",
+            (json.dumps(state) if state else None,),
+        )
+
+
+# ---------- PRICES ----------
+
+def get_price(denom: int) -> float:
+    with _lock:
+        row = _conn.execute("SELECT price FROM prices WHERE denom = ?", (str(denom),)).fetchone()
+    return float(row[0]) if row else 0.0
+
+
+def set_price(denom: int, new_price: float) -> None:
+    with _write() as cur:
+        cur.execute(
+            "INSERT OR REPLACE INTO prices (denom, price) VALUES (?, ?)",
+            (str(denom), float(new_price)),
+        )
+        _catalog_changed(cur)
+
+
+# ---------- VOUCHERS ----------
+
+def vouchers_for(denom: int) -> List[str]:
+    with _lock:
+        rows = _conn.execute(
+            "SELECT code FROM vouchers WHERE denom = ? ORDER BY id", (str(denom),)
+        )
+        return [r[0] for r in rows]
+
+
+def available_count(denom: int) -> int:
+    """Bechne layak codes - stock me se reserved (held) hata ke."""
+    with _lock:
+        return _available(_conn.cursor(), str(denom), time.time())
+
+
+def held_count(denom: int) -> int:
+    with _lock:
+        return _held(_conn.cursor(), str(denom), time.time())
+
+
+def add_vouchers(denom: int, codes: List[str]) -> List[str]:
+    """Codes stock me daalo; jo pehle bik chuke (sold ledger me) wo nahi - unki list return."""
+    with _write() as cur:
+        sold_map = sold_ledger.get_many(cur, codes)
+        sold = [c for c in codes if c in sold_map]
+        if sold:
+            taken = set(sold)
+            codes = [c for c in codes if c not in taken]
+        _add_vouchers(cur, str(denom), codes)
+        _catalog_changed(cur)
+    return sold
+
+
+def add_vouchers_unique(denom: int, codes: List[str]) -> List[str]:
+    """Sirf naye codes add karo - code_index me pehle se (stock / bik chuke /
+    isi batch me dobara) wale reject. Rejected codes return."""
+    fresh: List[str] = []
+    dupes: List[str] = []
+    with _write() as cur:
+        for c in codes:
+            new = cur.execute("INSERT OR IGNORE INTO code_index (h) VALUES (?)", (code_hash(c),)).rowcount
+            (fresh if new else dupes).append(c)
+        if fresh:
+            _add_vouchers(cur, str(denom), fresh, index=False)
+            _catalog_changed(cur)
+    return dupes
+
+
+def pop_vouchers(denom: int, n: int):
+    if n < 1:
+        return None  # kuch nahi hila - catalog version bhi nahi
+    with _write() as cur:
+        if _available(cur, str(denom), time.time()) < n:
+            return None
+        codes = _pop_vouchers(cur, str(denom), n)
+        if codes:
+            _catalog_changed(cur)
+        return codes
+
+
+def pop_voucher(denom: int):
+    codes = pop_vouchers(denom, 1)
+    return codes[0] if codes else None
+
+
+def stock_text() -> str:
+    lines = [
+        f"• ₹{d}: {available_count(d)} available, {held_count(d)} reserved" for d in DENOMINATIONS
+    ]
+    return "📦 *Current Stock*\n" + "\n".join(lines)
+
+
+# stock / hold / price badalne pe +1; agla hold expiry bhi yaad, taaki
+# version check bina query ke ho (catalog render cache). meta.catalog wahi
+# counter db me hai - doosre worker process ke changes isse pakde jaate hain.
+_catalog_version = 0
+_next_expiry = 0.0
+_shared_catalog: Optional[str] = None
+_data_version: Optional[int] = None
+
+
+def _catalog_changed(cur: sqlite3.Cursor, expires_at: Optional[float] = None) -> None:
+    global _catalog_version, _next_expiry, _shared_catalog
+    _catalog_version += 1
+    if expires_at is not None:
+        _next_expiry = min(_next_expiry, expires_at) if _next_expiry else expires_at
+    cur.execute(
+        "INSERT INTO meta (key, value) VALUES ('catalog', '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+    _shared_catalog = cur.execute("SELECT value FROM meta WHERE key = 'catalog'").fetchone()[0]
+
+
+def _peer_changes(now: float) -> bool:
+    """Doosre process ne catalog badla? data_version sirf unke commits pe badalta hai."""
+    global _data_version, _shared_catalog, _next_expiry
+    with _lock:
+        dv = _conn.execute("PRAGMA data_version").fetchone()[0]
+        if dv == _data_version:
+            return False
+        _data_version = dv
+        row = _conn.execute("SELECT value FROM meta WHERE key = 'catalog'").fetchone()
+        if row is None or row[0] == _shared_catalog:
+            return False  # users / orders likhe, stock nahi
+        _shared_catalog = row[0]
+        # unke naye holds ki expiry bhi chahiye
+        row = _conn.execute("SELECT MIN(expires_at) FROM holds WHERE expires_at > ?", (now,)).fetchone()
+        _next_expiry = row[0] or 0.0
+    return True
+
+
+def catalog_version() -> int:
+    """Stock / hold / price badalne pe badalta hai (render cache ki key)."""
+    global _catalog_version, _next_expiry
+    now = time.time()
+    if _peer_changes(now):
+        _catalog_version += 1
+    if _next_expiry and now >= _next_expiry:
+        # koi hold abhi expire hua - available count badal gaya
+        with _lock:
+            row = _conn.execute("SELECT MIN(expires_at) FROM holds WHERE expires_at > ?", (now,)).fetchone()
+        _next_expiry = row[0] or 0.0
+        _catalog_version += 1
+    return _catalog_version
+
+
+# ---------- RESERVATIONS ----------
+
+def reserve(order_id: str, denom: int, qty: int, seconds: float) -> bool:
+    """qty codes order ke liye `seconds` tak hold karo. Stock kam ho to False."""
+    now = time.time()
+    with _write() as cur:
+        _sweep_holds(cur, now)
+        if _available(cur, str(denom), now) < qty:
+            return False
+        _reserve(cur, order_id, str(denom), qty, now + seconds)
+        _catalog_changed(cur, now + seconds)
+    return True
+
+
+def release(order_id: str) -> None:
+    with _write() as cur:
+        if cur.execute("DELETE FROM holds WHERE order_id = ?", (order_id,)).rowcount:
+            _catalog_changed(cur)
+
+
+def commit_reservation(order_id: str):
+    """Hold ko sale me badlo: held codes pool se nikal ke return. Hold na ho to None."""
+    with _write() as cur:
+        codes = _commit_reservation(cur, order_id, time.time())
+        if codes is not None:
+            _catalog_changed(cur)
+        return codes
+
+
+def complete_order(order_id: str, **fields) -> Optional[List[str]]:
+    """"paid" order ko codes do aur completed karo - stock se nikalna, order
+    aur ledger ek hi transaction me. Order "paid" na ho ya stock kam ho to None."""
+    now = time.time()
+    with _write() as cur:
+        row = cur.execute(
+            "SELECT body FROM orders WHERE order_id = ? AND status = 'paid'", (order_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        order = json.loads(row[0])
+        denom = str(order["denom"])
+        held = cur.execute(
+            "SELECT 1 FROM holds WHERE order_id = ? AND expires_at > ?", (order_id, now)
+        ).fetchone()
+        if held is None and _available(cur, denom, now) < order["qty"]:
+            return None
+        codes = _commit_reservation(cur, order_id, now) if held else _pop_vouchers(cur, denom, order["qty"])
+        if not codes:
+            return None
+        cur.execute("DELETE FROM holds WHERE order_id = ?", (order_id,))
+        _update_order(cur, order_id, dict(fields, status="completed", voucher_codes=codes))
+        _catalog_changed(cur)
+        return codes
+
+
+# ---------- ORDERS ----------
+
+def add_order(order: Dict[str, Any]) -> None:
+    with _write() as cur:
+        _insert_order(cur, order)
+
+
+def update_order(order_id: str, **fields) -> bool:
+    """Order update karo; galat status transition reject hota hai (False)."""
+    with _write() as cur:
+        return _update_order(cur, order_id, fields)
+
+
+def claim_order(order_id: str, status: str, from_statuses) -> bool:
+    """Strict compare-and-set: sirf tab jab order abhi from_statuses me ho.
+    Ek UPDATE ... WHERE status IN (...) - processes ke beech bhi exactly ek
+    claim ka rowcount 1 hota hai."""
+    sources = claim_sources(status, from_statuses)
+    if not sources:
+        return False
+    marks = ",".join("?" * len(sources))
+    with _write() as cur:
+        cur.execute(
+            f"UPDATE orders SET status = ?, body = json_set(body, '$.status', ?) "
+            f"WHERE order_id = ? AND status IN ({marks})",
+            [status, status, order_id, *sources],
+        )
+        return cur.rowcount == 1
+
+
+def sold_info(code: str) -> Optional[Dict[str, Any]]:
+    """Bika hua code kis order / user ko gaya - ledger se. Nahi bika to None."""
+    with _lock:
+        return sold_ledger.get(_conn.cursor(), code)
+
+
+def get_order(order_id: str, archived: bool = True) -> Optional[Dict[str, Any]]:
+    # saare orders ek hi indexed table me - archived flag JSON store ke liye hai
+    with _lock:
+        row = _conn.execute("SELECT body FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def orders_with_status(statuses: List[str]) -> List[Dict[str, Any]]:
+    marks = ",".join("?" * len(statuses))
+    with _lock:
+        rows = _conn.execute(
+            f"SELECT body FROM orders WHERE status IN ({marks}) ORDER BY created_at",
+            list(statuses),
+        ).fetchall()
+    return [json.loads(r[0]) for r in rows]
+
+
+def list_orders(limit: int = 10) -> List[Dict[str, Any]]:
+    with _lock:
+        rows = _conn.execute(
+            "SELECT body FROM orders ORDER BY rowid DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [json.loads(r[0]) for r in reversed(rows)]
+
+
+def iter_orders(batch: int = 500) -> Iterator[Dict[str, Any]]:
+    """Poori order history purane se naye, pages me stream karke."""
+    last = 0
+    while True:
+        with _lock:
+            rows = _conn.execute(
+                "SELECT rowid, body FROM orders WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, batch),
+            ).fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        for _, body in rows:
+            yield json.loads(body)
+
+
+def query_orders(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    statuses: Optional[List[str]] = None,
+    batch: int = 500,
+) -> Iterator[Dict[str, Any]]:
+    """since <= created_at < until wale orders, created_at index se pages me."""
+    where, params = ["created_at >= ?"], [since or ""]
+    if until is not None:
+        where.append("created_at < ?")
+        params.append(until)
+    if statuses is not None:
+        where.append(f"status IN ({','.join('?' * len(statuses))})")
+        params.extend(statuses)
+    sql = (
+        f"SELECT created_at, rowid, body FROM orders WHERE {' AND '.join(where)} "
+        "AND (created_at, rowid) > (?, ?) ORDER BY created_at, rowid LIMIT ?"
+    )
+    last: Tuple[str, int] = ("", 0)
+    while True:
+        with _lock:
+            rows = _conn.execute(sql, params + [last[0], last[1], batch]).fetchall()
+        if not rows:
+            return
+        last = (rows[-1][0], rows[-1][1])
+        for _, _, body in rows:
+            yield json.loads(body)
+
+
+def flush_sync() -> None:
+    # har function apna transaction khud commit karta hai - buffer kuch nahi
+    pass
+
+
+async def flush() -> None:
+    pass
+
+
+def save_data() -> None:
+    # har call apna transaction commit karta hai; yahan bas WAL fold kar do
+    with _lock, metrics.timer("store_write_seconds", kind="checkpoint"):
+        _conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# ---------- ASYNC WRAPPERS ----------
+# data_store ke wrappers sync call event loop pe karte (JSON store me wo sirf
+# memory hai). Yahan har write BEGIN IMMEDIATE pe doosre worker ka lock
+# SQLITE_BUSY_TIMEOUT tak wait kar sakta hai - isliye thread me, bot nahi rukta.
+
+async def add_user_async(user_id: int) -> None:
+    await asyncio.to_thread(add_user, user_id)
+
+
+async def get_users_async() -> List[int]:
+    return await asyncio.to_thread(get_users)
+
+
+async def sold_info_async(code: str) -> Optional[Dict[str, Any]]:
+    return await asyncio.to_thread(sold_info, code)
+
+
+async def get_order_async(order_id: str, archived: bool = True) -> Optional[Dict[str, Any]]:
+    return await asyncio.to_thread(get_order, order_id, archived)
+
+
+async def remove_users_async(user_ids: List[int]) -> None:
+    await asyncio.to_thread(remove_users, user_ids)
+
+
+async def set_broadcast_async(state: Optional[Dict[str, Any]]) -> None:
+    await asyncio.to_thread(set_broadcast, state)
+
+
+async def set_price_async(denom: int, new_price: float) -> None:
+    await asyncio.to_thread(set_price, denom, new_price)
+
+
+async def add_vouchers_async(denom: int, codes: List[str]) -> List[str]:
+    return await asyncio.to_thread(add_vouchers, denom, codes)
+
+
+async def add_vouchers_unique_async(denom: int, codes: List[str]) -> List[str]:
+    return await asyncio.to_thread(add_vouchers_unique, denom, codes)
+
+
+async def set_user_states_async(states: Dict[int, Optional[Dict[str, Any]]]) -> None:
+    await asyncio.to_thread(set_user_states, states)
+
+
+async def add_order_async(order: Dict[str, Any]) -> None:
+    await asyncio.to_thread(add_order, order)
+
+
+async def update_order_async(order_id: str, **fields) -> bool:
+    return await asyncio.to_thread(update_order, order_id, **fields)
+
+
+async def claim_order_async(order_id: str, status: str, from_statuses) -> bool:
+    return await asyncio.to_thread(claim_order, order_id, status, from_statuses)
+
+
+async def pop_vouchers_async(denom: int, n: int):
+    return await asyncio.to_thread(pop_vouchers, denom, n)
+
+
+async def reserve_async(order_id: str, denom: int, qty: int, seconds: float) -> bool:
+    return await asyncio.to_thread(reserve, order_id, denom, qty, seconds)
+
+
+async def release_async(order_id: str) -> None:
+    await asyncio.to_thread(release, order_id)
+
+
+async def commit_reservation_async(order_id: str):
+    return await asyncio.to_thread(commit_reservation, order_id)
+
+
+async def complete_order_async(order_id: str, **fields) -> Optional[List[str]]:
+    return await asyncio.to_thread(complete_order, order_id, **fields)
+
+
+# ---------- MIGRATION (data.json -> SQLite, ek baar) ----------
+
+class _JsonStream:
+    """Badi JSON file ko chunk-by-chunk padhne ke liye chhota helper."""
+
+    def __init__(self, f, chunk: int = 1 << 16):
+        self.f = f
+        self.chunk = chunk
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.dec = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        more = self.f.read(self.chunk)
+        if not more:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + more
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        if self.peek() != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                val, end = self.dec.raw_decode(self.buf, self.pos)
+                # number buffer ke end pe kat gaya ho sakta hai
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return val
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill():
+                val, self.pos = self.dec.raw_decode(self.buf, self.pos)
+                return val
+
+
+def _stream_snapshot(path: str) -> Iterator[Tuple[str, Any]]:
+    """(key, value) yield karo; "orders"/"users" ke items ek-ek karke."""
+    with snapshot.open_body(path) as f:
+        s = _JsonStream(f)
+        s.expect("{")
+        while s.peek() != "}":
+            key = s.value()
+            s.expect(":")
+            if key in ("orders", "users") and s.peek() == "[":
+                s.expect("[")
+                while s.peek() != "]":
+                    yield key, s.value()
+                    if s.peek() == ",":
+                        s.expect(",")
+                s.expect("]")
+            else:
+                yield key, s.value()
+            if s.peek() == ",":
+                s.expect(",")
+
+
+def _replay_journal(cur: sqlite3.Cursor, path: str, after_seq: int) -> int:
+    seq = after_seq
+    if not os.path.exists(path):
+        return seq
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec_seq, op, args = json.loads(line)
+            except ValueError:
+                break
+            if rec_seq <= seq:
+                continue
+            if op == "add_user":
+                cur.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (args[0],))
+            elif op == "remove_users":
+                cur.executemany("DELETE FROM users WHERE user_id = ?", [(u,) for u in args[0]])
+            elif op == "set_broadcast":
+                cur.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('broadcast', ?)",
+                    (json.dumps(args[0]) if args[0] else None,),
+                )
+            elif op == "set_price":
+                cur.execute("INSERT OR REPLACE INTO prices (denom, price) VALUES (?, ?)", args)
+            elif op == "add_vouchers":
+                _add_vouchers(cur, args[0], args[1])
+            elif op == "pop_voucher":
+                _pop_vouchers(cur, args[0], 1)
+            elif op == "pop_vouchers":
+                _pop_vouchers(cur, args[0], args[1])
+            elif op == "reserve":
+                _reserve(cur, *args)
+            elif op == "release":
+                cur.execute("DELETE FROM holds WHERE order_id = ?", (args[0],))
+            elif op == "commit_reservation":
+                _commit_reservation(cur, args[0], 0)
+            elif op == "add_order":
+                _insert_order(cur, args[0])
+            elif op == "update_order":
+                _update_order(cur, args[0], args[1], check=False)
+            elif op == "set_user_states":
+                _set_user_states(cur, args[0])
+            seq = rec_seq
+    return seq
+
+
+def migrate_from_json(path: str = DATA_FILE, batch_size: int = 1000) -> None:
+    """data.json (+ journal) ko stream karke SQLite me daalo, ek transaction me."""
+    seq = 0
+    orders: List[Dict[str, Any]] = []
+    users: List[Tuple[int]] = []
+    # kharab data.json ho to pichla achha snapshot (.prev) use karo
+    src, bad = snapshot.first_valid([path, path + ".prev"])
+    if bad:
+        logger.error("Skipping unreadable snapshot(s): %s", ", ".join(bad))
+        if src is None:
+            raise snapshot.SnapshotError(f"No readable snapshot in {path} / {path}.prev")
+    with _write() as cur:
+        if cur.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone():
+            return  # doosre worker process ne isi beech kar diya
+        # archive segments (final orders) pehle - history ka purana hissa
+        for o in order_archive.iter_orders():
+            orders.append(o)
+            if len(orders) >= batch_size:
+                for o in orders:
+                    _insert_order(cur, o)
+                orders.clear()
+        if src is not None:
+            for key, val in _stream_snapshot(src):
+                if key == "orders":
+                    orders.append(val)
+                    if len(orders) >= batch_size:
+                        for o in orders:
+                            _insert_order(cur, o)
+                        orders.clear()
+                elif key == "users":
+                    users.append((val,))
+                    if len(users) >= batch_size:
+                        cur.executemany("INSERT OR IGNORE INTO users (user_id) VALUES (?)", users)
+                        users.clear()
+                elif key == "vouchers":
+                    for denom, codes in val.items():
+                        _add_vouchers(cur, denom, codes)
+                elif key == "prices":
+                    cur.executemany(
+                        "INSERT OR REPLACE INTO prices (denom, price) VALUES (?, ?)",
+                        [(d, float(p)) for d, p in val.items()],
+                    )
+                elif key == "broadcast" and val:
+                    cur.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('broadcast', ?)",
+                        (json.dumps(val),),
+                    )
+                elif key == "holds":
+                    for order_id, (denom, qty, expires_at) in val.items():
+                        _reserve(cur, order_id, denom, qty, expires_at)
+                elif key == "user_state":
+                    _set_user_states(cur, val)
+                elif key == "_seq":
+                    seq = val
+            for o in orders:
+                _insert_order(cur, o)
+            cur.executemany("INSERT OR IGNORE INTO users (user_id) VALUES (?)", users)
+
+        seq = _replay_journal(cur, JOURNAL_FILE + ".prev", seq)
+        seq = _replay_journal(cur, JOURNAL_FILE + ".old", seq)
+        _replay_journal(cur, JOURNAL_FILE, seq)
+        _recount_stock(cur)
+        cur.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated', '1')")
+
+
+def _init() -> None:
+    with _lock:
+        done = _conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+    if done is None:
+        try:
+            migrate_from_json()
+            logger.info("Migrated %s into %s", DATA_FILE, SQLITE_FILE)
+        except Exception as e:
+            logger.error("Migration from %s failed: %s", DATA_FILE, e)
+            raise
+    with _write() as cur:
+        cur.executemany(
+            "INSERT OR IGNORE INTO prices (denom, price) VALUES (?, ?)",
+            list(DEFAULT_PRICES.items()),
+        )
+        # purani db (stock counters se pehle ki) - ek baar gin lo
+        if cur.execute("SELECT COUNT(*) FROM stock").fetchone()[0] == 0:
+            _recount_stock(cur)
+        if cur.execute("SELECT value FROM meta WHERE key = 'code_index'").fetchone() != (_CODE_INDEX_VERSION,):
+            _build_code_index(cur)
+        if not sold_ledger.backfilled(cur):
+            rows = cur.execute(
+                # "voucher_code" prefix: naya voucher_codes aur baseline ka voucher_code dono
+                "SELECT body FROM orders WHERE status = 'completed' AND body LIKE '%\"voucher_code%'"
+            ).fetchall()
+            sold_ledger.backfill(cur, (body for (body,) in rows))
+        # restart se pehle ke holds bhi expire hone pe catalog version badle
+        # (har worker ka apna _next_expiry hai)
+        _catalog_changed(cur, cur.execute("SELECT MIN(expires_at) FROM holds").fetchone()[0])
+    # bloom sirf ek process me sahi hai - doosre workers ki sales isme nahi aatin
+    if WORKERS == 1:
+        sold_ledger.start_bloom(SQLITE_FILE)
+
+
+_init()
@@ -0,0 +1,110 @@
+# supervisor.py
+#
+# Multi-core mode. Ek Python process ek hi core use karta hai; sale ke time
+# ye WORKERS bot processes (msin.py) chalata hai jo ek hi SQLite db share
+# karte hain (sqlite_store: BEGIN IMMEDIATE transactions) aur ek hi webhook
+# port (SO_REUSEPORT) pe updates lete hain. Crash hua worker backoff ke
+# saath dobara start; SIGINT / SIGTERM sab workers ko drain karke band.
+#
+#   WORKERS=4 BOT_MODE=webhook WEBHOOK_URL=https://bot.example.com/telegram python supervisor.py
+#
+# JSON backend (DATA poora process memory me) is mode me nahi chalta, aur
+# getUpdates polling bhi ek hi process kar sakta hai.
+
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from config import (
+    BOT_MODE,
+    STORAGE_BACKEND,
+    WEBHOOK_DRAIN_SECONDS,
+    WORKER_RESTART_DELAY,
+    WORKERS,
+)
+
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=logging.INFO,
+)
+logger = logging.getLogger("supervisor")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# itni der chala worker "healthy" - agla crash phir chhote delay se
+HEALTHY_SECONDS = 60
+MAX_RESTART_DELAY = 60.0
+
+
+def _check_mode() -> None:
+    if STORAGE_BACKEND != "sqlite":
+        raise SystemExit("Multi-worker mode needs STORAGE_BACKEND = 'sqlite' (JSON store is single-process)")
+    if BOT_MODE != "webhook":
+        raise SystemExit("Multi-worker mode needs BOT_MODE=webhook (only one process may poll getUpdates)")
+
+
+def _spawn(worker_id: int) -> subprocess.Popen:
+    env = dict(os.environ, WORKERS=str(WORKERS), WORKER_ID=str(worker_id))
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "msin.py")], env=env)
+    logger.info(f"Worker {worker_id} started (pid {proc.pid})")
+    return proc
+
+
+def main() -> None:
+    _check_mode()
+    # schema + JSON migration yahin ek baar, workers ek saath na karein
+    import data_store  # noqa: F401
+
+    procs: Dict[int, subprocess.Popen] = {i: _spawn(i) for i in range(WORKERS)}
+    started = {i: time.time() for i in procs}
+    delay = {i: WORKER_RESTART_DELAY for i in procs}
+    restart_at: Dict[int, float] = {}
+    stopping = []
+
+    def _stop(signum, frame) -> None:
+        if not stopping:
+            logger.info(f"Signal {signum} - stopping {len(procs)} workers")
+            stopping.append(time.time())
+        for proc in procs.values():
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    while procs or (restart_at and not stopping):
+        time.sleep(0.5)
+        now = time.time()
+        for i, proc in list(procs.items()):
+            code = proc.poll()
+            if code is None:
+                continue
+            del procs[i]
+            if stopping:
+                logger.info(f"Worker {i} exited ({code})")
+                continue
+            if now - started[i] > HEALTHY_SECONDS:
+                delay[i] = WORKER_RESTART_DELAY
+            logger.error(f"Worker {i} exited with {code}, restarting in {delay[i]:.0f}s")
+            restart_at[i] = now + delay[i]
+            delay[i] = min(MAX_RESTART_DELAY, delay[i] * 2)
+
+        if stopping:
+            restart_at.clear()
+            # drain ke baad bhi atka worker - zabardasti band
+            if now - stopping[0] > WEBHOOK_DRAIN_SECONDS + 30:
+                for proc in procs.values():
+                    proc.kill()
+            continue
+        for i, when in list(restart_at.items()):
+            if now >= when:
+                del restart_at[i]
+                procs[i] = _spawn(i)
+                started[i] = now
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# tests/conftest.py
+#
+# Store modules import pe hi data file (cwd me) load karte hain - isliye
+# sabse pehle ek khaali temp directory me chdir. Har test apne order IDs /
+# denomination pe chalta hai, ek hi store poore session me share hota hai.
+
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+from datetime import datetime
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp(prefix="voucher-bot-tests-"))
+
+_ids = itertools.count(1)
+
+# baseline bot ka data.json: ek order me ek hi "voucher_code", journal nahi
+LEGACY = """
+import json
+json.dump({
+    "users": [5],
+    "prices": {"500": 40},
+    "vouchers": {"500": ["V1"]},
+    "orders": [{"order_id": "ORD-OLD", "user_id": 5, "denom": 500, "qty": 1, "total": 40,
+                "status": "completed", "voucher_code": "V0", "created_at": "2025-01-01T00:00:00"}],
+}, open("data.json", "w"))
+"""
+
+
+class FakeBot:
+    """Telegram Bot ka stand-in - bheje gaye messages yaad rakhta hai."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+    async def send_document(self, chat_id, document, caption=None, **kwargs):
+        self.sent.append((chat_id, caption))
+
+    def texts(self, chat_id):
+        return [t for c, t in self.sent if c == chat_id]
+
+
+@pytest.fixture
+def bot():
+    return FakeBot()
+
+
+@pytest.fixture
+def run():
+    """Coroutine naye event loop pe chalao; outbox ke dispatchers usi loop
+    ke hain, isliye end me drain karke band."""
+    import admin_notify
+    import outbox
+
+    def _run(coro):
+        async def wrapper():
+            try:
+                return await coro
+            finally:
+                admin_notify.flush()
+                await outbox.drain(5)
+
+        return asyncio.run(wrapper())
+
+    return _run
+
+
+@pytest.fixture
+def new_order():
+    """await_payment order banao (unique order_id / user_id / denom)."""
+    import data_store
+
+    def _new(qty=1, stock=0, status="await_payment"):
+        n = next(_ids)
+        denom = 9000 + n  # har test ka apna pool - doosre tests ka stock nahi chhoota
+        order = {
+            "order_id": f"ORD-T{n:04d}",
+            "user_id": 100000 + n,
+            "denom": denom,
+            "qty": qty,
+            "total": float(qty),
+            "status": status,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        if stock:
+            data_store.add_vouchers(denom, [f"T{n}-{i}" for i in range(stock)])
+        data_store.add_order(order)
+        return order
+
+    return _new
+
+
+@pytest.fixture
+def isolated(tmp_path):
+    """Script alag process me, apni khaali directory me - store backend
+    import ke time hi chunta hai, SQLite tests isi se chalte hain."""
+
+    def _run(script, backend="json"):
+        prelude = f"import config\nconfig.STORAGE_BACKEND = {backend!r}\n"
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        proc = subprocess.run(
+            [sys.executable, "-c", prelude + textwrap.dedent(script)],
+            cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60,
+        )
+        assert proc.returncode == 0, proc.stderr
+        return proc.stdout
+
+    return _run
@@ -0,0 +1,26 @@
+import admin_notify
+
+
+def _units(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+def test_long_ticket_digest_fits_telegram_limit(run, bot):
+    # ticket cap 4000 chars, emoji 2 units - header ke saath 4096 paar
+    text = "😀" * 2500 + "\nshort line"
+
+    async def go():
+        admin_notify.ticket(bot, text)
+        admin_notify.flush()
+
+    run(go())
+    sent = bot.texts(admin_notify.ADMIN_ID)
+    assert len(sent) >= 2
+    assert all(_units(t) <= 4096 for t in sent)
+    body = "".join(sent)
+    assert body.count("😀") == 2500 and "short line" in body
+
+
+def test_split_long_keeps_surrogate_pairs_whole():
+    pieces = admin_notify._split_long("a" + "😀" * 3, limit=4)
+    assert pieces == ["a😀", "😀😀"]
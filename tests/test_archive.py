@@ -0,0 +1,111 @@
+# Hot/cold split: final orders compaction pe snapshot se archive segment me;
+# purane segments mahine ki gzip parts me rotate hote hain
+
+import pytest
+
+import order_archive
+
+COMPLETE = """
+import data_store
+from datetime import datetime
+data_store.add_vouchers(500, ["A", "B"])
+for i in (1, 2):
+    data_store.add_order({"order_id": f"ORD-{i}", "user_id": 5, "denom": 500, "qty": 1, "total": 1,
+                          "status": "paid", "created_at": datetime.utcnow().isoformat()})
+data_store.complete_order("ORD-1", delivered_at="now")
+"""
+
+READ = """
+import data_store, snapshot
+hot = [o["order_id"] for o in snapshot.read(data_store.DATA_FILE)["orders"]]
+print(hot, data_store.get_order("ORD-1", archived=False), data_store.get_order("ORD-1")["voucher_codes"])
+print([o["order_id"] for o in data_store.list_orders(5)])
+"""
+
+
+def test_completed_orders_move_to_archive(isolated, tmp_path):
+    isolated(COMPLETE + "data_store.save_data()\n")
+    assert [p.name for p in (tmp_path / "archive").iterdir()] == ["orders-000000000004.jsonl"]
+    out = isolated(READ)
+    assert out.splitlines() == ["['ORD-2'] None ['A']", "['ORD-1', 'ORD-2']"]
+
+
+def test_orphan_segment_is_dropped(isolated, tmp_path):
+    # segment likha gaya, snapshot se pehle crash - order abhi journal me hai
+    isolated(
+        COMPLETE
+        + """
+import os, snapshot
+data_store.flush_sync()
+encode = snapshot.encode
+
+def crash(*args):
+    os._exit(0)
+
+snapshot.encode = crash
+data_store.save_data()
+"""
+    )
+    assert (tmp_path / "archive" / "orders-000000000004.jsonl").exists()
+    out = isolated(
+        """
+import data_store, order_archive
+print(list(order_archive.iter_orders()), data_store.get_order("ORD-1", archived=False)["status"])
+"""
+    )
+    assert out.splitlines() == ["[] completed"]
+    assert not (tmp_path / "archive" / "orders-000000000004.jsonl").exists()
+
+
+# ---------- rotation (monthly gzip parts) ----------
+
+def _order(n, created):
+    return {"order_id": f"ORD-{n:03d}", "status": "completed", "created_at": created}
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(order_archive, "ARCHIVE_DIR", str(tmp_path / "archive"))
+    order_archive._headers.clear()
+    order_archive.write_segment(1, [_order(1, "2026-01-05"), _order(2, "2026-01-20")])
+    order_archive.write_segment(2, [_order(3, "2026-01-30"), _order(4, "2026-02-02")])
+    order_archive.write_segment(3, [_order(5, "2026-02-10"), _order(6, "2026-03-15")])
+    return tmp_path / "archive"
+
+
+def _ids(orders):
+    return [o["order_id"] for o in orders]
+
+
+def test_rotate_merges_old_segments_into_months(archive):
+    assert order_archive.rotate("2026-03-01") == 2
+    assert sorted(p.name for p in archive.iterdir()) == [
+        "month-2026-01.jsonl.gz", "month-2026-02.jsonl.gz", "orders-000000000003.jsonl",
+    ]
+    assert _ids(order_archive.iter_orders()) == [f"ORD-{i:03d}" for i in (1, 2, 3, 4, 5, 6)]
+    assert _ids(order_archive.query("2026-01-25", "2026-02-11")) == ["ORD-003", "ORD-004", "ORD-005"]
+    assert order_archive.find("ORD-002")["created_at"] == "2026-01-20"
+    assert order_archive.find("ORD-999") is None
+    assert _ids(order_archive.tail(2)) == ["ORD-005", "ORD-006"]
+    # agli rotation naya member jodti hai, purane as-is
+    assert order_archive.rotate("2026-04-01") == 1
+    assert _ids(order_archive.iter_orders()) == [f"ORD-{i:03d}" for i in (1, 2, 3, 4, 5, 6)]
+
+
+def test_crash_mid_rotation_never_duplicates(archive):
+    # parts likh gaye, segments hatne se pehle crash
+    segments = {p: p.read_bytes() for p in archive.iterdir()}
+    order_archive.rotate("2026-03-01")
+    for path, blob in segments.items():
+        path.write_bytes(blob)
+    assert len(_ids(order_archive.iter_orders())) == 6
+    assert order_archive.rotate("2026-03-01") == 2
+    assert len(_ids(order_archive.iter_orders())) == 6
+
+
+def test_drop_orphans_trims_part_members(archive):
+    order_archive.rotate("2026-04-01")
+    # snapshot seq 1 tak hi pahuncha tha - seq 2, 3 ke members orphan
+    order_archive.drop_orphans(1)
+    assert _ids(order_archive.iter_orders()) == ["ORD-001", "ORD-002"]
+    assert sorted(p.name for p in archive.iterdir()) == ["month-2026-01.jsonl.gz"]
@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram.error import Forbidden
+
+import broadcast
+import data_store
+
+
+class Bot:
+    def __init__(self, blocked):
+        self.blocked = blocked
+        self.got = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id in self.blocked:
+            raise Forbidden("bot was blocked by the user")
+        self.got.append(chat_id)
+        return SimpleNamespace(message_id=1)
+
+    async def edit_message_text(self, **kwargs):
+        pass
+
+
+def test_broadcast_sends_and_prunes_off_the_loop(run):
+    users = [777001, 777002, 777003]
+    for uid in users:
+        data_store.add_user(uid)
+    bot = Bot(blocked={777002})
+
+    async def go():
+        loop = asyncio.get_running_loop()
+        app = SimpleNamespace(bot=bot, create_task=loop.create_task)
+        assert broadcast.start(app, "hello", admin_chat_id=1)
+        # task turant bana - doosra /broadcast chalu nahi hota
+        assert not broadcast.start(app, "again", admin_chat_id=1)
+        await broadcast._task
+
+    run(go())
+    assert {777001, 777003} <= set(bot.got)
+    assert 777002 not in data_store.get_users()
+    assert data_store.get_broadcast() is None
+
+
+def test_sqlite_broadcast_store_calls_run_in_threads(isolated):
+    out = isolated(
+        """
+        import asyncio, threading
+        import data_store, sqlite_store
+
+        seen = []
+        real = sqlite_store.get_users
+        def spy():
+            seen.append(threading.current_thread() is threading.main_thread())
+            return real()
+        sqlite_store.get_users = spy
+
+        data_store.add_user(5)
+        print(asyncio.run(data_store.get_users_async()), seen)
+        """,
+        backend="sqlite",
+    )
+    assert out.split() == ["[5]", "[False]"]
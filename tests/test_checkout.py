@@ -0,0 +1,140 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import data_store
+import fulfilment
+from order_states import PAYABLE_STATUSES, RECOVERABLE_STATUSES
+
+
+def test_concurrent_claims_deliver_once(bot, run, new_order):
+    order = new_order(qty=2, stock=6)
+
+    async def race():
+        return await asyncio.gather(*(fulfilment.fulfil_order(bot, order["order_id"]) for _ in range(5)))
+
+    results = run(race())
+    stored = data_store.get_order(order["order_id"])
+    assert stored["status"] == "completed"
+    assert len(stored["voucher_codes"]) == 2
+    assert data_store.available_count(order["denom"]) == 4
+    assert "completed" in results
+    # codes wala message sirf ek baar gaya
+    assert len([t for t in bot.texts(order["user_id"]) if stored["voucher_codes"][0] in t]) == 1
+
+
+def test_paid_order_is_not_claimed_again(run, new_order):
+    order = new_order()
+    assert run(data_store.claim_order_async(order["order_id"], "paid", ("await_payment",)))
+    assert not run(data_store.claim_order_async(order["order_id"], "paid", ("await_payment", "paid")))
+
+
+def test_paid_no_stock_delivers_after_restock(bot, run, new_order):
+    order = new_order(qty=2)
+    assert run(fulfilment.fulfil_order(bot, order["order_id"])) == "paid_no_stock"
+    # button / webhook dobara - stock abhi bhi nahi, status wahi
+    assert run(fulfilment.fulfil_order(bot, order["order_id"])) == "paid_no_stock"
+
+    data_store.add_vouchers(order["denom"], ["R1", "R2", "R3"])
+
+    async def deliver_twice():
+        return await asyncio.gather(
+            *(fulfilment.fulfil_order(bot, order["order_id"], from_statuses=("paid_no_stock",)) for _ in range(2))
+        )
+
+    run(deliver_twice())
+    stored = data_store.get_order(order["order_id"])
+    assert stored["status"] == "completed"
+    assert stored["voucher_codes"] == ["R1", "R2"]
+    assert data_store.available_count(order["denom"]) == 1
+
+
+def test_sqlite_claim_is_strict(isolated):
+    out = isolated(
+        """
+        import asyncio
+        import data_store, fulfilment
+
+        class Bot:
+            async def send_message(self, **kwargs):
+                pass
+
+        async def main():
+            data_store.add_vouchers(100, ["C%d" % i for i in range(6)])
+            data_store.add_order({"order_id": "A", "user_id": 5, "denom": 100, "qty": 2,
+                                  "total": 2.0, "status": "await_payment", "created_at": "2026-01-01"})
+            await asyncio.gather(*(fulfilment.fulfil_order(Bot(), "A") for _ in range(5)))
+            print(len(data_store.get_order("A")["voucher_codes"]), data_store.available_count(100))
+            print(data_store.claim_order("A", "paid", ("paid", "await_payment")))
+
+        asyncio.run(main())
+        """,
+        backend="sqlite",
+    )
+    assert out.split() == ["2", "4", "False"]
+
+
+def test_complete_order_needs_paid_claim(new_order):
+    order = new_order(qty=1, stock=1)
+    assert data_store.complete_order(order["order_id"]) is None
+    assert data_store.available_count(order["denom"]) == 1
+
+
+def test_stuck_paid_order_is_recovered_once(bot, run, new_order):
+    order = new_order(qty=2, stock=3)
+    # claim ke baad crash - codes kabhi nahi lage
+    assert data_store.claim_order(order["order_id"], "paid", PAYABLE_STATUSES)
+    # button / webhook "paid" ko dobara claim nahi karte
+    assert run(fulfilment.fulfil_order(bot, order["order_id"])) == "paid"
+
+    async def recover_twice():
+        return await asyncio.gather(
+            *(fulfilment.fulfil_order(bot, order["order_id"], from_statuses=RECOVERABLE_STATUSES) for _ in range(2))
+        )
+
+    run(recover_twice())
+    stored = data_store.get_order(order["order_id"])
+    assert stored["status"] == "completed"
+    assert len(stored["voucher_codes"]) == 2
+    assert data_store.available_count(order["denom"]) == 1
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_completion_survives_restart(isolated, backend):
+    setup = """
+        import data_store
+        data_store.add_vouchers(100, ["H1", "H2", "F1"])
+        data_store.add_order({"order_id": "A", "user_id": 5, "denom": 100, "qty": 2,
+                              "total": 2.0, "status": "await_payment", "created_at": "2026-01-01"})
+        data_store.reserve("A", 100, 2, 600)
+        data_store.claim_order("A", "paid", ("await_payment",))
+        print(data_store.complete_order("A", delivery_sent=0))
+        data_store.flush_sync()
+    """
+    check = """
+        import data_store
+        o = data_store.get_order("A")
+        print(o["status"], o["voucher_codes"], data_store.available_count(100), data_store.held_count(100))
+    """
+    assert isolated(setup, backend=backend).split() == ["['H1',", "'H2']"]
+    # naya process - JSON me journal replay, SQLite me committed transaction
+    assert isolated(check, backend=backend).split() == ["completed", "['H1',", "'H2']", "1", "0"]
+
+
+def test_startup_schedules_stuck_paid_recovery(new_order):
+    import reconciler
+
+    order = new_order(qty=1, stock=1)
+    assert data_store.claim_order(order["order_id"], "paid", PAYABLE_STATUSES)
+    jobs = []
+
+    class JobQueue:
+        def run_once(self, callback, when, data=None, name=None):
+            jobs.append((callback, data))
+
+        def run_repeating(self, *args, **kwargs):
+            pass
+
+    reconciler.start(SimpleNamespace(job_queue=JobQueue()))
+    assert [(cb, data) for cb, data in jobs if order["order_id"] in data][0][0] is reconciler._recover_paid
@@ -0,0 +1,62 @@
+from telegram.error import Forbidden
+
+import data_store
+import delivery
+from conftest import FakeBot
+
+
+def _units(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+def test_pack_never_splits_a_line():
+    lines = [f"`{'😀' * 40}{i:04d}`" for i in range(300)]
+    messages = delivery.pack("header", lines, "\n\nfooter")
+    assert len(messages) > 1
+    assert all(_units(m) <= 4096 for m in messages)
+    assert messages[0].startswith("header\n") and messages[-1].endswith("footer")
+    # har line poori kisi ek message me
+    assert [l for m in messages for l in m.split("\n") if l.startswith("`")] == lines
+
+
+class FlakyBot(FakeBot):
+    """Doosra message user tak nahi pahunchta (e.g. bot blocked beech me)."""
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if len(self.sent) == 1:
+            raise Forbidden("blocked")
+        await super().send_message(chat_id, text, **kwargs)
+
+
+def _completed(new_order):
+    order = new_order(qty=50, status="paid")
+    codes = [f"{order['order_id']}-{i:02d}-" + "X" * 200 for i in range(50)]
+    data_store.add_vouchers(order["denom"], codes)
+    assert data_store.complete_order(order["order_id"], delivery_sent=0) == codes
+    return data_store.get_order(order["order_id"])
+
+
+def test_delivery_resumes_after_failed_part(run, new_order):
+    order = _completed(new_order)
+    parts = delivery.part_count(order)
+    assert parts >= 3
+    flaky = FlakyBot()
+    assert run(delivery.deliver(flaky, order)) is False
+    stored = data_store.get_order(order["order_id"])
+    assert stored["delivery_sent"] == 1 and delivery.pending(stored)
+
+    # resend: sirf bache parts, wahi codes (stock se naya pop nahi)
+    bot = FakeBot()
+    assert run(delivery.resend_order(bot, order["order_id"])) == "completed"
+    assert len(bot.sent) == parts - 1
+    assert not delivery.pending(data_store.get_order(order["order_id"]))
+    text = "".join(flaky.texts(order["user_id"]) + bot.texts(order["user_id"]))
+    assert all(c in text for c in order["voucher_codes"])
+
+
+def test_resend_of_delivered_order_starts_over(run, new_order):
+    order = _completed(new_order)
+    run(delivery.deliver(FakeBot(), order))
+    bot = FakeBot()
+    assert run(delivery.resend_order(bot, order["order_id"])) == "completed"
+    assert len(bot.sent) == delivery.part_count(order)
@@ -0,0 +1,88 @@
+# JSON store: har mutation journal me, restart pe snapshot + journal replay
+
+WRITE = """
+import data_store
+data_store.add_vouchers(500, ["A", "B", "C"])
+data_store.add_order({"order_id": "ORD-1", "user_id": 5, "denom": 500, "qty": 2,
+                      "total": 2, "status": "paid", "created_at": "2026-01-01T00:00:00"})
+data_store.complete_order("ORD-1", delivered_at="now")
+data_store.set_price(500, 41)
+data_store.flush_sync()
+"""
+
+READ = """
+import data_store
+o = data_store.get_order("ORD-1")
+print(o["status"], o["voucher_codes"], list(data_store.vouchers_for(500)), data_store.get_price(500))
+"""
+
+
+def test_restart_replays_journal(isolated):
+    isolated(WRITE)
+    out = isolated(READ)
+    assert out.splitlines() == ["completed ['A', 'B'] ['C'] 41.0"]
+
+
+def test_torn_tail_is_dropped_and_later_writes_survive(isolated, tmp_path):
+    isolated(WRITE)
+    # crash beech me: aakhri record aadha likha gaya
+    with open(tmp_path / "data.json.journal", "a") as f:
+        f.write('[99,"add_vouchers",["500",["LO')
+    isolated(READ + "data_store.add_vouchers(500, ['D'])\ndata_store.flush_sync()\n")
+    out = isolated(READ)
+    assert out.splitlines() == ["completed ['A', 'B'] ['C', 'D'] 41.0"]
+
+
+def test_writes_are_group_committed(isolated):
+    out = isolated(
+        """
+import os, time
+config.FLUSH_INTERVAL = 3600
+config.FLUSH_MAX_PENDING = 50
+import data_store, metrics
+
+for u in range(49):
+    data_store.add_user(u)
+time.sleep(0.2)
+print(os.path.getsize(data_store.JOURNAL_FILE))  # abhi koi write nahi
+data_store.add_user(49)  # FLUSH_MAX_PENDING - writer jaag jata hai
+deadline = time.time() + 5
+while os.path.getsize(data_store.JOURNAL_FILE) == 0 and time.time() < deadline:
+    time.sleep(0.01)
+time.sleep(0.1)
+print(sum(1 for _ in open(data_store.JOURNAL_FILE)))
+print(int(metrics._hists["store_write_seconds"][(("kind", "journal"),)][-1]))
+"""
+    )
+    assert out.splitlines() == ["0", "50", "1"]
+
+
+def test_handlers_never_write_and_wait_for_room(isolated):
+    # writer queue chhoti: handler rukte hain, par I/O sirf writer thread pe
+    out = isolated(
+        """
+import asyncio, threading
+config.FLUSH_INTERVAL = 3600
+config.FLUSH_MAX_PENDING = 10 ** 6
+config.WRITER_QUEUE_MAX = 20
+import data_store
+
+writers, peak = set(), [0]
+write_chunk = data_store._write_chunk
+
+def spy(chunk):
+    writers.add(threading.current_thread().name)
+    return write_chunk(chunk)
+
+data_store._write_chunk = spy
+
+async def main():
+    for u in range(100):
+        await data_store.add_user_async(u)
+        peak[0] = max(peak[0], data_store._queue.qsize())
+
+asyncio.run(main())
+print(sorted(writers), peak[0] <= 20, len(data_store.get_users()))
+"""
+    )
+    assert out.splitlines() == ["['data-writer'] True 100"]
@@ -0,0 +1,47 @@
+import pytest
+
+from conftest import LEGACY
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_legacy_data_is_migrated(isolated, backend):
+    out = isolated(
+        LEGACY
+        + """
+import data_store
+print(data_store.get_order("ORD-OLD")["status"])
+print(data_store.available_count(500))
+data_store.flush_sync()
+""",
+        backend=backend,
+    )
+    assert out.splitlines() == ["completed", "1"]
+
+
+def test_json_store_moves_to_sqlite_once(isolated):
+    # snapshot + archive segment + snapshot ke baad ka journal - sab SQLite me
+    isolated(
+        """
+import data_store
+from datetime import datetime
+data_store.add_user(7)
+data_store.add_vouchers(500, ["A", "B", "C"])
+for i in (1, 2):
+    data_store.add_order({"order_id": f"ORD-{i}", "user_id": 7, "denom": 500, "qty": 1, "total": 40,
+                          "status": "paid", "created_at": datetime.utcnow().isoformat()})
+data_store.complete_order("ORD-1", delivered_at="now")
+data_store.save_data()
+data_store.set_price(500, 41)
+assert data_store.reserve("ORD-2", 500, 1, 600)
+"""
+    )
+    script = """
+import data_store
+print(data_store.get_order("ORD-1")["voucher_codes"], data_store.get_order("ORD-2")["status"])
+print(data_store.available_count(500), data_store.held_count(500), data_store.get_price(500), data_store.get_users())
+data_store.add_vouchers(500, ["D"])
+"""
+    first = isolated(script, backend="sqlite")
+    assert first.splitlines() == ["['A'] paid", "1 1 41.0 [7]"]
+    # dobara start: migration nahi chalti, SQLite ka apna state
+    assert isolated(script, backend="sqlite").splitlines() == ["['A'] paid", "2 1 41.0 [7]"]
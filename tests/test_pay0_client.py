@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+import pay0_client
+from config import PAY0_MAX_CONCURRENCY
+from fake_pay0 import FakePay0
+
+
+@pytest.fixture
+def pay0(run):
+    """Local FakePay0 pe client chalao; har test ka apna server aur loop."""
+
+    def _run(body, latency=0.0):
+        async def go():
+            fake = FakePay0(latency=latency)
+            await fake.start()
+            await pay0_client.set_base_url(fake.base_url)
+            # semaphore pehli contention pe loop se bandh jata hai - har loop ka naya
+            pay0_client._sem = asyncio.Semaphore(PAY0_MAX_CONCURRENCY)
+            try:
+                return await body(fake)
+            finally:
+                await pay0_client.close()
+                await fake.stop()
+
+        return run(go())
+
+    return _run
+
+
+def test_create_and_check_status(pay0):
+    async def body(fake):
+        url = await pay0_client.create_pay0_order(10.0, "ORD-P1", "9999999999", "")
+        seen = [await pay0_client.check_payment_status("ORD-P1")]
+        await fake.pay("ORD-P1")
+        seen.append(await pay0_client.check_payment_status("ORD-P1"))
+        await fake.pay("ORD-P1", "FAILED")
+        seen.append(await pay0_client.check_payment_status("ORD-P1"))
+        seen.append(await pay0_client.check_payment_status("ORD-NOPE"))
+        return url, seen
+
+    url, seen = pay0(body)
+    assert url.endswith("/pay?order_id=ORD-P1")
+    assert seen == ["pending", "success", "failed", "unknown"]
+
+
+def test_unreachable_pay0_is_an_error_not_a_crash(run):
+    async def go():
+        await pay0_client.set_base_url("http://127.0.0.1:9")
+        try:
+            return (
+                await pay0_client.check_payment_status("ORD-P2"),
+                await pay0_client.create_pay0_order(10.0, "ORD-P2", "9999999999", "x"),
+            )
+        finally:
+            await pay0_client.close()
+
+    assert run(go()) == ("error", "")
+
+
+def test_slow_pay0_calls_overlap_up_to_the_cap(pay0):
+    # 2 * cap calls, har ek 0.2s: event loop block hota to 4s, cap na hota to 0.2s
+    async def body(fake):
+        for i in range(2 * PAY0_MAX_CONCURRENCY):
+            fake.orders[f"ORD-C{i}"] = {"txnStatus": "SUCCESS"}
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(pay0_client.check_payment_status(f"ORD-C{i}") for i in range(2 * PAY0_MAX_CONCURRENCY))
+        )
+        return results, time.perf_counter() - start
+
+    results, elapsed = pay0(body, latency=0.2)
+    assert results == ["success"] * (2 * PAY0_MAX_CONCURRENCY)
+    assert 0.4 <= elapsed < 1.5
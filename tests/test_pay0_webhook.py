@@ -0,0 +1,78 @@
+import hashlib
+import hmac
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import data_store
+import order_archive
+import pay0_webhook
+from http_server import Request
+
+SECRET = "test-secret"
+
+
+@pytest.fixture
+def webhook(monkeypatch, bot):
+    monkeypatch.setattr(pay0_webhook, "PAY0_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(pay0_webhook, "_app", SimpleNamespace(bot=bot))
+    statuses = {}
+
+    async def check(order_id):
+        return statuses.get(order_id, "pending")
+
+    monkeypatch.setattr(pay0_webhook, "check_payment_status", check)
+    return statuses
+
+
+def _callback(order_id, secret=SECRET):
+    body = json.dumps({"order_id": order_id}).encode()
+    sig = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    headers = {"content-type": "application/json", "x-pay0-signature": sig}
+    return Request("POST", pay0_webhook.PAY0_WEBHOOK_PATH, {}, headers, body)
+
+
+def test_webhook_success_delivers(webhook, bot, run, new_order):
+    order = new_order(qty=1, stock=2)
+    webhook[order["order_id"]] = "success"
+    assert run(pay0_webhook.handle_callback(_callback(order["order_id"]))) == (200, "ok")
+    stored = data_store.get_order(order["order_id"])
+    assert stored["status"] == "completed"
+    assert any(stored["voucher_codes"][0] in t for t in bot.texts(order["user_id"]))
+    # duplicate callback - Pay0 se dobara nahi poochha, kuch nahi badla
+    webhook[order["order_id"]] = "failed"
+    assert run(pay0_webhook.handle_callback(_callback(order["order_id"]))) == (200, "ok")
+    assert data_store.get_order(order["order_id"])["status"] == "completed"
+
+
+def test_webhook_failed_releases_hold(webhook, run, new_order):
+    order = new_order(qty=2, stock=2)
+    assert data_store.reserve(order["order_id"], order["denom"], 2, 600)
+    assert data_store.available_count(order["denom"]) == 0
+    webhook[order["order_id"]] = "failed"
+    run(pay0_webhook.handle_callback(_callback(order["order_id"])))
+    assert data_store.get_order(order["order_id"])["status"] == "failed"
+    assert data_store.available_count(order["denom"]) == 2
+
+
+def test_webhook_rejects_bad_signature(webhook, run, new_order):
+    order = new_order(qty=1, stock=1)
+    webhook[order["order_id"]] = "success"
+    status, _ = run(pay0_webhook.handle_callback(_callback(order["order_id"], secret="wrong")))
+    assert status == 403
+    assert data_store.get_order(order["order_id"])["status"] == "await_payment"
+
+
+def test_webhook_unknown_order_skips_archive(webhook, run, monkeypatch):
+    def scan(order_id):
+        raise AssertionError("archive scanned for an unauthenticated callback")
+
+    monkeypatch.setattr(order_archive, "find", scan)
+    status, _ = run(pay0_webhook.handle_callback(_callback("ORD-NOPE")))
+    assert status == 404
+
+
+def test_webhook_needs_secret(monkeypatch, run):
+    monkeypatch.setattr(pay0_webhook, "PAY0_WEBHOOK_SECRET", "")
+    assert run(pay0_webhook.start(SimpleNamespace(bot=None))) is None
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import data_store
+import reconciler
+from config import ORDER_TTL_SECONDS, RECONCILE_BATCH
+
+
+@pytest.fixture
+def pay0(monkeypatch):
+    statuses = {}
+
+    async def check(order_id):
+        return statuses.get(order_id, "pending")
+
+    monkeypatch.setattr(reconciler, "check_payment_status", check)
+    return statuses
+
+
+def _age(order, seconds):
+    created = (datetime.utcnow() - timedelta(seconds=seconds)).isoformat()
+    data_store.update_order(order["order_id"], created_at=created)
+    order["created_at"] = created
+
+
+def test_reconciler_success_delivers(bot, run, new_order):
+    order = new_order(qty=1, stock=1)
+    run(reconciler._settle(bot, order, "success"))
+    assert data_store.get_order(order["order_id"])["status"] == "completed"
+
+
+def test_reconciler_failed_releases_hold(bot, run, new_order):
+    order = new_order(qty=1, stock=1)
+    assert data_store.reserve(order["order_id"], order["denom"], 1, 600)
+    run(reconciler._settle(bot, order, "failed"))
+    assert data_store.get_order(order["order_id"])["status"] == "failed"
+    assert data_store.available_count(order["denom"]) == 1
+    assert any("Payment failed" in t for t in bot.texts(order["user_id"]))
+
+
+def test_reconciler_pending_is_rechecked(bot, run, new_order):
+    order = new_order()
+    run(reconciler._settle(bot, order, "pending"))
+    assert order["order_id"] in reconciler._due
+    assert data_store.get_order(order["order_id"])["status"] == "await_payment"
+
+
+def test_reconciler_expiry_releases_hold(bot, run, new_order):
+    order = new_order(qty=1, stock=1)
+    assert data_store.reserve(order["order_id"], order["denom"], 1, 600)
+    run(reconciler._expire(bot, order))
+    assert data_store.get_order(order["order_id"])["status"] == "expired"
+    assert data_store.available_count(order["denom"]) == 1
+
+
+def test_payment_in_last_minutes_is_delivered_not_expired(bot, run, new_order, pay0):
+    order = new_order(qty=1, stock=1)
+    _age(order, ORDER_TTL_SECONDS + 60)
+    pay0[order["order_id"]] = "success"
+    reconciler.track(order["order_id"], 0)
+    run(reconciler.reconcile_job(SimpleNamespace(bot=bot)))
+    assert data_store.get_order(order["order_id"])["status"] == "completed"
+    assert not any("expired" in t for t in bot.texts(order["user_id"]))
+
+
+def test_unpaid_order_expires_after_final_check(bot, run, new_order, pay0):
+    order = new_order(qty=1, stock=1)
+    assert data_store.reserve(order["order_id"], order["denom"], 1, 600)
+    _age(order, ORDER_TTL_SECONDS + 60)
+    reconciler.track(order["order_id"], 0)
+    run(reconciler.reconcile_job(SimpleNamespace(bot=bot)))
+    assert data_store.get_order(order["order_id"])["status"] == "expired"
+    assert data_store.available_count(order["denom"]) == 1
+
+
+def test_recheck_never_skips_past_ttl(run, new_order):
+    order = new_order()
+    _age(order, ORDER_TTL_SECONDS - 20)
+    run(reconciler._settle(None, order, "pending"))
+    assert reconciler._due[order["order_id"]] <= reconciler.time.time() + 20
+
+
+def test_job_checks_due_orders_in_bounded_batches(bot, run, new_order, monkeypatch):
+    monkeypatch.setattr(reconciler, "_heap", [])
+    monkeypatch.setattr(reconciler, "_due", {})
+    monkeypatch.setattr(reconciler, "_last_check", {})
+    calls = []
+
+    async def check(order_id):
+        calls.append(order_id)
+        return "pending"
+
+    monkeypatch.setattr(reconciler, "check_payment_status", check)
+    ids = [new_order()["order_id"] for _ in range(RECONCILE_BATCH + 5)]
+    for order_id in ids:
+        reconciler.track(order_id, 0)
+    context = SimpleNamespace(bot=bot)
+    run(reconciler.reconcile_job(context))
+    assert len(calls) == RECONCILE_BATCH
+    # baaki agli tick me; jo check ho chuke wo backoff ke saath baad me
+    run(reconciler.reconcile_job(context))
+    assert sorted(calls) == sorted(ids)
+    assert all(reconciler._due[i] > reconciler.time.time() for i in ids)
+
+
+def test_worker_rescans_owned_orders_created_elsewhere(run, new_order, monkeypatch):
+    # doosre worker ne banaya, uski memory me tha, wo restart ho gaya
+    monkeypatch.setattr(reconciler, "WORKERS", 2)
+    monkeypatch.setattr(reconciler, "_last_scan", 0.0)
+    orders = [new_order() for _ in range(6)]
+    owned = {o["order_id"] for o in orders if reconciler._owned(o["order_id"])}
+    for o in orders:
+        reconciler._untrack(o["order_id"])
+    run(reconciler._rescan(reconciler.time.time()))
+    tracked = {o["order_id"] for o in orders if o["order_id"] in reconciler._due}
+    assert tracked == owned
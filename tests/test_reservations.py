@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import data_store
+
+
+def test_reserve_and_release(new_order):
+    order = new_order(qty=2, stock=3)
+    assert data_store.reserve(order["order_id"], order["denom"], 2, 600)
+    assert data_store.available_count(order["denom"]) == 1
+    assert data_store.held_count(order["denom"]) == 2
+    # stock kam - doosra hold nahi milta
+    assert not data_store.reserve("ORD-OTHER", order["denom"], 2, 600)
+    data_store.release(order["order_id"])
+    assert data_store.available_count(order["denom"]) == 3
+    assert data_store.commit_reservation(order["order_id"]) is None
+
+
+def test_hold_expires(new_order):
+    order = new_order(qty=2, stock=2)
+    assert data_store.reserve(order["order_id"], order["denom"], 2, 0.05)
+    assert data_store.available_count(order["denom"]) == 0
+    time.sleep(0.1)
+    assert data_store.available_count(order["denom"]) == 2
+    # expire ho chuka hold sale me nahi badalta
+    assert data_store.commit_reservation(order["order_id"]) is None
+
+
+def test_commit_reservation_takes_held_codes(new_order):
+    order = new_order(qty=2, stock=3)
+    assert data_store.reserve(order["order_id"], order["denom"], 2, 600)
+    codes = data_store.commit_reservation(order["order_id"])
+    assert len(codes) == 2
+    assert data_store.available_count(order["denom"]) == 1
+    assert data_store.held_count(order["denom"]) == 0
+
+
+def test_concurrent_reserves_never_overbook(new_order):
+    order = new_order(qty=1, stock=5)
+    denom = order["denom"]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        got = list(pool.map(lambda i: data_store.reserve(f"ORD-R{denom}-{i}", denom, 1, 600), range(20)))
+    assert got.count(True) == 5
+    assert data_store.available_count(denom) == 0 and data_store.held_count(denom) == 5
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_hold_survives_restart(isolated, backend):
+    isolated(
+        """
+import data_store
+data_store.add_vouchers(500, ["A", "B", "C"])
+assert data_store.reserve("ORD-H", 500, 2, 600)
+data_store.flush_sync()
+""",
+        backend=backend,
+    )
+    out = isolated(
+        """
+import data_store
+print(data_store.available_count(500), data_store.held_count(500))
+print(data_store.commit_reservation("ORD-H"))
+data_store.flush_sync()
+""",
+        backend=backend,
+    )
+    assert out.splitlines() == ["1 2", "['A', 'B']"]
@@ -0,0 +1,76 @@
+import pytest
+
+import snapshot
+
+STATE = {"vouchers": {"500": ["A", "B"]}, "orders": [], "_seq": 7}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(tmp_path, compress):
+    path = str(tmp_path / "data.json")
+    snapshot.write_tmp(path, snapshot.encode(STATE, compress))
+    assert snapshot.read(path + ".tmp") == STATE
+
+
+def test_corruption_is_detected(tmp_path):
+    path = tmp_path / "data.json"
+    blob = snapshot.encode(STATE)
+    path.write_bytes(blob[:-1] + b"]")  # ek byte badla
+    with pytest.raises(snapshot.SnapshotError, match="checksum"):
+        snapshot.read(str(path))
+    path.write_bytes(blob[:-5])  # adhuri file
+    with pytest.raises(snapshot.SnapshotError, match="truncated"):
+        snapshot.read(str(path))
+
+
+SETUP = """
+import data_store
+data_store.add_vouchers(500, ["A", "B"])
+data_store.save_data()
+data_store.add_vouchers(500, ["C"])
+data_store.set_price(500, 41)
+"""
+
+READ = """
+import data_store
+print(list(data_store.vouchers_for(500)), data_store.get_price(500))
+"""
+
+
+def test_corrupt_snapshot_falls_back_to_previous(isolated, tmp_path):
+    isolated(SETUP + "data_store.save_data()\ndata_store.add_vouchers(500, ['D'])\n")
+    data = tmp_path / "data.json"
+    data.write_bytes(data.read_bytes()[:-3])
+    # prev snapshot + uske baad ke dono journals se poora state
+    assert isolated(READ).splitlines() == ["['A', 'B', 'C', 'D'] 41.0"]
+
+
+def test_crash_between_snapshot_renames(isolated, tmp_path):
+    # DATA -> PREV ho gaya, tmp -> DATA se pehle process mar gaya
+    isolated(
+        SETUP
+        + """
+import os
+replace = os.replace
+
+def crash(src, dst):
+    if src.endswith(".tmp"):
+        os._exit(0)
+    replace(src, dst)
+
+os.replace = crash
+data_store.save_data()
+"""
+    )
+    assert not (tmp_path / "data.json").exists()
+    out = isolated(READ + "data_store.add_vouchers(500, ['D'])\ndata_store.save_data()\n")
+    assert out.splitlines() == ["['A', 'B', 'C'] 41.0"]
+    assert isolated(READ).splitlines() == ["['A', 'B', 'C', 'D'] 41.0"]
+
+
+def test_unreadable_snapshots_refuse_to_start(isolated, tmp_path):
+    isolated(SETUP + "data_store.save_data()\n")
+    for name in ("data.json", "data.json.prev"):
+        (tmp_path / name).write_bytes(b"garbage")
+    with pytest.raises(AssertionError, match="No readable snapshot"):
+        isolated(READ)
@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+import sold_ledger
+from conftest import LEGACY
+
+
+def test_get_many_spans_batches():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(sold_ledger.SCHEMA)
+    cur = conn.cursor()
+    sold = [f"S{i}" for i in range(0, 1200, 3)]
+    sold_ledger.put(cur, {"order_id": "ORD-L", "user_id": 7, "denom": 500,
+                          "status": "completed", "voucher_codes": sold, "delivered_at": "t"})
+    codes = [f"S{i}" for i in range(1200)]  # _BATCH se bade - kai IN (...) queries
+    found = sold_ledger.get_many(cur, codes)
+    assert sorted(found) == sorted(sold)
+    assert found["S3"] == sold_ledger.get(cur, "S3")
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_add_vouchers_skips_sold_codes(isolated, backend):
+    # pehla order ledger tak flush, doosra abhi pending (JSON: _sold_pending)
+    out = isolated(
+        """
+import asyncio
+import data_store
+from datetime import datetime
+
+def sell(order_id, codes):
+    data_store.add_vouchers(500, codes)
+    data_store.add_order({"order_id": order_id, "user_id": 5, "denom": 500, "qty": len(codes),
+                          "total": 1, "status": "paid", "created_at": datetime.utcnow().isoformat()})
+    assert data_store.complete_order(order_id, delivered_at="now") == codes
+
+sell("ORD-A", ["A1", "A2"])
+data_store.flush_sync()
+sell("ORD-B", ["B1"])
+print(sorted(asyncio.run(data_store.add_vouchers_async(500, ["A2", "B1", "N1", "N2"]))))
+print(data_store.available_count(500))
+info = asyncio.run(data_store.sold_info_async("B1"))
+print(info["order_id"], asyncio.run(data_store.get_order_async(info["order_id"]))["status"])
+data_store.flush_sync()
+""",
+        backend=backend,
+    )
+    assert out.splitlines() == ["['A2', 'B1']", "2", "ORD-B completed"]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_legacy_orders_are_backfilled(isolated, backend):
+    # baseline ka singular voucher_code bhi ledger me (support /lookup ke liye)
+    out = isolated(
+        LEGACY
+        + """
+import data_store
+info = data_store.sold_info("V0")
+print(info["order_id"], info["user_id"], info["denom"])
+print(data_store.add_vouchers(500, ["V0", "V9"]))
+data_store.flush_sync()
+""",
+        backend=backend,
+    )
+    assert out.splitlines() == ["ORD-OLD 5 500", "['V0']"]
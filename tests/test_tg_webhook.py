@@ -0,0 +1,42 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import tg_webhook
+from http_server import Request
+
+
+@pytest.fixture
+def app(monkeypatch):
+    app = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+    monkeypatch.setattr(tg_webhook, "_app", app)
+    monkeypatch.setattr(tg_webhook, "WEBHOOK_SECRET", "s3cret")
+    return app
+
+
+def _update(token=None):
+    headers = {"content-type": "application/json"}
+    if token is not None:
+        headers["x-telegram-bot-api-secret-token"] = token
+    return Request("POST", tg_webhook.WEBHOOK_PATH, {}, headers, json.dumps({"update_id": 7}).encode())
+
+
+def test_update_with_secret_is_queued(app, run):
+    assert run(tg_webhook.handle_update(_update("s3cret"))) == (200, "ok")
+    assert app.update_queue.get_nowait().update_id == 7
+
+
+@pytest.mark.parametrize("token", [None, "", "wrong"])
+def test_forged_update_is_rejected(app, run, token):
+    status, _ = run(tg_webhook.handle_update(_update(token)))
+    assert status == 403
+    assert app.update_queue.empty()
+
+
+def test_empty_secret_never_fails_open(app, run, monkeypatch):
+    monkeypatch.setattr(tg_webhook, "WEBHOOK_SECRET", "")
+    assert run(tg_webhook.handle_update(_update("")))[0] == 403
+    with pytest.raises(RuntimeError):
+        run(tg_webhook.start(app, port=0))
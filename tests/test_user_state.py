@@ -0,0 +1,60 @@
+import importlib.util
+import os
+from types import SimpleNamespace
+
+import data_store
+import persistence
+from conftest import ROOT
+
+_spec = importlib.util.spec_from_file_location("user_panel", os.path.join(ROOT, "user's.py"))
+user_panel = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(user_panel)
+
+
+class Query:
+    def __init__(self, data, user_id):
+        self.data = data
+        self.from_user = SimpleNamespace(id=user_id, username="u", first_name="U")
+        self.edits = []
+
+    async def answer(self):
+        pass
+
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+def _context(user_data, store=None):
+    app = SimpleNamespace(persistence=store)
+    return SimpleNamespace(user_data=user_data, application=app, bot=None)
+
+
+def test_cart_is_written_through_with_workers(run, monkeypatch):
+    monkeypatch.setattr(persistence, "WORKERS", 2)
+    store = persistence.StorePersistence(update_interval=3600)
+    context = _context({"state": "wait_quantity", "denom": 500}, store)
+    run(persistence.save_now(context, 424242))
+    # PTB ka flush nahi hua, phir bhi doosra worker store se taaza cart padhe
+    assert data_store.get_user_state(424242) == {"state": "wait_quantity", "denom": 500}
+
+    fresh = {}
+    run(persistence.StorePersistence().refresh_user_data(424242, fresh))
+    assert fresh == {"state": "wait_quantity", "denom": 500}
+
+
+def test_single_worker_keeps_batched_flush(run, monkeypatch):
+    monkeypatch.setattr(persistence, "WORKERS", 1)
+    store = persistence.StorePersistence(update_interval=3600)
+    run(persistence.save_now(_context({"denom": 100}, store), 434343))
+    assert data_store.get_user_state(434343) is None
+    # bina persistence wala application (bench.py ka FakeApp) bhi chale
+    run(persistence.save_now(SimpleNamespace(application=object(), user_data={}), 434343))
+
+
+def test_agree_without_cart_asks_to_start_again(run):
+    query = Query("agree", 454545)
+    update = SimpleNamespace(callback_query=query, effective_user=query.from_user)
+    context = _context({"state": "tnc"})
+    run(user_panel.callback_buttons(update, context))
+    assert "start again" in query.edits[-1]
+    assert context.user_data == {}
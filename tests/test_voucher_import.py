@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+import data_store
+import voucher_import
+from conftest import LEGACY
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_unique_import_rejects_known_codes(isolated, backend):
+    out = isolated(
+        LEGACY
+        + """
+import data_store
+from datetime import datetime
+data_store.add_order({"order_id": "ORD-NEW", "user_id": 5, "denom": 500, "qty": 1, "total": 40,
+                      "status": "paid", "created_at": datetime.utcnow().isoformat()})
+data_store.complete_order("ORD-NEW", delivered_at="now")  # V1 bik gaya
+data_store.save_data()  # JSON: dono orders archive me
+print(data_store.add_vouchers_unique(500, ["V0", "V1", "V2", "V2", "V3"]))
+print(data_store.add_vouchers_unique(1000, ["V3", "V4"]))  # doosra denom bhi
+print(list(data_store.vouchers_for(500)), list(data_store.vouchers_for(1000)))
+data_store.flush_sync()
+""",
+        backend=backend,
+    )
+    assert out.splitlines() == ["['V0', 'V1', 'V2']", "['V3']", "['V2', 'V3'] ['V4']"]
+
+
+class ImportBot:
+    """get_file se file 'download' hoti hai; progress message edit hota hai."""
+
+    def __init__(self, content):
+        self.content = content
+        self.edits = []
+        self.documents = []
+
+    async def get_file(self, file_id):
+        async def download_to_drive(path):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.content)
+
+        return SimpleNamespace(download_to_drive=download_to_drive)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.edits.append(text)
+        return SimpleNamespace(message_id=1)
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        self.edits.append(text)
+
+    async def send_document(self, chat_id, document, filename=None, caption=None, **kwargs):
+        self.documents.append((filename, document.read().decode().split()))
+
+
+def test_file_import_streams_in_batches(run, new_order, monkeypatch):
+    monkeypatch.setattr(voucher_import, "IMPORT_BATCH", 7)
+    denom = new_order()["denom"]
+    data_store.add_vouchers(denom, ["OLD-0", "OLD-1"])
+    lines = [*(f"OLD-{i}" for i in range(2)), *(f"NEW-{i}, NEW-{i}" for i in range(30))]
+    bot = ImportBot("\ufeff" + "\n".join(lines) + "\n")
+    state = {
+        "denom": denom, "chat_id": 1, "file_name": "codes.csv", "message_id": None,
+        "read": 0, "added": 0, "duplicates": 0, "shown": [], "error": None, "started": 0.0,
+    }
+    run(voucher_import._run(bot, SimpleNamespace(file_id="f"), state))
+    assert state["error"] is None
+    assert (state["read"], state["added"], state["duplicates"]) == (62, 30, 32)
+    assert data_store.available_count(denom) == 32
+    assert "Import finished" in bot.edits[-1]
+    # 20 message me, poori list file me
+    assert len(state["shown"]) == voucher_import.SHOW_DUPLICATES
+    assert bot.documents[0][0] == f"duplicates-{denom}.txt" and len(bot.documents[0][1]) == 32
@@ -0,0 +1,135 @@
+# tg_webhook.py
+#
+# Webhook mode (config.BOT_MODE = "webhook"). getUpdates long-poll ki jagah
+# Telegram khud har update hamare HTTP server pe POST karta hai - latency
+# kam, aur kai instances ek load balancer ke peeche chal sakte hain.
+#
+# Endpoint sirf update ko Application.update_queue me daal ke 200 deta hai;
+# handlers wahi hain jo polling me chalte hain. Local test / benchmark:
+#
+#   curl -X POST -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" \
+#        -d @update.json http://127.0.0.1:8443/telegram
+
+import asyncio
+import hmac
+import json
+import logging
+import signal
+from typing import Optional
+
+from telegram import Update
+
+from config import (
+    WEBHOOK_DRAIN_SECONDS,
+    WEBHOOK_HOST,
+    WEBHOOK_MAX_CONNECTIONS,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WORKER_ID,
+    WORKERS,
+)
+from http_server import HttpServer, Request
+import metrics
+
+logger = logging.getLogger(__name__)
+
+_app = None
+_server: Optional[HttpServer] = None
+
+
+def _secret_ok(req: Request) -> bool:
+    if not WEBHOOK_SECRET:
+        return False  # start() pehle hi rok deta hai - fail closed
+    sent = req.headers.get("x-telegram-bot-api-secret-token", "")
+    return hmac.compare_digest(sent, WEBHOOK_SECRET)
+
+
+async def handle_update(req: Request):
+    if not _secret_ok(req):
+        logger.warning(f"Webhook update with bad secret token from {req.peer}")
+        metrics.inc("webhook_updates_total", outcome="forbidden")
+        return 403, "forbidden"
+
+    try:
+        update = Update.de_json(json.loads(req.body), _app.bot)
+    except (ValueError, TypeError, KeyError):
+        update = None
+    if update is None:
+        metrics.inc("webhook_updates_total", outcome="bad_request")
+        return 400, "bad update"
+
+    # 200 jaldi - handler ka kaam update_queue ke peeche chalta hai
+    await _app.update_queue.put(update)
+    metrics.inc("webhook_updates_total", outcome="ok")
+    return 200, "ok"
+
+
+async def start(app, port: Optional[int] = None) -> HttpServer:
+    """Update endpoint start karo (app initialize ho chuka ho). port=0 -> free port."""
+    global _app, _server
+    _require_secret()
+    _app = app
+    _server = HttpServer(
+        WEBHOOK_HOST,
+        WEBHOOK_PORT if port is None else port,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        reuse_port=WORKERS > 1,
+    )
+    _server.route("POST", WEBHOOK_PATH, handle_update)
+    await _server.start()
+    return _server
+
+
+def _require_secret() -> None:
+    if not WEBHOOK_SECRET:
+        raise RuntimeError("BOT_MODE=webhook needs WEBHOOK_SECRET - without it anyone can post updates as any user")
+
+
+async def stop(drain: float = 0.0) -> None:
+    global _server
+    if _server is not None:
+        await _server.stop(drain=drain)
+        _server = None
+
+
+async def run(app) -> None:
+    """run_polling ki jagah: poora lifecycle, SIGINT / SIGTERM pe graceful drain."""
+    _require_secret()
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    await start(app)
+    if not WEBHOOK_URL:
+        logger.warning("WEBHOOK_URL empty - setWebhook skipped, endpoint sirf local")
+    elif WORKER_ID == 0:  # setWebhook ek hi baar, baaki workers sirf serve karte hain
+        await app.bot.set_webhook(
+            url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        logger.info(f"Webhook set to {WEBHOOK_URL}")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    try:
+        await stopping.wait()
+    finally:
+        logger.info("Webhook mode stopping - draining requests...")
+        # 1) naye requests band, chal rahe pure  2) queue me pade updates + handlers khatam
+        await stop(drain=WEBHOOK_DRAIN_SECONDS)
+        await app.stop()
+        if app.post_stop:
+            await app.post_stop(app)
+        # run_polling jaisa order: shutdown (persistence flush) phir post_shutdown
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+metrics.describe("webhook_updates_total", "counter", "Telegram webhook POSTs by outcome")
@@ -1,8 +1,8 @@
 # user_panel.py
 
 import logging
+import re
 import uuid
-import requests
 from datetime import datetime
 
 from telegram import (
@@ -14,40 +14,53 @@ from telegram import (
 )
 from telegram.ext import ContextTypes, filters, MessageHandler, CallbackQueryHandler, CommandHandler
 
-from config import ADMIN_ID, PAY0_API_KEY, PAY0_REDIRECT_URL
+import admin_notify
+import catalog
+import delivery
+from config import DENOMINATIONS, RESERVATION_SECONDS
 from data_store import (
-    add_user,
-    vouchers_for,
-    pop_voucher,
-    stock_text,
+    add_user_async,
+    available_count,
     get_price,
-    add_order,
-    update_order,
+    add_order_async,
+    get_order,
+    update_order_async,
+    reserve_async,
+    release_async,
+    sold_info,
 )
+from fulfilment import fulfil_order
+from order_states import PAYABLE_STATUSES
+from pay0_client import create_pay0_order
+from persistence import save_now
+from reconciler import check_now, track
 
 logger = logging.getLogger(__name__)
 
 
 # ---------- UI HELPERS ----------
+# Keyboards sirf catalog pe depend karte hain - ek baar bana ke reuse
+
+_MAIN_MENU_KB = ReplyKeyboardMarkup(
+    [
+        [KeyboardButton("🛒 Buy Vouchers"), KeyboardButton("📦 Available Stock")],
+        [KeyboardButton("❓ Raise Ticket")],
+    ],
+    resize_keyboard=True,
+)
+
+_VOUCHER_DENOM_KB = InlineKeyboardMarkup(
+    [[InlineKeyboardButton(f"💸 {d} Voucher", callback_data=f"denom_{d}")] for d in DENOMINATIONS]
+    + [[InlineKeyboardButton("❌ Cancel", callback_data="cancel")]]
+)
+
 
 def main_menu_kb():
-    return ReplyKeyboardMarkup(
-        [
-            [KeyboardButton("🛒 Buy Vouchers"), KeyboardButton("📦 Available Stock")],
-            [KeyboardButton("❓ Raise Ticket")],
-        ],
-        resize_keyboard=True,
-    )
+    return _MAIN_MENU_KB
 
 
 def voucher_denom_kb():
-    buttons = [
-        [InlineKeyboardButton("💸 1000 Voucher", callback_data="denom_1000")],
-        [InlineKeyboardButton("💸 2000 Voucher", callback_data="denom_2000")],
-        [InlineKeyboardButton("💸 4000 Voucher", callback_data="denom_4000")],
-        [InlineKeyboardButton("❌ Cancel", callback_data="cancel")],
-    ]
-    return InlineKeyboardMarkup(buttons)
+    return _VOUCHER_DENOM_KB
 
 
 def tnc_text() -> str:
@@ -67,76 +80,50 @@ def generate_order_id() -> str:
     return "ORD-" + uuid.uuid4().hex[:10].upper()
 
 
-# ---------- PAY0 API HELPERS ----------
-
-def create_pay0_order(amount: float, order_id: str, customer_mobile: str, customer_name: str) -> str:
-    try:
-        url = "https://pay0.shop/api/create-order"
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        payload = {
-            "customer_mobile": customer_mobile,
-            "customer_name": customer_name or "Telegram User",
-            "user_token": PAY0_API_KEY,
-            "amount": str(amount),
-            "order_id": order_id,
-            "redirect_url": PAY0_REDIRECT_URL,
-            "remark1": "telegram_bot",
-            "remark2": "shein_voucher",
-        }
-
-        resp = requests.post(url, data=payload, headers=headers, timeout=15)
-        data = resp.json()
-        logger.info(f"Pay0 create-order response: {data}")
-
-        if data.get("status") is True and "result" in data:
-            return data["result"].get("payment_url", "")
-
-        return ""
-    except Exception as e:
-        logger.error(f"Error in create_pay0_order: {e}")
-        return ""
-
-
-def check_payment_status(order_id: str) -> str:
-    try:
-        url = "https://pay0.shop/api/check-order-status"
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        payload = {
-            "user_token": PAY0_API_KEY,
-            "order_id": order_id,
-        }
-
-        resp = requests.post(url, data=payload, headers=headers, timeout=15)
-        data = resp.json()
-        logger.info(f"Pay0 check-status response: {data}")
-
-        if data.get("status") is True and "result" in data:
-            txn_status = data["result"].get("txnStatus", "").upper()
-            if txn_status == "SUCCESS":
-                return "success"
-            if txn_status == "PENDING":
-                return "pending"
-            if txn_status == "FAILED":
-                return "failed"
-        return "unknown"
-
-    except Exception as e:
-        logger.error(f"Error in check_payment_status: {e}")
-        return "error"
+def _settled_text(status: str) -> str:
+    if status == "completed":
+        return "✅ Payment successful & voucher delivered to your chat. Check your messages. 💌"
+    if status == "paid":
+        # doosra caller (reconciler / webhook) abhi deliver kar raha hai
+        return "✅ Payment verified. Your voucher(s) are being delivered to this chat."
+    if status == "delivery_failed":
+        return (
+            "✅ Payment verified, but sending your codes was interrupted.\n"
+            "Press 'I Have Paid' again in a minute to receive them."
+        )
+    if status == "paid_no_stock":
+        return (
+            "✅ Payment verified, but vouchers out of stock.\n"
+            "Admin will contact you shortly."
+        )
+    if status == "failed":
+        return (
+            "❌ Payment failed or cancelled.\n"
+            "If money is deducted, please contact support with your Order ID."
+        )
+    return "Order expired. Please start again."
+
+
+async def _finish_paid(query, context: ContextTypes.DEFAULT_TYPE, order_id: str) -> None:
+    result = await fulfil_order(context.bot, order_id)
+    if result == "delivery_failed":
+        # button rehne do - dobara dabane pe wahi codes (naya stock nahi)
+        await query.edit_message_text(_settled_text(result), reply_markup=query.message.reply_markup)
+        return
+    await query.edit_message_text(_settled_text(result))
+    context.user_data.clear()
 
 
 # ---------- HANDLERS (USER SIDE) ----------
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    add_user(user.id)
+    await add_user_async(user.id)
 
     text = (
         "🎁 *Welcome to Shein Verse Voucher Bot!*\n\n"
-        f"Pricing:\n"
-        f"• ₹1000 → ₹{get_price(1000):.2f}\n"
-        f"• ₹2000 → ₹{get_price(2000):.2f}\n"
-        f"• ₹4000 → ₹{get_price(4000):.2f}\n\n"
+        "Pricing:\n"
+        f"{catalog.price_lines()}\n\n"
         "Use the buttons below to get started! 🚀"
     )
     if update.message:
@@ -147,7 +134,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def available_stock(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text(stock_text(), parse_mode="Markdown")
+    await update.message.reply_text(catalog.stock_text(), parse_mode="Markdown")
 
 
 async def raise_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -160,6 +147,23 @@ async def raise_ticket(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data["state"] = "ticket"
 
 
+def _ticket_codes(text: str, user_id: int) -> str:
+    """Ticket me bike hue voucher codes ho to ledger se unka order / buyer (admin ke liye)."""
+    lines = []
+    for token in dict.fromkeys(re.split(r"[\s,]+", text)[:50]):
+        info = sold_info(token.strip("`'\".")) if token else None
+        if info is None:
+            continue
+        line = (
+            f"🔎 {info['code']} → order {info['order_id']}, user {info['user_id']}, "
+            f"₹{info['denom']}, delivered {info['delivered_at']}"
+        )
+        if info["user_id"] != user_id:
+            line += " ⚠ sold to a different user"
+        lines.append(line)
+    return "\n".join(lines)
+
+
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     text = (update.message.text or "").strip()
@@ -188,7 +192,10 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"From: {user.first_name} (id: {user.id}, username: @{user.username})\n\n"
             f"Message:\n{text}"
         )
-        await context.bot.send_message(chat_id=ADMIN_ID, text=admin_msg)
+        codes = _ticket_codes(text, user.id)
+        if codes:
+            admin_msg += "\n\n" + codes
+        admin_notify.ticket(context.bot, admin_msg[:4000])
         await update.message.reply_text(
             "✅ Your ticket has been recorded. Admin will reply soon.",
             reply_markup=main_menu_kb(),
@@ -208,12 +215,17 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         denom = context.user_data.get("denom")
+        if not denom:
+            await update.message.reply_text("Your selection expired. Please start again.", reply_markup=main_menu_kb())
+            context.user_data.clear()
+            return
         price_each = get_price(denom)
         total = qty * price_each
 
         context.user_data["qty"] = qty
         context.user_data["total"] = total
         context.user_data["state"] = "tnc"
+        await save_now(context, user.id)
 
         order_summary = (
             f"🧾 *Order Summary (₹{denom})*\n"
@@ -251,6 +263,10 @@ async def callback_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = query.from_user
 
     if data == "cancel":
+        order_id = context.user_data.get("order_id")
+        if order_id:
+            # hold chhod do; payment phir bhi aa gaya to reconciler free stock se dega
+            await release_async(order_id)
         context.user_data.clear()
         await query.edit_message_text("❌ Operation cancelled. Back to main menu.")
         await query.message.reply_text("Choose an option:", reply_markup=main_menu_kb())
@@ -258,48 +274,57 @@ async def callback_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if data.startswith("denom_"):
         denom = int(data.split("_")[1])
+        if not catalog.is_denom(denom):
+            return  # purane / naqli button ka callback
         context.user_data["denom"] = denom
         context.user_data["state"] = "wait_quantity"
+        await save_now(context, user.id)
 
-        available = len(vouchers_for(denom))
-        price_each = get_price(denom)
-
-        msg = (
-            f"💸 *₹{denom} Voucher*\n"
-            f"You selected ₹{denom} vouchers.\n"
-            f"Available vouchers: {available}\n\n"
-            f"Pricing for ₹{denom} vouchers:\n"
-            f"• All quantities: ₹{price_each:.1f} each\n\n"
-            "🔢 Enter quantity (min 1, max 20):"
-        )
-        await query.edit_message_text(msg, parse_mode="Markdown")
+        await query.edit_message_text(catalog.denom_text(denom), parse_mode="Markdown")
         return
 
     if data == "agree":
         denom = context.user_data.get("denom")
         qty = context.user_data.get("qty")
         total = context.user_data.get("total")
+        if not denom or not qty or total is None:
+            # purana "I Agree" button, ya cart kisi aur worker pe adhoora
+            await query.edit_message_text("Your selection expired. Please start again.")
+            context.user_data.clear()
+            return
 
         order_id = generate_order_id()
+
+        # qty codes RESERVATION_SECONDS ke liye hold - last code do log na khareedein
+        if not await reserve_async(order_id, denom, qty, RESERVATION_SECONDS):
+            await query.edit_message_text(
+                f"😔 Only {available_count(denom)} voucher(s) of ₹{denom} available right now.\n"
+                "Please choose a smaller quantity or try again later."
+            )
+            context.user_data.clear()
+            return
+
         context.user_data["order_id"] = order_id
         context.user_data["user_id"] = user.id
+        await save_now(context, user.id)
 
         # order history me add
-        add_order(
+        await add_order_async(
             {
                 "order_id": order_id,
                 "user_id": user.id,
                 "username": user.username,
+                "first_name": user.first_name,
                 "denom": denom,
                 "qty": qty,
                 "total": total,
                 "status": "created",
                 "created_at": datetime.utcnow().isoformat(),
-                "voucher_code": None,
+                "voucher_codes": [],
             }
         )
 
-        payment_url = create_pay0_order(
+        payment_url = await create_pay0_order(
             amount=total,
             order_id=order_id,
             customer_mobile="9999999999",
@@ -311,7 +336,8 @@ async def callback_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "⚠ Unable to generate payment link. Please try again later."
             )
             context.user_data.clear()
-            update_order(order_id, status="paylink_error")
+            await update_order_async(order_id, status="paylink_error")
+            await release_async(order_id)
             return
 
         summary = (
@@ -322,7 +348,8 @@ async def callback_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"*TOTAL: ₹{total:.2f}*\n\n"
             "💳 Please complete the payment using the link below:\n\n"
             f"[Click here to Pay ₹{total:.2f}]({payment_url})\n\n"
-            "After completing payment, click *'I Have Paid'* to verify."
+            "Vouchers are delivered automatically once payment is confirmed.\n"
+            "You can also click *'I Have Paid'* to verify now."
         )
 
         await query.edit_message_text(
@@ -337,65 +364,34 @@ async def callback_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
             disable_web_page_preview=True,
         )
         context.user_data["state"] = "payment"
-        update_order(order_id, status="await_payment")
+        await save_now(context, user.id)
+        await update_order_async(order_id, status="await_payment")
+        track(order_id)
         return
 
     if data == "paid":
-        denom = context.user_data.get("denom")
-        qty = context.user_data.get("qty")
-        total = context.user_data.get("total")
         order_id = context.user_data.get("order_id")
-        user_id = context.user_data.get("user_id")
 
         if not order_id:
             await query.edit_message_text("Order expired. Please start again.")
             context.user_data.clear()
             return
 
-        status = check_payment_status(order_id)
+        # reconciler ne pehle hi settle kar diya ho to Pay0 ko dobara mat pucho
+        order = get_order(order_id)
+        if order and delivery.pending(order):
+            # pichli baar codes bhejna beech me ruka - wahi codes dobara
+            await _finish_paid(query, context, order_id)
+            return
+        if order and order.get("status") not in PAYABLE_STATUSES:
+            await query.edit_message_text(_settled_text(order["status"]))
+            context.user_data.clear()
+            return
 
-        if status == "success":
-            code = pop_voucher(denom)
-            if not code:
-                await query.edit_message_text(
-                    "✅ Payment verified, but vouchers out of stock.\n"
-                    "Admin will contact you shortly."
-                )
-                update_order(order_id, status="paid_no_stock")
-                await context.bot.send_message(
-                    chat_id=ADMIN_ID,
-                    text=f"⚠ Payment success but NO voucher left for ₹{denom}. Order ID: {order_id}",
-                )
-            else:
-                await context.bot.send_message(
-                    chat_id=user_id,
-                    text=(
-                        "🎉 *Payment Verified!*\n\n"
-                        f"Order ID: `{order_id}`\n"
-                        f"Voucher (₹{denom}): `{code}`\n\n"
-                        "Please keep this code safe and do not share it with anyone."
-                    ),
-                    parse_mode="Markdown",
-                )
-                update_order(order_id, status="completed", voucher_code=code)
-                admin_msg = (
-                    f"✅ *New Order Completed*\n\n"
-                    f"User: {user.first_name} (@{user.username})\n"
-                    f"ID: {user.id}\n"
-                    f"Order ID: {order_id}\n"
-                    f"Voucher: ₹{denom}\n"
-                    f"Qty: {qty}\n"
-                    f"Total: ₹{total:.2f}\n"
-                    f"Code: {code}"
-                )
-                await context.bot.send_message(
-                    chat_id=ADMIN_ID, text=admin_msg, parse_mode="Markdown"
-                )
+        status = await check_now(order_id)
 
-            await query.edit_message_text(
-                "✅ Payment successful & voucher delivered to your chat. Check your messages. 💌"
-            )
-            context.user_data.clear()
+        if status == "success":
+            await _finish_paid(query, context, order_id)
             return
 
         elif status in ("pending", "processing"):
@@ -412,7 +408,9 @@ async def callback_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "❌ Payment failed or cancelled.\n"
                 "If money is deducted, please contact support with your Order ID."
             )
-            update_order(order_id, status="failed")
+            await update_order_async(order_id, status="failed")
+            # hold pe rakhe codes turant wapas stock me (expiry ka wait nahi)
+            await release_async(order_id)
             context.user_data.clear()
             return
 
@@ -421,11 +419,8 @@ async def callback_buttons(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "⚠ Unable to verify payment right now.\n"
                 "Please contact support or try again later."
             )
-            update_order(order_id, status="unknown")
-            await context.bot.send_message(
-                chat_id=ADMIN_ID,
-                text=f"⚠ Pay0 status unknown/error for Order ID: {order_id}",
-            )
+            await update_order_async(order_id, status="unknown")
+            admin_notify.pay0_unknown(context.bot, order_id)
             return
 
     if data == "disagree":
@@ -0,0 +1,175 @@
+# voucher_import.py
+#
+# Supplier ki badi file (txt / csv, lakhon lines) se stock import. Admin ka
+# handler sirf job start karke free ho jata hai; file disk pe download hoti
+# hai, thread me line-by-line padhi jati hai aur IMPORT_BATCH codes ke
+# batches add_vouchers_unique se commit hote hain. Jo codes pehle stock me
+# aa chuke ya bik chuke (ya file me dobara hain) wo reject hote hain aur
+# admin ko list milti hai. Progress message live update hota hai.
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from telegram.error import TelegramError
+
+import catalog
+from codes import iter_codes
+from config import IMPORT_BATCH, IMPORT_PROGRESS_SECONDS
+from data_store import add_vouchers_unique, wait_writable
+
+logger = logging.getLogger(__name__)
+
+# har denomination pe ek time pe ek import
+_tasks: Dict[int, asyncio.Task] = {}
+# summary message me itne duplicates, baaki file me
+SHOW_DUPLICATES = 20
+
+
+def is_running(denom: int) -> bool:
+    task = _tasks.get(denom)
+    return task is not None and not task.done()
+
+
+def start(app, document, denom: int, chat_id: int) -> bool:
+    """Uploaded document ka import background me. Us denom ka pehle se chal raha ho to False."""
+    if is_running(denom):
+        return False
+    state = {
+        "denom": denom,
+        "chat_id": chat_id,
+        "file_name": document.file_name or "codes.txt",
+        "message_id": None,
+        "read": 0,
+        "added": 0,
+        "duplicates": 0,
+        "shown": [],
+        "error": None,
+        "started": time.monotonic(),
+    }
+    _tasks[denom] = app.create_task(_run(app.bot, document, state))
+    return True
+
+
+def _import_file(path: str, dupes_path: str, state: Dict[str, Any]) -> None:
+    """Thread me: file stream karke batches commit. Counters `state` me."""
+    denom = state["denom"]
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f, \
+            open(dupes_path, "w", encoding="utf-8") as dupes_out:
+
+        def commit(batch: List[str]) -> None:
+            dupes = add_vouchers_unique(denom, batch)
+            state["added"] += len(batch) - len(dupes)
+            state["duplicates"] += len(dupes)
+            if dupes:
+                dupes_out.writelines(c + "\n" for c in dupes)
+                room = SHOW_DUPLICATES - len(state["shown"])
+                if room > 0:
+                    state["shown"].extend(dupes[:room])
+
+        batch: List[str] = []
+        for code in iter_codes(f):
+            batch.append(code)
+            state["read"] += 1
+            if len(batch) >= IMPORT_BATCH:
+                commit(batch)
+                batch = []
+        if batch:
+            commit(batch)
+
+
+def _progress_text(state: Dict[str, Any], done: bool) -> str:
+    if state["error"]:
+        head = "❌ *Import stopped*"
+    elif done:
+        head = "✅ *Import finished*"
+    else:
+        head = "📥 *Import running*"
+    lines = [
+        f"{head} - ₹{state['denom']} (`{state['file_name']}`)",
+        "",
+        f"Codes read: {state['read']}",
+        f"Added: {state['added']}",
+        f"Duplicates rejected: {state['duplicates']}",
+    ]
+    if done:
+        lines.append(f"Time: {time.monotonic() - state['started']:.1f}s")
+    if state["error"]:
+        lines.append(f"\nError: `{state['error']}` (upar tak ke batches add ho chuke)")
+    if done and state["shown"]:
+        more = state["duplicates"] - len(state["shown"])
+        lines.append("\nDuplicates:")
+        lines.extend(f"`{c}`" for c in state["shown"])
+        if more > 0:
+            lines.append(f"... aur {more} (file attached)")
+    if done:
+        lines.append("\n" + catalog.stock_text())
+    return "\n".join(lines)[:4000]
+
+
+async def _report(bot, state: Dict[str, Any], done: bool = False) -> None:
+    text = _progress_text(state, done)
+    try:
+        if state["message_id"] is None:
+            msg = await bot.send_message(chat_id=state["chat_id"], text=text, parse_mode="Markdown")
+            state["message_id"] = msg.message_id
+        else:
+            await bot.edit_message_text(
+                chat_id=state["chat_id"],
+                message_id=state["message_id"],
+                text=text,
+                parse_mode="Markdown",
+            )
+    except TelegramError as e:
+        logger.warning(f"Import progress update failed: {e}")
+
+
+async def _send_duplicates(bot, state: Dict[str, Any], dupes_path: str) -> None:
+    try:
+        with open(dupes_path, "rb") as f:
+            await bot.send_document(
+                chat_id=state["chat_id"],
+                document=f,
+                filename=f"duplicates-{state['denom']}.txt",
+                caption=f"{state['duplicates']} duplicate code(s) rejected",
+            )
+    except (OSError, TelegramError) as e:
+        logger.warning(f"Duplicate list send failed: {e}")
+
+
+async def _run(bot, document, state: Dict[str, Any]) -> None:
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=".txt")
+    os.close(fd)
+    dupes_path = path + ".dupes"
+    try:
+        try:
+            await _report(bot, state)
+            tg_file = await bot.get_file(document.file_id)
+            await tg_file.download_to_drive(path)
+
+            await wait_writable()
+            job = asyncio.ensure_future(asyncio.to_thread(_import_file, path, dupes_path, state))
+            while True:
+                done, _ = await asyncio.wait({job}, timeout=IMPORT_PROGRESS_SECONDS)
+                if done:
+                    break
+                await _report(bot, state)
+            job.result()
+        except Exception as e:
+            logger.error(f"Voucher import for ₹{state['denom']} failed: {e}")
+            state["error"] = str(e)[:200].replace("`", "'")
+
+        await _report(bot, state, done=True)
+        logger.info(
+            f"Import ₹{state['denom']} {state['file_name']}: read={state['read']} "
+            f"added={state['added']} duplicates={state['duplicates']}"
+        )
+        if state["duplicates"] > len(state["shown"]):
+            await _send_duplicates(bot, state, dupes_path)
+    finally:
+        for p in (path, dupes_path):
+            if os.path.exists(p):
+                os.remove(p)